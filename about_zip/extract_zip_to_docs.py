@@ -3,7 +3,7 @@ import os, re
 import shutil
 import zipfile
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, Iterable, List
 from time import sleep
 
 # def extract_zip_to_docs(zip_path: str, overwrite: bool = False) -> List[Path]:
@@ -196,6 +196,21 @@ def extract_zip_to_docs_from_fold(download_path: str, file_name: str, doc_dir: s
             res_zip.append(target)
     return res_zip
 
+def extract_zip_to_docs_from_results(results: Iterable[Dict[str, Any]], doc_dir: str, overwrite: bool = False) -> List[List[Path]]:
+    """
+    fetch_*_docs_queue の結果レコード（または saved_path を持つ dict）をそのまま受け取って展開する。
+    extract_zip_to_docs_from_fold と同じ戻り値だが、xlsx の書き出し→読み直しを挟まない。
+    """
+    res_zip: List[List[Path]] = []
+    for r in results:
+        if r.get("error"):
+            continue
+        v = r.get("saved_path")
+        if not v:
+            continue
+        res_zip.append(extract_zip_to_docs(str(v), doc_dir, overwrite=overwrite))
+    return res_zip
+
 def clear_folder_files(folder_path: str):
     """
     指定されたフォルダ内の全ファイル・サブフォルダを削除する関数
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+画像 asset の内容アドレス保存（assets/cas/<hash[:2]>/<hash><拡張子>）
+- 同じ画像（ロゴ・定型図・テンプレート）は何文書分でも実体 1 つ。HTML は cas 側を直接参照する
+- 名前衝突が起きないので name_1, name_2 … の exists() 総当たりも不要
+- 一時フォルダからの登録はハードリンク（同一ボリューム）→ だめならコピー。登録済みならリンクも張らない
+- 実体は一度書いたら変更しない（上書きしないので、ハードリンク/キャッシュ復元と共有しても壊れない）
+"""
+
+import os, shutil, hashlib, uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Set
+
+# ==================== 調整フラグ ====================
+WORD_ASSET_CAS     = True      # False: 従来どおり assets/word/<label>/ へ文書毎にコピー
+CAS_DIR_NAME       = "cas"     # assets_base_dir 直下
+HASH_BLOCK_BYTES   = 1024 * 1024
+
+class AssetStore:
+    """
+        store = store_for(assets_base_dir)        # WORD_ASSET_CAS=False なら None
+        p = store.add_file(tmp_img)               # → assets/cas/ab/abcd….png
+        p = store.add_stream(zip_member, ".png")
+    """
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._known: Set[str] = set()   # このプロセスで登録/確認済みのファイル名（exists() を省く）
+        self.added = 0
+        self.reused = 0
+
+    def _path(self, digest: str, suffix: str) -> Path:
+        return self.root / digest[:2] / f"{digest}{suffix.lower()}"
+
+    def _hit(self, dst: Path) -> bool:
+        if dst.name in self._known:
+            self.reused += 1
+            return True
+        if dst.exists():
+            self._known.add(dst.name)
+            self.reused += 1
+            return True
+        return False
+
+    def _commit(self, dst: Path) -> Path:
+        self._known.add(dst.name)
+        self.added += 1
+        return dst
+
+    def add_file(self, src: Path) -> Path:
+        src = Path(src)
+        h = hashlib.sha256()
+        with open(src, "rb") as f:
+            while True:
+                b = f.read(HASH_BLOCK_BYTES)
+                if not b:
+                    break
+                h.update(b)
+        dst = self._path(h.hexdigest(), src.suffix)
+        if self._hit(dst):
+            return dst
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(src, dst)
+            return self._commit(dst)
+        except FileExistsError:
+            # 他ワーカーが同じ画像を先に登録した
+            self._known.add(dst.name); self.reused += 1
+            return dst
+        except OSError:
+            pass
+        tmp = dst.parent / f".{dst.name}.{uuid.uuid4().hex[:8]}.tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)   # 同じ内容なので競合しても結果は同じ
+        return self._commit(dst)
+
+    def add_stream(self, fobj: BinaryIO, suffix: str) -> Path:
+        """ZIP メンバー等を一時ファイルへ書きながらハッシュし、未登録なら cas へ移す"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".in.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        h = hashlib.sha256()
+        try:
+            with open(tmp, "wb") as d:
+                while True:
+                    b = fobj.read(HASH_BLOCK_BYTES)
+                    if not b:
+                        break
+                    h.update(b); d.write(b)
+            dst = self._path(h.hexdigest(), suffix)
+            if self._hit(dst):
+                return dst
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, dst)
+            return self._commit(dst)
+        finally:
+            if tmp.exists():
+                try: tmp.unlink()
+                except OSError: pass
+
+_stores: Dict[str, AssetStore] = {}
+
+def cas_enabled() -> bool:
+    return bool(WORD_ASSET_CAS)
+
+def store_for(assets_base_dir: Path) -> Optional[AssetStore]:
+    """assets_base_dir/cas のストア（プロセス内で使い回す）。WORD_ASSET_CAS=False なら None"""
+    if not cas_enabled():
+        return None
+    root = Path(assets_base_dir) / CAS_DIR_NAME
+    key = str(root)
+    if key not in _stores:
+        _stores[key] = AssetStore(root)
+    return _stores[key]
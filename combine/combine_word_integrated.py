@@ -1,7 +1,10 @@
 # combine_integrated_skip_bad.py
 import os, sys, platform, subprocess
 from openpyxl import load_workbook
-import win32com.client as win32
+try:
+    import win32com.client as win32
+except ImportError:   # Windows 以外では import だけ通す（実行には Word が必要）
+    win32 = None
 
 def kill_all_word_processes():
     if platform.system().lower() != "windows":
@@ -72,6 +75,8 @@ def combine_word_integrated(
     - 失敗したら Documents.Open(..., OpenAndRepair=True) で開いて StoryRanges を転送
     - それもダメならスキップ
     """
+    if win32 is None:
+        raise RuntimeError("combine_word_integrated は Windows + Word（pywin32）が必要です")
     if kill_word:
         kill_all_word_processes()
 
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Office → HTML 断片の変換キャッシュ（内容ハッシュ基準・サイズ上限付き LRU）
+- キー: sha256(元ファイルのバイト列) ＋ 変換設定の文字列（幅/テキスト抽出/バックエンド等）
+- 値  : entries に入れる dict（{"type":"word","html":...} / {"type":"ppt","slides":...}）＋ 参照する asset ファイル
+- asset は html_base_dir からの相対パスのまま保存し、ヒット時は同じ相対位置へ復元
+- 索引は SQLite（複数ワーカープロセスから同時に使う）。合計サイズが上限を超えたら last_used の古い順に削除
+"""
+
+import os, json, time, shutil, sqlite3, hashlib, uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# ==================== 調整フラグ ====================
+CACHE_DIR_NAME     = ".conv_cache"                 # 既定: 出力フォルダ直下
+ENV_CACHE_DIR      = "OFFICE_CONVERSION_CACHE_DIR"  # 指定があればこちら（実行毎に出力先が変わる場合）
+CACHE_MAX_MB       = 2048                          # 合計サイズ上限（超えたら LRU で削除）
+CACHE_FORMAT_VER   = "1"                           # 断片の形式を変えたら上げる（旧エントリは自然に外れる）
+HASH_BLOCK_BYTES   = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries(
+    key        TEXT PRIMARY KEY,
+    entry      TEXT NOT NULL,
+    assets     TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    created    REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_used);
+"""
+
+def sha256_of_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(HASH_BLOCK_BYTES)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+def _copy(src: Path, dst: Path) -> None:
+    """
+    キャッシュ⇔出力はコピー（ハードリンクにすると、出力側を "wb" で上書きした時にキャッシュ実体まで書き換わる）
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(src, dst)
+
+class ConversionCache:
+    """
+    使い方（ワーカー内）:
+        key = cache.key_for(src, settings)
+        entry = cache.get(key, html_base_dir)          # ヒットなら asset も復元済み
+        if entry is None:
+            entry = convert(...)
+            cache.put(key, entry, html_base_dir, asset_rels)
+    """
+    def __init__(self, root: Path, max_bytes: int = CACHE_MAX_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_output(cls, out_dir: Path) -> "ConversionCache":
+        env = os.environ.get(ENV_CACHE_DIR)
+        return cls(Path(env) if env else Path(out_dir) / CACHE_DIR_NAME)
+
+    # ---------- キー ----------
+    @staticmethod
+    def key_for(src: Path, settings: str) -> str:
+        h = hashlib.sha256()
+        h.update(f"v{CACHE_FORMAT_VER}|{settings}|".encode("utf-8"))
+        h.update(sha256_of_file(Path(src)).encode("ascii"))
+        return h.hexdigest()
+
+    def _obj_dir(self, key: str) -> Path:
+        return self.objects / key[:2] / key
+
+    # ---------- 参照 ----------
+    def get(self, key: str, html_base_dir: Path) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT entry, assets FROM entries WHERE key=?", (key,)).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+        obj = self._obj_dir(key)
+        assets: List[str] = json.loads(row[1])
+        try:
+            for rel in assets:
+                dst = Path(html_base_dir) / rel
+                if not dst.exists():
+                    _copy(obj / rel, dst)
+        except OSError:
+            # 実体が消えている（手動削除など）→ エントリごと捨ててミス扱い
+            self._delete(key)
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE entries SET last_used=? WHERE key=?", (time.time(), key))
+        self._conn.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    # ---------- 登録 ----------
+    def put(self, key: str, entry: Dict[str, Any], html_base_dir: Path, asset_rels: Iterable[str]) -> None:
+        obj = self._obj_dir(key)
+        rels: List[str] = []
+        size = 0
+        if not obj.exists():
+            tmp = obj.parent / f".{key}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                for rel in asset_rels:
+                    src = Path(html_base_dir) / rel
+                    if not src.is_file():
+                        continue
+                    _copy(src, tmp / rel)
+                    rels.append(rel)
+                    size += src.stat().st_size
+                tmp.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.replace(tmp, obj)
+                except OSError:
+                    shutil.rmtree(tmp, ignore_errors=True)   # 他ワーカーが先に登録した
+            except Exception:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+        else:
+            for rel in asset_rels:
+                p = obj / rel
+                if p.is_file():
+                    rels.append(rel); size += p.stat().st_size
+        body = json.dumps(entry, ensure_ascii=False, default=str)
+        size += len(body.encode("utf-8"))
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries(key, entry, assets, size, created, last_used) VALUES(?,?,?,?,?,?)",
+            (key, body, json.dumps(rels, ensure_ascii=False), size, now, now))
+        self._conn.commit()
+        self.evict()
+
+    # ---------- LRU ----------
+    def total_bytes(self) -> int:
+        return int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0])
+
+    def evict(self) -> int:
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_used ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._delete(key)
+            total -= size
+            removed += 1
+        return removed
+
+    def _delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM entries WHERE key=?", (key,))
+        self._conn.commit()
+        shutil.rmtree(self._obj_dir(key), ignore_errors=True)
+
+    def close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
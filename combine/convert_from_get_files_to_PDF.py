@@ -263,11 +263,29 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 from pathlib import Path
-from typing import Iterable, List, Optional, Any, Union
+from typing import Callable, Iterable, List, Optional, Any, Tuple, Union
 import subprocess
 import multiprocessing as mp
-import pythoncom
-import win32com.client as win32
+try:
+    import pythoncom
+    import win32com.client as win32
+except ImportError:   # Windows 以外: COM 無し（fake バックエンドでの計測用）
+    pythoncom = None
+    win32 = None
+
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from combine.converter_backends import (
+    close_converters,
+    get_converter,
+    )
+from combine.office_watchdog import (
+    WorkerSupervisor,
+    deadline_for,
+    report_office_app,
+    set_office_pid_reporter,
+    )
 
 # ===== 拡張子 =====
 WORD_EXTS = {".doc", ".docx", ".docm", ".rtf"}
@@ -305,24 +323,50 @@ def kill_office_processes() -> None:
             pass
 
 
+def _export_word_doc_to_pdf(doc, dst: Path) -> None:
+    """開いている Word 文書 → PDF（HTML 化など他の出力と同じセッションで使う）"""
+    doc.ExportAsFixedFormat(
+        OutputFileName=str(dst),
+        ExportFormat=wdExportFormatPDF,
+        OpenAfterExport=False,
+        OptimizeFor=wdExportOptimizeForPrint,
+        Range=wdExportRangeAll,
+        Item=wdExportDocumentContent,
+        IncludeDocProps=True,
+        KeepIRM=True,
+        CreateBookmarks=wdExportCreateNoBookmarks,
+        DocStructureTags=True,
+        BitmapMissingFonts=True,
+        UseISO19005_1=False,
+    )
+
+
+def _export_ppt_pres_to_pdf(pres, dst: Path) -> None:
+    """開いているプレゼンテーション → PDF"""
+    pres.ExportAsFixedFormat(
+        str(dst),
+        ppFixedFormatTypePDF,
+        ppFixedFormatIntentPrint,
+        msoTrue,      # FrameSlides
+        1,            # HandoutOrder
+        1,            # OutputType
+        msoFalse,     # PrintHiddenSlides
+        None,         # PrintRange
+        ppPrintAll,   # RangeType
+        None,         # SlideShowName
+        msoTrue,      # IncludeDocProperties
+        msoTrue,      # KeepIRMSettings
+        msoTrue,      # DocStructureTags
+        msoTrue,      # BitmapMissingFonts
+        msoFalse      # UseISO19005_1
+    )
+
+
 def _convert_word_to_pdf(app_word, src: Path, dst: Path) -> bool:
     """Word → PDF（詳細パラメータ版）"""
     try:
         doc = app_word.Documents.Open(str(src), ReadOnly=True, Visible=False)
-        doc.ExportAsFixedFormat(
-            OutputFileName=str(dst),
-            ExportFormat=wdExportFormatPDF,
-            OpenAfterExport=False,
-            OptimizeFor=wdExportOptimizeForPrint,
-            Range=wdExportRangeAll,
-            Item=wdExportDocumentContent,
-            IncludeDocProps=True,
-            KeepIRM=True,
-            CreateBookmarks=wdExportCreateNoBookmarks,
-            DocStructureTags=True,
-            BitmapMissingFonts=True,
-            UseISO19005_1=False,
-        )
+        _export_word_doc_to_pdf(doc, dst)
         doc.Close(False)
         return True
     except Exception as e:
@@ -342,23 +386,7 @@ def _convert_ppt_to_pdf(app_ppt, src: Path, dst: Path) -> bool:
         pass
 
     def export(pres):
-        pres.ExportAsFixedFormat(
-            dst_s,
-            ppFixedFormatTypePDF,
-            ppFixedFormatIntentPrint,
-            msoTrue,      # FrameSlides
-            1,            # HandoutOrder
-            1,            # OutputType
-            msoFalse,     # PrintHiddenSlides
-            None,         # PrintRange
-            ppPrintAll,   # RangeType
-            None,         # SlideShowName
-            msoTrue,      # IncludeDocProperties
-            msoTrue,      # KeepIRMSettings
-            msoTrue,      # DocStructureTags
-            msoTrue,      # BitmapMissingFonts
-            msoFalse      # UseISO19005_1
-        )
+        _export_ppt_pres_to_pdf(pres, dst_s)
 
     try:
         pres = app_ppt.Presentations.Open(src_s, ReadOnly=True, Untitled=False, WithWindow=False)
@@ -409,6 +437,7 @@ def _reserve_output_path(
 def _worker_loop(
     worker_id: int,
     task_q: mp.Queue,
+    status_q: mp.Queue,
     results: Any,
     output_dir_s: str,
     overwrite: bool,
@@ -418,41 +447,54 @@ def _worker_loop(
     """
     ワーカープロセス本体。
     - 自前で COM 初期化/終了
-    - 必要に応じて Word/PowerPoint を遅延起動
+    - 必要に応じて Word/PowerPoint を遅延起動（DispatchEx: ワーカー専用のインスタンス。PID を監視側へ通知）
     - タスクは動的キューから取得（None で終了）
+    - 1 件毎に status_q へ start/done（出力 PDF のパス or None）を送る（期限切れは監視側がこのワーカーごと止める）
     """
-    pythoncom.CoInitialize()
+    set_office_pid_reporter(lambda pid: status_q.put(("pid", worker_id, pid)))
+    conv = get_converter()   # None なら従来の COM 直呼び
+    if pythoncom is not None:
+        pythoncom.CoInitialize()
     app_word: Optional[Any] = None
     app_ppt:  Optional[Any] = None
     output_dir = Path(output_dir_s)
 
     try:
         while True:
-            src_s = task_q.get()
-            if src_s is None:
+            task = task_q.get()
+            if task is None:
                 break  # sentinel
 
+            tid, src_s = task
+            status_q.put(("start", worker_id, tid))
+            ok = False
             src = Path(src_s)
+            ext = src.suffix.lower()
             if not src.exists() or not src.is_file():
                 print(f"[W{worker_id}] ⚠️ 見つからない/ファイルでない: {src}", flush=True)
+                status_q.put(("done", worker_id, tid, None))
                 continue
-
-            ext = src.suffix.lower()
             if ext not in WORD_EXTS and ext not in PPT_EXTS:
                 print(f"[W{worker_id}] ℹ️ 非対応拡張子スキップ: {src.name}", flush=True)
+                status_q.put(("done", worker_id, tid, None))
                 continue
 
             dst_pdf = _reserve_output_path(output_dir, src.stem, overwrite, lock, reserved)
 
             try:
-                if ext in WORD_EXTS:
+                if conv is not None:
+                    with conv.open(src) as doc:
+                        ok = doc.to_pdf(dst_pdf)
+                elif ext in WORD_EXTS:
                     if app_word is None:
-                        app_word = win32.Dispatch("Word.Application")
+                        app_word = win32.DispatchEx("Word.Application")
+                        report_office_app(app_word)
                         app_word.Visible = False
                     ok = _convert_word_to_pdf(app_word, src, dst_pdf)
                 else:
                     if app_ppt is None:
-                        app_ppt = win32.Dispatch("PowerPoint.Application")
+                        app_ppt = win32.DispatchEx("PowerPoint.Application")
+                        report_office_app(app_ppt)
                         app_ppt.Visible = True
                         try:
                             app_ppt.WindowState = ppWindowMinimized
@@ -461,13 +503,14 @@ def _worker_loop(
                     ok = _convert_ppt_to_pdf(app_ppt, src, dst_pdf)
 
                 if ok:
-                    results.append(str(dst_pdf))
+                    results.append((src_s, str(dst_pdf)))
                     print(f"[W{worker_id}] ✅ PDF化: {src.name} → {dst_pdf}", flush=True)
                 else:
                     print(f"[W{worker_id}] ⚠️ 失敗: {src}", flush=True)
 
             except Exception as e:
                 print(f"[W{worker_id}] ⚠️ 変換エラー: {src} → {e}", flush=True)
+            status_q.put(("done", worker_id, tid, str(dst_pdf) if ok else None))
 
     finally:
         # COM アプリ終了
@@ -481,10 +524,12 @@ def _worker_loop(
                 app_ppt.Quit()
         except Exception:
             pass
-        try:
-            pythoncom.CoUninitialize()
-        except Exception:
-            pass
+        close_converters()
+        if pythoncom is not None:
+            try:
+                pythoncom.CoUninitialize()
+            except Exception:
+                pass
 
 
 def convert_list_to_pdf_in_dir_parallel(
@@ -492,8 +537,12 @@ def convert_list_to_pdf_in_dir_parallel(
     output_dir: Union[str, Path],
     pdf_dir: str,
     overwrite: bool = False,
-    num_workers: int = 10
-) -> List[Path]:
+    num_workers: int = 10,
+    return_pairs: bool = False,
+    kill_office: bool = True,
+    quarantine: Optional[List[str]] = None,
+    on_result: Optional[Callable[[str, Optional[Path]], None]] = None
+) -> Union[List[Path], List[Tuple[str, Path]]]:
     """
     与えられたファイル群（Word/PPT）を PDF 化して、指定 output_dir に保存。
     動的キューで並列実行（既定 5 ワーカー）。
@@ -501,59 +550,91 @@ def convert_list_to_pdf_in_dir_parallel(
     - output_dir が無ければ作成
     - overwrite=False は重複回避名（_1, _2 …）を予約ベースで安全に割当て
     - 非存在/非対応はスキップ
+    - return_pairs=True なら [(入力パス文字列, 出力 PDF Path), ...] を返す（ジャーナル記録用）
+    - paths はジェネレータでもよい。最初の対象が来た時点でワーカーを起動し、
+      以降は届いた順にキューへ流す（前段と並行して変換が進む）
+    - kill_office=False なら開始/終了時の Office Kill を呼び出し側に任せる
+      （HTML 変換など他の Office 利用と同時に走らせる場合）
+    - 1 件毎の期限（office_watchdog.deadline_for: サイズ比例）を超えたら、そのワーカーと
+      その Office だけを止めて補充し、文書は再投入。WATCHDOG_MAX_ATTEMPTS 回駄目なら quarantine
+      （quarantine にリストを渡すと、そのパス文字列を追記する）
+    - on_result(入力パス文字列, 出力 PDF Path or None=失敗/quarantine) を 1 件終わる毎に呼ぶ
+      （全件を待たずにジャーナルへ記録する用。監視スレッドから呼ばれる）
     """
 
     out_dir_path = Path(output_dir) / pdf_dir
     out_dir = Path(out_dir_path).resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # 入力正規化 & 先にフィルタ（無駄なキュー投入を避ける）
-    todo: List[str] = []
+    manager = None
+    results = None
+    sup: Optional[WorkerSupervisor] = None
+    names: dict = {}
+
+    def _start_workers() -> None:
+        nonlocal manager, results, sup
+        # 親プロセス側で先に Office を全滅させる（ロック解除用）
+        if kill_office:
+            kill_office_processes()
+
+        manager = mp.Manager()
+        results = manager.list()       # 出力ファイルの共有リスト
+        reserved = manager.dict()      # 予約された出力ファイル名
+        lock = manager.Lock()          # 予約用ロック
+
+        def _spawn(wid: int, task_q: Any, status_q: Any) -> mp.Process:
+            p = mp.Process(
+                target=_worker_loop,
+                args=(wid, task_q, status_q, results, str(out_dir), overwrite, lock, reserved),
+                daemon=False
+            )
+            p.start()
+            return p
+
+        def _done(tid: int, dst: Optional[str]) -> None:
+            if on_result is not None:
+                on_result(names[tid], Path(dst) if dst else None)
+
+        def _give_up(tid: int, reason: str) -> None:
+            print(f"[QUARANTINE] {Path(names[tid]).name} / {reason}", flush=True)
+            if quarantine is not None:
+                quarantine.append(names[tid])
+            if on_result is not None:
+                on_result(names[tid], None)
+
+        sup = WorkerSupervisor("PDF", _spawn, num_workers, on_done=_done, on_give_up=_give_up)
+
+    # 入力正規化 & フィルタしながら投入（無駄なキュー投入を避ける）
     for p in paths:
-        s = str(p)
+        s = str(p) if p is not None else ""
         if not s:
             continue
         ext = Path(s).suffix.lower()
-        if ext in WORD_EXTS or ext in PPT_EXTS:
-            todo.append(s)
+        if ext not in WORD_EXTS and ext not in PPT_EXTS:
+            continue
+        if sup is None:
+            _start_workers()
+        tid = len(names)
+        names[tid] = s
+        try:
+            size = Path(s).stat().st_size
+        except OSError:
+            size = 0
+        sup.submit(tid, (tid, s), deadline_for(size))
 
-    if not todo:
+    if sup is None:
         return []
 
-    # 親プロセス側で先に Office を全滅させる（ロック解除用）
-    kill_office_processes()
-
-    manager = mp.Manager()
-    results = manager.list()       # 出力ファイルの共有リスト
-    reserved = manager.dict()      # 予約された出力ファイル名
-    lock = manager.Lock()          # 予約用ロック
-    task_q: mp.Queue = mp.Queue()  # 高速なプロセス間 Queue
-
-    # タスク投入（動的キュー）
-    for s in todo:
-        task_q.put(s)
-
-    # 終了用センチネル
-    for _ in range(num_workers):
-        task_q.put(None)
-
-    procs: List[mp.Process] = []
-    for wid in range(1, num_workers + 1):
-        p = mp.Process(
-            target=_worker_loop,
-            args=(wid, task_q, results, str(out_dir), overwrite, lock, reserved),
-            daemon=False
-        )
-        p.start()
-        procs.append(p)
-
-    for p in procs:
-        p.join()
+    # 全件 done / quarantine まで待ってから終了センチネル
+    sup.wait()
 
     # 念のため Office を片付ける（他のインスタンスに注意）
-    kill_office_processes()
+    if kill_office:
+        kill_office_processes()
 
-    return [Path(s) for s in list(results)]
+    if return_pairs:
+        return [(src, Path(dst)) for src, dst in list(results)]
+    return [Path(dst) for _, dst in list(results)]
 
 
 # ---- 動作例 ----
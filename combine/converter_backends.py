@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Office 文書コンバータのバックエンド切替（open → to_html / to_text / slides / to_pdf / slide_images）
+- "com"  : Word / PowerPoint を COM で操作（Windows + Office が必要）
+- "ooxml": .docx/.docm/.pptx/.pptm を ZIP から直接読む（PDF・スライド画像は非対応）
+- "fake" : 決定的な擬似変換。遅延と失敗（恒久/一時）を注入でき、Linux でプール/リトライの計測に使う
+
+選択は CONVERTER_BACKEND（= 環境変数 OFFICE_CONVERTER_BACKEND）。空なら各モジュールの従来経路。
+ワーカーは別プロセス（spawn）なので、設定は use_backend() で環境変数に載せて子へ引き継ぐ。
+"""
+
+import os, abc, time, hashlib, threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# ==================== 調整フラグ ====================
+ENV_BACKEND          = "OFFICE_CONVERTER_BACKEND"
+ENV_FAKE_LATENCY     = "OFFICE_FAKE_LATENCY_SEC"      # 1 操作あたりの固定遅延
+ENV_FAKE_LATENCY_KB  = "OFFICE_FAKE_LATENCY_PER_KB"   # ファイルサイズ比例の遅延（秒/KB）
+ENV_FAKE_FAILURE     = "OFFICE_FAKE_FAILURE_RATE"     # 恒久失敗の確率（0..1）
+ENV_FAKE_TRANSIENT   = "OFFICE_FAKE_TRANSIENT_RATE"   # 一時失敗（RPC 切断相当）の確率（0..1）
+ENV_FAKE_SEED        = "OFFICE_FAKE_SEED"
+ENV_FAKE_HANG        = "OFFICE_FAKE_HANG_RATE"        # 返ってこない（破損文書/モーダルダイアログ相当）確率（0..1）
+
+CONVERTER_BACKEND    = os.environ.get(ENV_BACKEND, "")   # "" / "com" / "ooxml" / "fake"
+FAKE_LATENCY_SEC     = 0.05
+FAKE_LATENCY_PER_KB  = 0.0
+FAKE_FAILURE_RATE    = 0.0
+FAKE_TRANSIENT_RATE  = 0.0
+FAKE_SEED            = 0
+FAKE_HANG_RATE       = 0.0
+FAKE_HANG_SEC        = 3600.0    # hang 時の待ち（watchdog に止めてもらう前提）
+FAKE_SLIDE_COUNT_MAX = 8
+
+WORD_EXTS = {".doc", ".docx", ".docm", ".rtf"}
+PPT_EXTS  = {".ppt", ".pptx", ".pptm"}
+
+RPC_E_DISCONNECTED = -2147417848
+
+# 1x1 透明 PNG（fake のスライド画像）
+_PNG_1PX = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000b4944415478da636000020000050001e9fadcd80000000049454e44ae426082")
+
+class ConverterUnsupported(RuntimeError):
+    """このバックエンドでは出せない出力（例: ooxml の PDF）。未実装のバグ（NotImplementedError）とは分ける"""
+
+class FakeConversionError(RuntimeError):
+    """fake: 恒久失敗（同じ入力なら何度やっても失敗）"""
+
+class FakeTransientError(RuntimeError):
+    """fake: 一時失敗。_is_transient_com_error が RPC 切断として扱う hresult を持つ"""
+    def __init__(self, msg: str):
+        super().__init__(RPC_E_DISCONNECTED, f"RPC_E_DISCONNECTED (fake) {msg}")
+        self.hresult = RPC_E_DISCONNECTED
+
+def _kind(src: Path) -> str:
+    return "ppt" if src.suffix.lower() in PPT_EXTS else "word"
+
+def _rel(child: Path, base: Path) -> str:
+    try:
+        return child.relative_to(base).as_posix()
+    except Exception:
+        return os.path.relpath(child, base).replace("\\", "/")
+
+# ==================== インターフェース ====================
+class OpenedDocument:
+    """
+    Converter.open() の戻り値。1 文書に対して複数の出力を取り出す。
+    出力はバックエンド毎に任意（出せないものは ConverterUnsupported のまま）
+    """
+    def __init__(self, src: Path):
+        self.src = Path(src)
+        self.kind = _kind(self.src)
+
+    def to_html(self, assets_base_dir: Path, html_base_dir: Path, asset_label: str) -> str:
+        raise ConverterUnsupported("to_html")
+
+    def to_text(self) -> List[str]:
+        raise ConverterUnsupported("to_text")
+
+    def slides(self) -> Dict[int, List[str]]:
+        raise ConverterUnsupported("slides")
+
+    def to_pdf(self, dst: Path) -> bool:
+        raise ConverterUnsupported("to_pdf")
+
+    def slide_images(self, assets_base_dir: Path, html_base_dir: Path, width_px: int) -> Dict[int, str]:
+        """{スライド番号: html_base_dir からの相対パス}"""
+        raise ConverterUnsupported("slide_images")
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "OpenedDocument":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class Converter(abc.ABC):
+    name = ""
+
+    def supports(self, src: Path) -> bool:
+        return Path(src).suffix.lower() in WORD_EXTS | PPT_EXTS
+
+    @abc.abstractmethod
+    def open(self, src: Path) -> OpenedDocument:
+        """src を開く（出力はまだ作らない）"""
+
+    def reset(self) -> None:
+        """一時障害の後に呼ぶ（COM ならアプリを作り直す）"""
+
+    def close(self) -> None:
+        pass
+
+# ==================== COM ====================
+class _ComDocument(OpenedDocument):
+    """文書は最初の出力で 1 回だけ開き、to_pdf / to_html / slides / slide_images で使い回す"""
+    def __init__(self, conv: "ComConverter", src: Path):
+        super().__init__(src)
+        self._conv = conv
+        self._session = None
+
+    def _open(self):
+        if self._session is None:
+            from combine.extract_paragraphs import _OfficeSession
+            self._session = _OfficeSession(self.src, self._conv._word, self._conv._ppt)
+        return self._session
+
+    def to_html(self, assets_base_dir, html_base_dir, asset_label):
+        return self._open().word_html(Path(assets_base_dir), Path(html_base_dir), asset_label)
+
+    def to_text(self):
+        from combine.html_row import extract_word_text
+        return extract_word_text(self.src, self._conv.word_app())
+
+    def slides(self):
+        slides = self._open().ppt_slides(Path("."), Path("."), extract_text=True, render_images=False)
+        return {no: e.get("paras", []) for no, e in slides.items()}
+
+    def to_pdf(self, dst):
+        return self._open().to_pdf(Path(dst))
+
+    def slide_images(self, assets_base_dir, html_base_dir, width_px):
+        slides = self._open().ppt_slides(Path(assets_base_dir), Path(html_base_dir),
+                                         extract_text=False, render_images=True, width_px=width_px)
+        return {no: e.get("img_rel") for no, e in slides.items()}
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+class ComConverter(Converter):
+    """既存の COM 実装をそのまま呼ぶ。アプリはプロセス内で使い回す（遅延起動）"""
+    name = "com"
+
+    def __init__(self):
+        from combine.extract_paragraphs import _PptManager, _WordManager
+        self._word = _WordManager()
+        self._ppt = _PptManager()
+
+    def word_app(self):
+        return self._word.ensure()
+
+    def ppt_app(self):
+        return self._ppt.ensure()
+
+    def open(self, src):
+        return _ComDocument(self, Path(src))
+
+    def reset(self):
+        self._word.reset(); self._ppt.reset()
+
+    def close(self):
+        self._word.close(); self._ppt.close()
+
+# ==================== OOXML ====================
+class _OoxmlDocument(OpenedDocument):
+    def to_html(self, assets_base_dir, html_base_dir, asset_label):
+        from combine.ooxml_word import extract_docx_html_with_images
+        return extract_docx_html_with_images(self.src, Path(assets_base_dir), Path(html_base_dir), asset_label)
+
+    def to_text(self):
+        from combine.ooxml_word import extract_docx_paragraphs
+        return extract_docx_paragraphs(self.src)
+
+    def slides(self):
+        from combine.ooxml_ppt import extract_pptx_slide_texts
+        return extract_pptx_slide_texts(self.src)
+
+class OoxmlConverter(Converter):
+    name = "ooxml"
+
+    def supports(self, src):
+        from combine.ooxml_ppt import is_ooxml_ppt
+        from combine.ooxml_word import is_ooxml_word
+        return is_ooxml_word(Path(src)) or is_ooxml_ppt(Path(src))
+
+    def open(self, src):
+        if not self.supports(src):
+            raise ConverterUnsupported(f"ooxml: {Path(src).suffix} は非対応")
+        return _OoxmlDocument(Path(src))
+
+# ==================== Fake ====================
+class _FakeDocument(OpenedDocument):
+    def __init__(self, conv: "FakeConverter", src: Path):
+        super().__init__(src)
+        self._conv = conv
+
+    def _paras(self) -> List[str]:
+        n = 1 + int(self._conv._roll(self.src, "paras", 0) * 10)
+        return [f"{self.src.stem} paragraph {i}" for i in range(1, n + 1)]
+
+    def to_html(self, assets_base_dir, html_base_dir, asset_label):
+        self._conv._step(self.src, "to_html")
+        return "\n".join(f"<p>{p}</p>" for p in self._paras())
+
+    def to_text(self):
+        self._conv._step(self.src, "to_text")
+        return self._paras()
+
+    def slides(self):
+        self._conv._step(self.src, "slides")
+        n = 1 + int(self._conv._roll(self.src, "slides_n", 0) * FAKE_SLIDE_COUNT_MAX)
+        return {i: [f"{self.src.stem} slide {i} text"] for i in range(1, n + 1)}
+
+    def to_pdf(self, dst):
+        self._conv._step(self.src, "to_pdf")
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+        Path(dst).write_bytes(b"%PDF-1.4\n% fake " + self.src.name.encode("utf-8", "replace") + b"\n%%EOF\n")
+        return True
+
+    def slide_images(self, assets_base_dir, html_base_dir, width_px):
+        self._conv._step(self.src, "slide_images")
+        n = 1 + int(self._conv._roll(self.src, "slides_n", 0) * FAKE_SLIDE_COUNT_MAX)
+        img_dir = Path(assets_base_dir) / "ppt" / self.src.stem
+        img_dir.mkdir(parents=True, exist_ok=True)
+        out: Dict[int, str] = {}
+        for i in range(1, n + 1):
+            p = img_dir / f"{self.src.stem}_slide{i:03d}.png"
+            p.write_bytes(_PNG_1PX)
+            out[i] = _rel(p, Path(html_base_dir))
+        return out
+
+class FakeConverter(Converter):
+    """
+    決定的な擬似コンバータ。
+    - 遅延: latency_sec + latency_per_kb × ファイルKB（time.sleep。COM 待ちと同じく CPU は使わない）
+    - 失敗: (seed, パス, 操作, 試行回数) のハッシュで決まる。同じ設定なら毎回同じファイルが同じ様に失敗する
+        * transient_rate: RPC 切断相当（再試行で通ることがある）
+        * failure_rate  : 恒久失敗
+        * hang_rate     : 操作が返ってこない（同じ文書は何度やっても止まる）
+    """
+    name = "fake"
+
+    def __init__(self,
+                 latency_sec: float = FAKE_LATENCY_SEC,
+                 latency_per_kb: float = FAKE_LATENCY_PER_KB,
+                 failure_rate: float = FAKE_FAILURE_RATE,
+                 transient_rate: float = FAKE_TRANSIENT_RATE,
+                 seed: int = FAKE_SEED,
+                 hang_rate: float = FAKE_HANG_RATE):
+        self.latency_sec = float(latency_sec)
+        self.latency_per_kb = float(latency_per_kb)
+        self.failure_rate = float(failure_rate)
+        self.transient_rate = float(transient_rate)
+        self.seed = int(seed)
+        self.hang_rate = float(hang_rate)
+        self._attempts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"opens": 0, "ops": 0, "failures": 0, "transient": 0, "resets": 0}
+
+    def _roll(self, src: Path, op: str, attempt: int) -> float:
+        h = hashlib.sha1(f"{self.seed}|{src}|{op}|{attempt}".encode("utf-8", "replace")).digest()
+        return int.from_bytes(h[:8], "big") / float(1 << 64)
+
+    def _step(self, src: Path, op: str) -> None:
+        with self._lock:
+            key = (str(src), op)
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+            self.stats["ops"] += 1
+        try:
+            kb = src.stat().st_size / 1024.0
+        except OSError:
+            kb = 0.0
+        delay = self.latency_sec + self.latency_per_kb * kb
+        if delay > 0:
+            time.sleep(delay)
+        if self._roll(src, "open", -2) < self.hang_rate:
+            time.sleep(FAKE_HANG_SEC)
+        if self._roll(src, op, -1) < self.failure_rate:
+            self.stats["failures"] += 1
+            raise FakeConversionError(f"fake: {op} 恒久失敗 {src.name}")
+        if self._roll(src, op, attempt) < self.transient_rate:
+            self.stats["transient"] += 1
+            raise FakeTransientError(f"{op} {src.name} attempt={attempt}")
+
+    def open(self, src):
+        with self._lock:
+            self.stats["opens"] += 1
+        return _FakeDocument(self, Path(src))
+
+    def reset(self):
+        self.stats["resets"] += 1
+
+# ==================== レジストリ ====================
+_REGISTRY: Dict[str, Callable[..., Converter]] = {}
+_INSTANCES: Dict[str, Converter] = {}
+
+def register_backend(name: str, factory: Callable[..., Converter]) -> None:
+    _REGISTRY[name] = factory
+    _INSTANCES.pop(name, None)
+
+def available_backends() -> List[str]:
+    return sorted(_REGISTRY)
+
+def _fake_from_env() -> FakeConverter:
+    env = os.environ
+    return FakeConverter(
+        latency_sec=float(env.get(ENV_FAKE_LATENCY, FAKE_LATENCY_SEC)),
+        latency_per_kb=float(env.get(ENV_FAKE_LATENCY_KB, FAKE_LATENCY_PER_KB)),
+        failure_rate=float(env.get(ENV_FAKE_FAILURE, FAKE_FAILURE_RATE)),
+        transient_rate=float(env.get(ENV_FAKE_TRANSIENT, FAKE_TRANSIENT_RATE)),
+        seed=int(env.get(ENV_FAKE_SEED, FAKE_SEED)),
+        hang_rate=float(env.get(ENV_FAKE_HANG, FAKE_HANG_RATE)),
+    )
+
+register_backend("com", ComConverter)
+register_backend("ooxml", OoxmlConverter)
+register_backend("fake", _fake_from_env)
+
+def active_backend_name() -> str:
+    return (os.environ.get(ENV_BACKEND) or CONVERTER_BACKEND or "").strip().lower()
+
+def get_converter(name: Optional[str] = None) -> Optional[Converter]:
+    """
+    プロセス内で 1 つのコンバータを使い回す。name 省略時は active_backend_name()。
+    空（従来経路）なら None。
+    """
+    key = (name if name is not None else active_backend_name()).strip().lower()
+    if not key:
+        return None
+    conv = _INSTANCES.get(key)
+    if conv is None:
+        factory = _REGISTRY.get(key)
+        if factory is None:
+            raise ValueError(f"unknown converter backend: {key!r} (available: {available_backends()})")
+        conv = factory()
+        _INSTANCES[key] = conv
+    return conv
+
+def use_backend(name: str, **fake_options) -> None:
+    """
+    バックエンドを選び、子プロセス（ProcessPoolExecutor / mp.Process）にも環境変数で伝える。
+    fake_options: latency_sec / latency_per_kb / failure_rate / transient_rate / seed / hang_rate
+    """
+    os.environ[ENV_BACKEND] = name
+    env_keys = {"latency_sec": ENV_FAKE_LATENCY, "latency_per_kb": ENV_FAKE_LATENCY_KB,
+                "failure_rate": ENV_FAKE_FAILURE, "transient_rate": ENV_FAKE_TRANSIENT, "seed": ENV_FAKE_SEED,
+                "hang_rate": ENV_FAKE_HANG}
+    for k, v in fake_options.items():
+        if k not in env_keys:
+            raise TypeError(f"unknown option: {k}")
+        os.environ[env_keys[k]] = str(v)
+    _INSTANCES.clear()
+
+def close_converters() -> None:
+    for conv in list(_INSTANCES.values()):
+        try: conv.close()
+        except Exception: pass
+    _INSTANCES.clear()
+
+def call_with_retry(conv: Converter, fn: Callable[[], object], src: Path, label: str,
+                    is_transient: Callable[[Exception], bool], retries: int = 1):
+    """
+    fn() を実行し、is_transient が真の例外なら conv.reset() して再試行（COM 版の _extract_*_safe_* と同じ間隔）。
+    """
+    delay = 0.5
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if is_transient(e) and attempt < retries:
+                print(f"[{label} reconnect:{conv.name}] {Path(src).name} / retry {attempt+1}")
+                conv.reset(); time.sleep(delay); delay = min(delay * 2, 3.0); continue
+            raise
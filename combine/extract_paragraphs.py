@@ -1310,18 +1310,95 @@ Office(Word/PPT) → HTML 結合器（最終統合／高速化版）
 - PPT : 各スライドを PNG 化して <img> 埋め込み（テキスト抽出はトグル）
 """
 
-import os, re, html, time, random, subprocess, shutil, uuid, hashlib
+import os, re, html, time, random, subprocess, shutil, uuid, hashlib, zipfile, queue, threading
 from pathlib import Path
-from typing import Iterable, List, Dict, Tuple, Optional
-
-import pythoncom
-from win32com.client import gencache, DispatchEx
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterable, List, Dict, Tuple, Optional
+
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+try:
+    import pythoncom
+    from win32com.client import gencache, DispatchEx
+except ImportError:   # Windows 以外: COM 無し（ooxml / fake バックエンドのみ）
+    pythoncom = None
+    gencache = DispatchEx = None
+import multiprocessing as mp
+from contextlib import nullcontext
 from urllib.parse import urlparse, unquote
 
+from combine.asset_store import (
+    AssetStore,
+    cas_enabled,
+    store_for,
+    )
+
+from combine.slide_images import (
+    SlideImagePool,
+    postprocess_signature,
+    )
+
+from combine.word_html_compact import (
+    compact_word_html,
+    )
+
+from combine.part_writer import (
+    OrderedPartWriter,
+    PartWriter,
+    )
+
+from combine.ooxml_word import (
+    extract_docx_html_with_images,
+    is_ooxml_word,
+    )
+
+from combine.ooxml_ppt import (
+    extract_pptx_slides,
+    is_ooxml_ppt,
+    )
+
+from combine.converter_backends import (
+    Converter,
+    active_backend_name,
+    call_with_retry,
+    close_converters,
+    get_converter,
+    )
+
+from combine.conversion_cache import (
+    ConversionCache,
+    )
+
+from combine.office_watchdog import (
+    WorkerSupervisor,
+    deadline_for,
+    report_office_app,
+    set_office_pid_reporter,
+    )
+
+from combine.convert_from_get_files_to_PDF import (
+    _convert_ppt_to_pdf,
+    _export_ppt_pres_to_pdf,
+    _export_word_doc_to_pdf,
+    _reserve_output_path,
+    ppWindowMinimized,
+    )
+
+from download_doc.result_manifest import (
+    write_manifest,
+    )
+
 # ==================== 調整フラグ ====================
 BATCH_SIZE_DEFAULT      = 5          # 1 HTML の最大収録件数
-MAX_FILE_KB_DEFAULT     = 1500       # 閾値超はスキップ
+STREAM_AGENTS_DEFAULT   = 4          # 逐次投入版の常駐ワーカー数の上限
+POOL_WORKERS_MAX        = 8          # 常駐ワーカー数の上限（実際は コア数・空きメモリ とも比べて小さい方）
+POOL_MEM_PER_WORKER_MB  = 700        # 1 ワーカー（Word/PowerPoint 各 1 インスタンス）あたりの見込み
+POOL_MEM_RESERVE_MB     = 2048       # OS/他プロセス用に残す空きメモリ
+MAX_FILE_KB_DEFAULT     = 1500       # 閾値超は大容量レーンへ（スキップはしない）
+LARGE_PAGES_MIN         = 150        # ページ/スライド数がこれ以上でも大容量レーンへ（OOXML で分かる場合のみ）
+LARGE_LANE_WORKERS      = 1          # 大容量レーンの同時数（通常レーンとは別枠）
+LARGE_LANE_TIMEOUT_SEC  = 900        # 大容量レーンの 1 文書あたり期限の上限（期限はサイズ比例: office_watchdog.deadline_for）
+KB_PER_PAGE             = 40         # 並べ替え用: 1 ページ(スライド)を何 KB 相当とみなすか
 DEFAULT_RETRIES         = 1          # COM切断時の再試行回数（各ファイル）
 EXCLUSIVE_INSTANCE      = True       # True: DispatchEx で専用インスタンス化
 DEFER_QUIT_TO_PARENT    = True       # True: ワーカーで Quit しない（最後に親が Kill）
@@ -1330,6 +1407,11 @@ KILL_AT_END             = True       # 実行終了後に Office Kill
 EXTRACT_PPT_TEXT        = True       # PPTのテキスト抽出（False なら画像のみで最速）
 PPT_TARGET_WIDTH_PX     = 1600       # スライド画像の横幅
 WORD_MINIFY_INLINE_CSS  = False      # TrueでWordの余計なstyleを粗く間引く（必要なら）
+WORD_COMPACT_HTML       = True       # Word HTML を 1 パスで軽量化（Mso/名前空間/空 span 除去・同書式 span 結合・style 集約）
+WORD_BACKEND            = "ooxml"    # "ooxml": .docx/.docm は ZIP を直接読む（.doc/.rtf と失敗時のみ COM） / "com": 常に Word
+PPT_BACKEND             = "ooxml"    # "ooxml": .pptx/.pptm のテキストは ZIP を直接読む / "com": 図形を COM で走査
+PPT_RENDER_IMAGES       = True       # スライド PNG 化（COM 必須）。False なら .pptx/.pptm は PowerPoint を起動しない
+CONVERSION_CACHE        = True       # 内容ハッシュ＋設定で変換結果を再利用（未変更の文書は Office を起動しない）
 
 # ==================== 定数/拡張子 ====================
 WORD_EXTS = {".doc", ".docx", ".docm", ".rtf"}
@@ -1489,16 +1571,14 @@ def _iter_shape_texts_fast(shape) -> Iterable[str]:
     except Exception:
         pass
 
-def extract_ppt_with_images(src: Path, ppt_app, assets_base_dir: Path, html_base_dir: Path, target_width_px: int) -> Dict[int, Dict[str, object]]:
-    created_here = False
-    if ppt_app is None:
-        ppt_app = _get_ppt_app(); created_here = True
+def _open_ppt_pres(ppt_app, src: Path):
+    return ppt_app.Presentations.Open(FileName=str(src), WithWindow=False, ReadOnly=True)
 
-    pres = None
+def _ppt_pres_slides(pres, src: Path, assets_base_dir: Path, html_base_dir: Path, target_width_px: int,
+                     extract_text: bool = EXTRACT_PPT_TEXT, render_images: bool = True) -> Dict[int, Dict[str, object]]:
+    """開いているプレゼンテーションから {no: {"img_rel":..., "paras":[...]}}（PNG / テキストはそれぞれ任意）"""
     result: Dict[int, Dict[str, object]] = {}
-    try:
-        pres = ppt_app.Presentations.Open(FileName=str(src), WithWindow=False, ReadOnly=True)
-
+    if render_images:
         ps = pres.PageSetup
         sw, sh = float(ps.SlideWidth), float(ps.SlideHeight)
         width_px  = int(target_width_px)
@@ -1507,31 +1587,40 @@ def extract_ppt_with_images(src: Path, ppt_app, assets_base_dir: Path, html_base
         img_dir = assets_base_dir / "ppt" / src.stem
         img_dir.mkdir(parents=True, exist_ok=True)
 
-        for s_idx in range(1, pres.Slides.Count + 1):
-            slide = pres.Slides(s_idx)
-            img_name = f"{src.stem}_slide{s_idx:03d}.png"
-            img_path = img_dir / img_name
+    for s_idx in range(1, pres.Slides.Count + 1):
+        slide = pres.Slides(s_idx)
+        entry: Dict[str, object] = {}
+        if render_images:
+            img_path = img_dir / f"{src.stem}_slide{s_idx:03d}.png"
             slide.Export(str(img_path), "PNG", width_px, height_px)
+            entry["img_rel"] = _safe_rel(img_path, html_base_dir)
+
+        paras: List[str] = []
+        if extract_text:
+            shapes = slide.Shapes
+            for j in range(1, shapes.Count + 1):
+                for raw in _iter_shape_texts_fast(shapes(j)):
+                    if raw: paras.extend(_split_paragraphs_fast(raw))
+            paras = _ensure_paragraphs_list(paras)
+        entry["paras"] = paras
+        result[s_idx] = entry
+    return result
 
-            paras: List[str] = []
-            if EXTRACT_PPT_TEXT:
-                shapes = slide.Shapes
-                for j in range(1, shapes.Count + 1):
-                    for raw in _iter_shape_texts_fast(shapes(j)):
-                        if raw: paras.extend(_split_paragraphs_fast(raw))
-                paras = _ensure_paragraphs_list(paras)
-
-            result[s_idx] = {
-                "img_rel": _safe_rel(img_path, html_base_dir),
-                "paras": paras
-            }
+def extract_ppt_with_images(src: Path, ppt_app, assets_base_dir: Path, html_base_dir: Path, target_width_px: int, extract_text: bool = EXTRACT_PPT_TEXT) -> Dict[int, Dict[str, object]]:
+    created_here = False
+    if ppt_app is None:
+        ppt_app = _get_ppt_app(); created_here = True
+
+    pres = None
+    try:
+        pres = _open_ppt_pres(ppt_app, src)
+        return _ppt_pres_slides(pres, src, assets_base_dir, html_base_dir, target_width_px, extract_text)
     finally:
         if pres is not None:
             pres.Close()
         if created_here and not DEFER_QUIT_TO_PARENT and ppt_app is not None:
             try: ppt_app.Quit()
             except Exception: pass
-    return result
 
 # ==================== Word：画像を“その位置”で埋め込む ====================
 def _word_set_weboptions(doc) -> None:
@@ -1571,15 +1660,22 @@ def _resolve_candidate_path(u: str, tmp_dir: Path) -> Optional[Path]:
         return q2
     return None
 
-def _rewrite_and_copy_all_image_srcs(html_text: str, tmp_dir: Path, dest_img_dir: Path, html_base_dir: Path) -> tuple[str, int]:
-    dest_img_dir.mkdir(parents=True, exist_ok=True)
-    dest_rel = _safe_rel(dest_img_dir, html_base_dir).rstrip("/")
+def _rewrite_and_copy_all_image_srcs(html_text: str, tmp_dir: Path, dest_img_dir: Path, html_base_dir: Path,
+                                     store: Optional[AssetStore] = None) -> tuple[str, int]:
+    """store があれば画像は cas へ（内容ハッシュ名）、無ければ dest_img_dir へ連番回避でコピー"""
+    if store is None:
+        dest_img_dir.mkdir(parents=True, exist_ok=True)
+        dest_rel = _safe_rel(dest_img_dir, html_base_dir).rstrip("/")
 
     copied = 0
     repl_map: Dict[str, str] = {}
 
     def do_copy(src_path: Path) -> str:
         nonlocal copied
+        if store is not None:
+            dst = store.add_file(src_path)
+            copied += 1
+            return _safe_rel(dst, html_base_dir)
         name = src_path.name
         dst = dest_img_dir / name
         if dst.exists():
@@ -1619,35 +1715,49 @@ def _minify_word_inline_styles(body_inner: str) -> str:
     body_inner = re.sub(r'(?is)\s*style="[^"]*"', lambda m: ' style="margin:0;padding:0;"', body_inner)
     return body_inner
 
-def extract_word_html_with_images(src: Path, word_app, assets_base_dir: Path, html_base_dir: Path, asset_label: str) -> str:
-    created_here = False
-    if word_app is None:
-        word_app = _get_word_app(); created_here = True
+def _open_word_doc(word_app, src: Path):
+    return word_app.Documents.Open(
+        FileName=str(src),
+        ReadOnly=True, AddToRecentFiles=False,
+        OpenAndRepair=False, ConfirmConversions=False, NoEncodingDialog=True,
+        Visible=False
+    )
 
+def _word_doc_save_html(doc, src: Path, assets_base_dir: Path) -> Path:
+    """
+    開いている文書を一時フォルダへフィルタ HTML 保存し、そのフォルダを返す。
+    SaveAs2 の後は doc が HTML 側を指すので、PDF 等は先に出しておき、この後は閉じること。
+    """
     tmp_dir = assets_base_dir / f"~wordtmp_{os.getpid()}_{uuid.uuid4().hex[:8]}"
     tmp_dir.mkdir(parents=True, exist_ok=True)
-    tmp_html = tmp_dir / f"{src.stem}.htm"
+    _word_set_weboptions(doc)
+    doc.SaveAs2(FileName=str(tmp_dir / f"{src.stem}.htm"), FileFormat=wdFormatFilteredHTML, Encoding=wdEncodingUTF8)
+    return tmp_dir
 
-    # ラベルで衝突回避（同stemでも別フォルダに）
-    dest_img_dir = assets_base_dir / "word" / asset_label
-    dest_img_dir.mkdir(parents=True, exist_ok=True)
+def extract_word_html_with_images(src: Path, word_app, assets_base_dir: Path, html_base_dir: Path, asset_label: str) -> str:
+    created_here = False
+    if word_app is None:
+        word_app = _get_word_app(); created_here = True
 
     doc = None
     try:
-        doc = word_app.Documents.Open(
-            FileName=str(src),
-            ReadOnly=True, AddToRecentFiles=False,
-            OpenAndRepair=False, ConfirmConversions=False, NoEncodingDialog=True,
-            Visible=False
-        )
-        _word_set_weboptions(doc)
-        doc.SaveAs2(FileName=str(tmp_html), FileFormat=wdFormatFilteredHTML, Encoding=wdEncodingUTF8)
+        doc = _open_word_doc(word_app, src)
+        tmp_dir = _word_doc_save_html(doc, src, assets_base_dir)
     finally:
         if doc is not None:
             doc.Close(False)
         if created_here and not DEFER_QUIT_TO_PARENT and word_app is not None:
             try: word_app.Quit()
             except Exception: pass
+    return _word_html_postprocess(src, tmp_dir, assets_base_dir, html_base_dir, asset_label)
+
+def _word_html_postprocess(src: Path, tmp_dir: Path, assets_base_dir: Path, html_base_dir: Path, asset_label: str) -> str:
+    """一時フォルダの HTML → body 断片（画像は assets/word/<label>/ へ移して相対参照に置換）。tmp_dir は消す"""
+    tmp_html = tmp_dir / f"{src.stem}.htm"
+
+    # ラベルで衝突回避（同stemでも別フォルダに）。cas 使用時は内容ハッシュ名なので衝突しない
+    store = store_for(assets_base_dir)
+    dest_img_dir = assets_base_dir / "word" / asset_label
 
     html_text = ""
     for cand in (tmp_html, tmp_dir / f"{src.stem}.html"):
@@ -1659,9 +1769,19 @@ def extract_word_html_with_images(src: Path, word_app, assets_base_dir: Path, ht
         except Exception: pass
         return ""
 
-    html_text, copied_cnt = _rewrite_and_copy_all_image_srcs(html_text, tmp_dir, dest_img_dir, html_base_dir)
-    if copied_cnt == 0:
+    html_text, copied_cnt = _rewrite_and_copy_all_image_srcs(html_text, tmp_dir, dest_img_dir, html_base_dir, store)
+    if copied_cnt == 0 and store is not None:
+        # 予備：*_files の各ファイルを cas へ + ファイル単位でパス置換
+        images_src_dir = tmp_dir / f"{src.stem}_files"
+        if images_src_dir.exists():
+            for f in images_src_dir.iterdir():
+                if f.is_file():
+                    try: rel = _safe_rel(store.add_file(f), html_base_dir)
+                    except Exception: continue
+                    html_text = re.sub(rf'(?i){re.escape(src.stem)}_files/{re.escape(f.name)}', rel, html_text)
+    elif copied_cnt == 0:
         # 予備：*_files 丸ごとコピー + パス置換
+        dest_img_dir.mkdir(parents=True, exist_ok=True)
         images_src_dir = tmp_dir / f"{src.stem}_files"
         if images_src_dir.exists():
             for f in images_src_dir.iterdir():
@@ -1676,7 +1796,9 @@ def extract_word_html_with_images(src: Path, word_app, assets_base_dir: Path, ht
     m = re.search(r"(?is)<body[^>]*>(.*)</body>", html_text)
     body_inner = m.group(1) if m else html_text
 
-    if WORD_MINIFY_INLINE_CSS:
+    if WORD_COMPACT_HTML:
+        body_inner = compact_word_html(body_inner)
+    elif WORD_MINIFY_INLINE_CSS:
         body_inner = _minify_word_inline_styles(body_inner)
 
     try:
@@ -1687,51 +1809,71 @@ def extract_word_html_with_images(src: Path, word_app, assets_base_dir: Path, ht
     return body_inner
 
 # ==================== HTML 生成 ====================
+_HTML_HEAD = "\n".join([
+    "<!DOCTYPE html>",
+    '<html lang="en">',
+    '<meta charset="UTF-8">',
+    "<title>抽出テキスト</title>",
+    "<style>img{max-width:100%;height:auto;display:block;margin:.4rem 0;} ul{margin:.3rem 1.2rem;} h2{margin-top:1.2rem;} .word-block,.slide-block{border:1px solid #e3e3e3;padding:.6rem;border-radius:.5rem;}</style>",
+    "<body>",
+])
+_HTML_FOOT = "</body></html>"
+
+def entry_block_html(file_disp: str, data: Dict) -> str:
+    """1 文書分のブロック（paragraphs_to_html / 逐次書き出しの共通部品）"""
+    parts: List[str] = [f"<h2>{html.escape(file_disp)}</h2>"]
+    if data.get("type") == "ppt":
+        slides = data.get("slides", {})
+        for slide_no in sorted(slides.keys()):
+            entry = slides[slide_no]
+            img_rel = entry.get("img_rel")
+            paras   = entry.get("paras", [])
+            parts.append(f"<div class='slide-block'><h3>Slide {slide_no}</h3>")
+            if img_rel and entry.get("thumb_rel"):
+                parts.append(f"<a href='{html.escape(img_rel)}'><img src='{html.escape(entry['thumb_rel'])}'"
+                             f" width='{entry['tw']}' height='{entry['th']}' loading='lazy' alt='slide {slide_no}'></a>")
+            elif img_rel and entry.get("w"):
+                parts.append(f"<img src='{html.escape(img_rel)}' width='{entry['w']}' height='{entry['h']}'"
+                             f" loading='lazy' alt='slide {slide_no}'>")
+            elif img_rel:
+                parts.append(f"<img src='{html.escape(img_rel)}' alt='slide {slide_no}'>")
+            if paras:
+                parts.append("<ul>")
+                for p in paras:
+                    li = html.escape(p).replace("\n", "<br>")
+                    parts.append(f"<li>{li}</li>")
+                parts.append("</ul>")
+            parts.append("</div>")
+    elif "html" in data:
+        parts.append("<div class='word-block'>")
+        parts.append(data["html"])
+        parts.append("</div>")
+    else:
+        paras = data.get("paras", [])
+        if paras:
+            parts.append("<ul>")
+            for p in paras:
+                li = html.escape(p).replace("\n", "<br>")
+                parts.append(f"<li>{li}</li>")
+            parts.append("</ul>")
+    return "\n".join(parts)
+
 def paragraphs_to_html(entries: List[Tuple[str, Dict]], html_base_dir: Path) -> str:
     """
     entries: [(display_name, data_dict), ...]
       - Word: data_dict={"type":"word","html": "<body内HTML>"}
       - PPT : data_dict={"type":"ppt","slides": {no: {"img_rel":..., "paras":[...]}}}
+              後処理済みなら w/h（と thumb_rel/tw/th）も入る → サイズ指定・サムネイル表示
       - 旧Wordテキスト: data_dict={"paras":[...]}
+    変換パイプライン本体は _part_writer で 1 文書ずつ追記する（これは一括版）
     """
-    parts: List[str] = []
-    parts.append("<!DOCTYPE html>")
-    parts.append('<html lang="en">')
-    parts.append('<meta charset="UTF-8">')
-    parts.append("<title>抽出テキスト</title>")
-    parts.append("<style>img{max-width:100%;height:auto;display:block;margin:.4rem 0;} ul{margin:.3rem 1.2rem;} h2{margin-top:1.2rem;} .word-block,.slide-block{border:1px solid #e3e3e3;padding:.6rem;border-radius:.5rem;}</style>")
-    parts.append("<body>")
-
-    for file_disp, data in entries:
-        parts.append(f"<h2>{html.escape(file_disp)}</h2>")
-        if data.get("type") == "ppt":
-            slides = data.get("slides", {})
-            for slide_no in sorted(slides.keys()):
-                entry = slides[slide_no]
-                img_rel = entry.get("img_rel")
-                paras   = entry.get("paras", [])
-                parts.append(f"<div class='slide-block'><h3>Slide {slide_no}</h3>")
-                if img_rel:
-                    parts.append(f"<img src='{html.escape(img_rel)}' alt='slide {slide_no}'>")
-                if paras:
-                    parts.append("<ul>")
-                    for p in paras:
-                        parts.append(f"<li>{html.escape(p).replace('\\n','<br>')}</li>")
-                    parts.append("</ul>")
-                parts.append("</div>")
-        elif "html" in data:
-            parts.append("<div class='word-block'>")
-            parts.append(data["html"])
-            parts.append("</div>")
-        else:
-            paras = data.get("paras", [])
-            if paras:
-                parts.append("<ul>")
-                for p in paras:
-                    parts.append(f"<li>{html.escape(p).replace('\\n','<br>')}</li>")
-                parts.append("</ul>")
-    parts.append("</body></html>")
-    return "\n".join(parts)
+    return "\n".join([_HTML_HEAD] + [entry_block_html(d, data) for d, data in entries] + [_HTML_FOOT])
+
+def _part_writer(out_dir: Path, out_stem: str, batch_size: int,
+                 post: Optional[SlideImagePool] = None) -> OrderedPartWriter:
+    """*_partN.html の逐次ライター（入力順に並べる。PPT はスライド画像の後処理を待ってから書く）"""
+    writer = PartWriter(out_dir, out_stem, batch_size, _HTML_HEAD, _HTML_FOOT, entry_block_html)
+    return OrderedPartWriter(writer, post.finish_entry if post is not None else None)
 
 # ==================== 入力の正規化・分割 ====================
 def _normalize_items(path_lst: Iterable[str | Path | Tuple[str, str]]) -> List[Path]:
@@ -1744,21 +1886,42 @@ def _normalize_items(path_lst: Iterable[str | Path | Tuple[str, str]]) -> List[P
         out.append(p)
     return out
 
-def _prefilter_items(paths: List[Path], max_kb: int = MAX_FILE_KB_DEFAULT) -> List[Path]:
+def _ooxml_page_count(p: Path) -> Optional[int]:
+    """docProps/app.xml の Pages / Slides（保存時に Office が書く値）。無ければ None"""
+    if not (is_ooxml_word(p) or is_ooxml_ppt(p)):
+        return None
+    try:
+        with zipfile.ZipFile(p) as zf:
+            if "docProps/app.xml" not in zf.NameToInfo:
+                return None
+            m = re.search(rb"<(?:\w+:)?(?:Pages|Slides)>(\d+)<", zf.read("docProps/app.xml"))
+            return int(m.group(1)) if m else None
+    except Exception:
+        return None
+
+def _plan_items(paths: List[Path]) -> Tuple[List[Path], Dict[str, Tuple[int, Optional[int]]]]:
+    """存在する対応拡張子だけを残し、{path: (バイト数, ページ/スライド数)} を添えて返す"""
     ok: List[Path] = []
+    meta: Dict[str, Tuple[int, Optional[int]]] = {}
     for p in paths:
         if not p.exists(): continue
         ext = p.suffix.lower()
         if ext not in ALLOWED_EXTS: continue
         try:
             size = p.stat().st_size
-            if size > max_kb * 1024:
-                print(f"[SKIP size>{max_kb}KB] {p} ({size/1024:.1f} KB)")
-                continue
         except Exception as e:
             print(f"[SKIP stat error] {p} / {e}"); continue
         ok.append(p)
-    return ok
+        meta[str(p)] = (size, _ooxml_page_count(p))
+    return ok, meta
+
+def _lane_of(meta: Tuple[int, Optional[int]], max_kb: int) -> str:
+    size, pages = meta
+    return "L" if size > max_kb * 1024 or (pages or 0) >= LARGE_PAGES_MIN else "W"
+
+def _cost(meta: Tuple[int, Optional[int]]) -> float:
+    size, pages = meta
+    return max(size / 1024.0, (pages or 0) * KB_PER_PAGE)
 
 def _chunk(lst: List[Path], n: int) -> List[List[Path]]:
     if n <= 0: return [lst[:]]
@@ -1783,7 +1946,9 @@ def _is_transient_com_error(exc: Exception) -> bool:
 class _WordManager:
     def __init__(self): self.app = None
     def ensure(self):
-        if self.app is None: self.app = _get_word_app()
+        if self.app is None:
+            self.app = _get_word_app()
+            report_office_app(self.app)
         return self.app
     def reset(self):
         try:
@@ -1799,7 +1964,9 @@ class _WordManager:
 class _PptManager:
     def __init__(self): self.app = None
     def ensure(self):
-        if self.app is None: self.app = _get_ppt_app()
+        if self.app is None:
+            self.app = _get_ppt_app()
+            report_office_app(self.app)
         return self.app
     def reset(self):
         try:
@@ -1812,135 +1979,714 @@ class _PptManager:
         if DEFER_QUIT_TO_PARENT: return
         self.reset()
 
-# ==================== セーフ抽出ラッパ ====================
-def _extract_word_safe_html(src: Path, mgr: _WordManager, assets_base_dir: Path, html_base_dir: Path, asset_label: str, retries: int = DEFAULT_RETRIES) -> str:
-    delay = 0.5
-    for attempt in range(retries + 1):
+# ==================== 1 文書 1 セッション ====================
+class _OfficeSession:
+    """
+    1 文書を Word / PowerPoint で 1 回だけ開き、PDF・HTML・スライド PNG を同じセッションで取り出す。
+    - 開くのは最初に COM が要った時（ooxml で済む出力だけなら Office は起動しない）
+    - RPC 切断系はアプリを作り直して開き直し、DEFAULT_RETRIES 回まで再試行
+    - Word は SaveAs2(HTML) で doc が HTML 側に切り替わるので、HTML 保存後は閉じる（PDF は先に出す）
+    """
+    def __init__(self, src: Path, word_mgr: _WordManager, ppt_mgr: _PptManager):
+        self.src = src
+        self.is_ppt = src.suffix.lower() in PPT_EXTS
+        self._mgr = ppt_mgr if self.is_ppt else word_mgr
+        self._obj = None
+        self.opens = 0
+
+    def _handle(self):
+        if self._obj is None:
+            app = self._mgr.ensure()
+            self._obj = _open_ppt_pres(app, self.src) if self.is_ppt else _open_word_doc(app, self.src)
+            self.opens += 1
+        return self._obj
+
+    def _run(self, fn):
+        delay = 0.5
+        for attempt in range(DEFAULT_RETRIES + 1):
+            try:
+                return fn(self._handle())
+            except Exception as e:
+                if _is_transient_com_error(e) and attempt < DEFAULT_RETRIES:
+                    print(f"[{'PPT' if self.is_ppt else 'WORD'} reconnect] {self.src.name} / retry {attempt+1}")
+                    self._obj = None
+                    self._mgr.reset(); time.sleep(delay); delay = min(delay * 2, 3.0); continue
+                raise
+
+    def to_pdf(self, dst: Path) -> bool:
+        if not self.is_ppt:
+            try:
+                self._run(lambda doc: _export_word_doc_to_pdf(doc, dst))
+                return True
+            except Exception as e:
+                print(f"    └─Word変換失敗: {self.src.name} → {e}", flush=True)
+                return False
+        app = self._mgr.ensure()
+        try:
+            app.Visible = True
+            app.WindowState = ppWindowMinimized
+        except Exception:
+            pass
+        try:
+            self._run(lambda pres: _export_ppt_pres_to_pdf(pres, dst))
+            return True
+        except Exception:
+            # 非表示で開いた状態では書き出せない資料がある → 従来どおりウィンドウ付きで開き直す
+            return _convert_ppt_to_pdf(self._mgr.ensure(), self.src, dst)
+
+    def word_html(self, assets_base_dir: Path, html_base_dir: Path, asset_label: str) -> str:
+        tmp_dir = self._run(lambda doc: _word_doc_save_html(doc, self.src, assets_base_dir))
+        self.close()
+        return _word_html_postprocess(self.src, tmp_dir, assets_base_dir, html_base_dir, asset_label)
+
+    def ppt_slides(self, assets_base_dir: Path, html_base_dir: Path,
+                   extract_text: bool = EXTRACT_PPT_TEXT, render_images: bool = True,
+                   width_px: Optional[int] = None) -> Dict[int, Dict[str, object]]:
+        return self._run(lambda pres: _ppt_pres_slides(pres, self.src, assets_base_dir, html_base_dir,
+                                                       width_px or PPT_TARGET_WIDTH_PX, extract_text, render_images))
+
+    def close(self) -> None:
+        if self._obj is None:
+            return
+        try:
+            if self.is_ppt: self._obj.Close()
+            else: self._obj.Close(False)
+        except Exception:
+            pass
+        self._obj = None
+
+# ==================== 抽出（ooxml 優先 → COM） ====================
+def _extract_word_html_auto(src: Path, session: _OfficeSession, assets_base_dir: Path, html_base_dir: Path, asset_label: str) -> str:
+    """WORD_BACKEND="ooxml" なら .docx/.docm は Word を起動せずに処理。読めなければ COM へ"""
+    if WORD_BACKEND == "ooxml" and is_ooxml_word(src):
+        try:
+            return extract_docx_html_with_images(src, assets_base_dir, html_base_dir, asset_label)
+        except Exception as e:
+            print(f"[WORD ooxml→COM] {src.name} / {e}")
+    return session.word_html(assets_base_dir, html_base_dir, asset_label)
+
+def _extract_ppt_auto(src: Path, session: _OfficeSession, assets_base_dir: Path, html_base_dir: Path,
+                      render_images: bool = PPT_RENDER_IMAGES,
+                      errors: Optional[List[str]] = None) -> Dict[int, Dict[str, object]]:
+    """
+    PPT_BACKEND="ooxml" なら .pptx/.pptm のテキストは XML から取り、COM は PNG 描画だけに使う。
+    render_images=False なら .pptx/.pptm では PowerPoint を起動しない。
+    PNG 描画だけ失敗した時は読めたテキストのスライドを返し、理由を errors に足す（呼び出し側で partial）
+    """
+    if not (PPT_BACKEND == "ooxml" and is_ooxml_ppt(src)):
+        return session.ppt_slides(assets_base_dir, html_base_dir, EXTRACT_PPT_TEXT, render_images)
+    try:
+        slides = extract_pptx_slides(src) if EXTRACT_PPT_TEXT else {}
+    except Exception as e:
+        print(f"[PPT ooxml→COM] {src.name} / {e}")
+        return session.ppt_slides(assets_base_dir, html_base_dir, EXTRACT_PPT_TEXT, render_images)
+    if render_images:
         try:
-            return extract_word_html_with_images(src, mgr.ensure(), assets_base_dir, html_base_dir, asset_label)
+            rendered = session.ppt_slides(assets_base_dir, html_base_dir, extract_text=False, render_images=True)
         except Exception as e:
-            if _is_transient_com_error(e) and attempt < retries:
-                print(f"[WORD reconnect] {src.name} / retry {attempt+1}")
-                mgr.reset(); time.sleep(delay); delay = min(delay * 2, 3.0); continue
-            raise
-
-def _extract_ppt_safe_images(src: Path, mgr: _PptManager, assets_base_dir: Path, html_base_dir: Path, retries: int = DEFAULT_RETRIES) -> Dict[int, Dict[str, object]]:
-    delay = 0.5
-    for attempt in range(retries + 1):
+            print(f"[PPT PNG NG] {src.name} / {e}（テキストのみ）")
+            if errors is not None:
+                errors.append(f"png: {e}")
+            return slides
+        for no, entry in rendered.items():
+            slides.setdefault(no, {"paras": []})["img_rel"] = entry.get("img_rel")
+    return slides
+
+def _extract_entry_with_backend(conv: Converter, doc, src: Path, assets_base_dir: Path, html_base_dir: Path,
+                                render_images: bool = PPT_RENDER_IMAGES,
+                                errors: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    converter_backends 経由の 1 文書分（Word→html / PPT→slides＋任意で PNG）。doc は conv.open() 済みのもの。
+    PNG 描画だけ失敗した時はテキストのスライドを残し、理由を errors に足す
+    """
+    if doc.kind == "word":
+        label = f"{src.stem}_{_short_hash(str(src.resolve()))}"
+        frag = call_with_retry(conv, lambda: doc.to_html(assets_base_dir, html_base_dir, label),
+                               src, "WORD", _is_transient_com_error, DEFAULT_RETRIES)
+        return {"type": "word", "html": frag} if frag else None
+    texts = call_with_retry(conv, doc.slides, src, "PPT", _is_transient_com_error, DEFAULT_RETRIES) \
+        if EXTRACT_PPT_TEXT else {}
+    slides: Dict[int, Dict[str, object]] = {no: {"paras": paras} for no, paras in texts.items()}
+    if render_images:
         try:
-            return extract_ppt_with_images(src, mgr.ensure(), assets_base_dir, html_base_dir, PPT_TARGET_WIDTH_PX)
+            imgs = call_with_retry(conv, lambda: doc.slide_images(assets_base_dir, html_base_dir, PPT_TARGET_WIDTH_PX),
+                                   src, "PPT", _is_transient_com_error, DEFAULT_RETRIES)
         except Exception as e:
-            if _is_transient_com_error(e) and attempt < retries:
-                print(f"[PPT reconnect] {src.name} / retry {attempt+1}")
-                mgr.reset(); time.sleep(delay); delay = min(delay * 2, 3.0); continue
-            raise
-
-# ==================== ワーカー（パート単位） ====================
-def _worker_make_part(part_index: int, paths: List[str], out_dir: str, out_stem: str) -> tuple[int, str, int]:
-    pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
+            print(f"[PPT PNG NG] {src.name} / {e}（テキストのみ）")
+            if errors is not None:
+                errors.append(f"png: {e}")
+            imgs = {}
+        for no, rel in imgs.items():
+            slides.setdefault(no, {"paras": []})["img_rel"] = rel
+    return {"type": "ppt", "slides": slides} if slides else None
+
+# ==================== 変換キャッシュ ====================
+def _cache_settings(src: Path, conv: Optional[Converter], render_images: bool = PPT_RENDER_IMAGES) -> str:
+    """キャッシュキーに混ぜる設定。出力が変わる設定を足したらここにも足す"""
+    kind = "word" if src.suffix.lower() in WORD_EXTS else "ppt"
+    backend = conv.name if conv is not None else f"{WORD_BACKEND}/{PPT_BACKEND}"
+    return "|".join([kind, src.suffix.lower(), backend] + _render_settings(render_images))
+
+def _render_settings(render_images: bool = PPT_RENDER_IMAGES) -> List[str]:
+    return [
+        f"w={PPT_TARGET_WIDTH_PX}", f"text={int(EXTRACT_PPT_TEXT)}", f"img={int(render_images)}",
+        f"minify={int(WORD_MINIFY_INLINE_CSS)}", f"compact={int(WORD_COMPACT_HTML)}", f"cas={int(cas_enabled())}",
+    ]
+
+def html_settings_signature(batch_size: int = BATCH_SIZE_DEFAULT, size_kb_limit: int = MAX_FILE_KB_DEFAULT) -> str:
+    """
+    まとめ HTML の中身/分け方を変える設定一式（ジャーナルの HTML ステージのハッシュ用）。
+    バックエンド・変換フラグ・スライド画像の後処理・1 パートの件数・大容量レーンの閾値
+    """
+    backend = active_backend_name() or f"{WORD_BACKEND}/{PPT_BACKEND}"
+    return "|".join([backend] + _render_settings() + [
+        f"post={postprocess_signature()}", f"batch={int(batch_size)}", f"kb={int(size_kb_limit)}",
+    ])
+
+def _entry_asset_rels(entry: Dict) -> List[str]:
+    """entry が参照する asset（html_base_dir からの相対パス）。外部 URL・絶対パスは対象外"""
+    rels: List[str] = []
+    if entry.get("type") == "ppt":
+        for slide in (entry.get("slides") or {}).values():
+            rel = slide.get("img_rel")
+            if rel:
+                rels.append(str(rel))
+    else:
+        for m in _IMG_ATTR_PATTERN.finditer(entry.get("html") or ""):
+            u = html.unescape(m.group("u1") or m.group("u2") or "")
+            if u and not urlparse(u).scheme and not u.startswith("/"):
+                rels.append(unquote(u))
+    return list(dict.fromkeys(rels))
+
+def _restore_cached_entry(entry: Dict) -> Dict:
+    """JSON 経由でスライド番号が文字列になるので int に戻す（並び順が "10" < "2" にならないように）"""
+    if entry.get("type") == "ppt":
+        entry["slides"] = {int(no): v for no, v in (entry.get("slides") or {}).items()}
+    return entry
+
+def _convert_one(src: Path, conv: Optional[Converter], word_mgr: _WordManager, ppt_mgr: _PptManager,
+                 assets_base_dir: Path, html_base_dir: Path, make_html: bool = True,
+                 render_images: bool = PPT_RENDER_IMAGES, pdf_dst: Optional[Path] = None,
+                 ) -> Tuple[Optional[Dict], Optional[bool], str]:
+    """
+    1 文書を 1 回だけ開いて (entry, PDF 成否, エラー) を返す。
+    PDF → HTML/PNG の順（Word は HTML 保存で文書が切り替わるため）。PDF 未指定なら成否は None
+    スライド画像だけ失敗した PPT は entry（テキストのみ）とエラーの両方を返す
+    """
+    entry, pdf_ok, err = None, None, ""
+    notes: List[str] = []
+    if conv is not None:
+        with conv.open(src) as doc:
+            if pdf_dst is not None:
+                try:
+                    pdf_ok = bool(call_with_retry(conv, lambda: doc.to_pdf(pdf_dst), src, "PDF",
+                                                  _is_transient_com_error, DEFAULT_RETRIES))
+                except Exception as e:
+                    pdf_ok, err = False, f"pdf: {e}"
+            if make_html:
+                try:
+                    entry = _extract_entry_with_backend(conv, doc, src, assets_base_dir, html_base_dir,
+                                                        render_images, notes)
+                except Exception as e:
+                    notes.append(str(e))
+        return entry, pdf_ok, "; ".join(x for x in (err, *notes) if x)
+
+    session = _OfficeSession(src, word_mgr, ppt_mgr)
+    try:
+        if pdf_dst is not None:
+            pdf_ok = session.to_pdf(pdf_dst)
+            if not pdf_ok:
+                err = "pdf: 変換失敗"
+        if make_html:
+            try:
+                if session.is_ppt:
+                    slides = _extract_ppt_auto(src, session, assets_base_dir, html_base_dir, render_images, notes)
+                    entry = {"type": "ppt", "slides": slides} if slides else None
+                else:
+                    label = f"{src.stem}_{_short_hash(str(src.resolve()))}"
+                    html_fragment = _extract_word_html_auto(src, session, assets_base_dir, html_base_dir, label)
+                    entry = {"type": "word", "html": html_fragment} if html_fragment else None
+            except Exception as e:
+                notes.append(str(e))
+    finally:
+        session.close()
+    return entry, pdf_ok, "; ".join(x for x in (err, *notes) if x)
+
+# ==================== ワーカー（常駐・1 文書単位） ====================
+def _available_memory_mb() -> Optional[int]:
+    """空き物理メモリ(MB)。取れなければ None"""
+    try:
+        import psutil  # type: ignore
+        return int(psutil.virtual_memory().available // (1024 * 1024))
+    except Exception:
+        pass
+    if os.name == "nt":
+        try:
+            import ctypes
+            class _MemStatus(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+            st = _MemStatus(); st.dwLength = ctypes.sizeof(_MemStatus)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(st)):
+                return int(st.ullAvailPhys // (1024 * 1024))
+        except Exception:
+            return None
+        return None
+    try:
+        return int(os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024))
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def _pool_size(max_agents: Optional[int] = None, n_docs: Optional[int] = None) -> int:
+    """
+    常駐ワーカー数 = min(コア数, 空きメモリ/1 ワーカー目安, POOL_WORKERS_MAX, max_agents, 文書数)
+    """
+    n = min(os.cpu_count() or 2, POOL_WORKERS_MAX)
+    mem = _available_memory_mb()
+    if mem is not None:
+        n = min(n, max(1, (mem - POOL_MEM_RESERVE_MB) // POOL_MEM_PER_WORKER_MB))
+    if max_agents is not None:
+        n = min(n, int(max_agents))
+    if n_docs is not None:
+        n = min(n, n_docs)
+    return max(1, n)
+
+def _doc_worker_loop(lane: str, worker_id: int, task_q: mp.Queue, status_q: mp.Queue, out_dir_s: str,
+                     opts: Optional[Dict] = None) -> None:
+    """
+    常駐ワーカー本体（Word / PowerPoint は各 1 インスタンスを使い回す）。
+    - task_q から (seq, path, PDF 出力先 or None) を 1 件ずつ取る（None で終了）
+    - 1 文書は 1 回だけ開き、opts の html / png と PDF を同じセッションで出す
+    - status_q へ（office_watchdog の約束どおり）
+        着手 ("start", wid, seq) / 完了 ("done", wid, seq, (ファイル名, entry or None, エラー文字列, PDF 成否 or None))
+        Office 起動時 ("pid", wid, pid) … 期限切れの時に親がこの PID だけを止める
+    """
+    opts = opts or {}
+    make_html = opts.get("html", True)
+    render_images = opts.get("png", PPT_RENDER_IMAGES)
+    conv = get_converter()   # None なら従来経路（WORD_BACKEND / PPT_BACKEND）
+    if pythoncom is not None:
+        pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
     # 起動ジッタで同時COMアクティベーション衝突を緩和
-    time.sleep(0.2 + (part_index % 4) * 0.15 + random.uniform(0.0, 0.05))
+    time.sleep(0.2 + (worker_id % 4) * 0.15 + random.uniform(0.0, 0.05))
 
+    set_office_pid_reporter(lambda pid: status_q.put(("pid", worker_id, pid)))
     word_mgr = _WordManager()
     ppt_mgr  = _PptManager()
-    entries: List[Tuple[str, Dict]] = []
+    tag = f"{lane}{worker_id}"
 
-    out_dir_p = Path(out_dir)
+    out_dir_p = Path(out_dir_s)
     assets_base_dir = out_dir_p / "assets"
     assets_base_dir.mkdir(parents=True, exist_ok=True)
+    cache = ConversionCache.for_output(out_dir_p) if CONVERSION_CACHE else None
 
     try:
-        total = len(paths)
-        for i, s in enumerate(paths, 1):
+        while True:
+            task = task_q.get()
+            if task is None:
+                break  # sentinel
+            seq, s, pdf_s = task
             src = Path(s)
-            if (not src.exists()) or (src.suffix.lower() not in ALLOWED_EXTS):
-                continue
-            print(f"[part{part_index}] {i}/{total}: {src.name}")
+            pdf_dst = Path(pdf_s) if pdf_s else None
+            entry, err, pdf_ok = None, "", None
+            status_q.put(("start", worker_id, seq))
+            print(f"[{tag}] #{seq + 1}: {src.name}", flush=True)
             try:
-                if src.suffix.lower() in WORD_EXTS:
-                    label = f"{src.stem}_{_short_hash(str(src.resolve()))}"
-                    html_fragment = _extract_word_safe_html(src, word_mgr, assets_base_dir, out_dir_p, label)
-                    if html_fragment:
-                        entries.append( (src.name, {"type": "word", "html": html_fragment}) )
-                else:
-                    slides = _extract_ppt_safe_images(src, ppt_mgr, assets_base_dir, out_dir_p)
-                    if slides:
-                        entries.append( (src.name, {"type": "ppt", "slides": slides}) )
+                key = None
+                if make_html and cache is not None:
+                    key = cache.key_for(src, _cache_settings(src, conv, render_images))
+                    entry = cache.get(key, out_dir_p)
+                if entry is not None:
+                    entry = _restore_cached_entry(entry)
+                    print(f"[{tag} CACHE] {src.name}", flush=True)
+                if pdf_dst is not None or (make_html and entry is None):
+                    got, pdf_ok, err = _convert_one(src, conv, word_mgr, ppt_mgr, assets_base_dir, out_dir_p,
+                                                    make_html and entry is None, render_images, pdf_dst)
+                    if entry is None:
+                        entry = got
+                        if entry and key and not err:   # 一部失敗（画像なし等）はキャッシュしない
+                            try:
+                                cache.put(key, entry, out_dir_p, _entry_asset_rels(entry))
+                            except Exception as e:
+                                print(f"[{tag} CACHE put NG] {src.name} / {e}", flush=True)
             except Exception as e:
-                print(f"[part{part_index} SKIP] {src} / {e}")
-
-        out_dir_p.mkdir(parents=True, exist_ok=True)
-        out_path = out_dir_p / f"{out_stem}_part{part_index}.html"
-        html_text = paragraphs_to_html(entries, out_dir_p) if entries else \
-            "<!DOCTYPE html><meta charset='UTF-8'><title>抽出テキスト</title><body><p>（内容なし）</p></body>"
-        out_path.write_text(html_text, encoding="utf-8")
-        return (part_index, str(out_path), len(entries))
+                entry, err = None, str(e)
+            if err:
+                print(f"[{tag} {'PARTIAL' if entry else 'SKIP'}] {src} / {err}", flush=True)
+            status_q.put(("done", worker_id, seq, (src.name, entry or None, err, pdf_ok)))
 
     finally:
         try: word_mgr.close()
         except Exception: pass
         try: ppt_mgr.close()
         except Exception: pass
-        try: pythoncom.CoUninitialize()
-        except Exception: pass
+        close_converters()
+        if cache is not None:
+            if cache.hits or cache.misses:
+                print(f"[{tag} CACHE] hit {cache.hits} / miss {cache.misses}", flush=True)
+            cache.close()
+        if pythoncom is not None:
+            try: pythoncom.CoUninitialize()
+            except Exception: pass
+
+def _run_doc_pool(routed: Iterable[Tuple[int, Path, str, Optional[Path]]], out_dir: Path, workers: int,
+                  large_workers: Optional[int] = None,
+                  large_timeout_sec: Optional[float] = None,
+                  opts: Optional[Dict] = None,
+                  out_stem: Optional[str] = None,
+                  batch_size: int = BATCH_SIZE_DEFAULT,
+                  on_record: Optional[Callable[[Dict], None]] = None) -> Tuple[List[Dict], List[Path]]:
+    """
+    routed: (seq, path, レーン名 "W"|"L", PDF 出力先 or None) の列（ジェネレータでもよい。届いた順に投入）
+    seq は出力の並び順（入力順）。投入順（長い順など）とは別に持つ。
+    list で渡せば先に全 seq を登録する（長い順に投入しても、書き出しは入力順で詰まらない）
+    opts: {"html": bool, "png": bool}（ワーカーへそのまま渡す）
+    SLIDE_IMAGE_POSTPROCESS なら、届いた PPT のスライド画像を親側のプロセスプールで再圧縮（Office とは並行）
+    レーン毎に WorkerSupervisor で監視（期限はファイルサイズ比例。大容量レーンは large_timeout_sec が上限）。
+    期限切れ/異常終了はそのワーカーと Office だけを止め、文書は再投入 → 駄目なら quarantined。
+    out_stem があれば、完了した文書から入力順に out_dir/<out_stem>_partN.html（大容量は _large_partN）へ追記
+    （断片は書いたら捨てる。親が持つのは順番待ちの分だけで、それもスプールファイルに逃がす）
+    on_record(_public_record) は 1 文書終わる毎に監視スレッドから呼ぶ（ジャーナルへの逐次記録用）
+    パートへの書き出し（スライド画像の後処理待ちを含む）は専用の書き出しスレッドが行う。
+    監視スレッドは後処理を投げて書き出し待ちに積むだけ（期限監視・再投入を止めない）
+    戻り値: (seq 順のレコード, 書いたパート)
+        {"seq", "path", "name", "lane", "status"(ok/partial/empty/failed/quarantined), "html", "slides",
+         "pdf", "error", "sec", "attempts"}
+    """
+    opts = dict(opts or {})
+    want_html = opts.get("html", True)
+    post = SlideImagePool.create(out_dir) if want_html and opts.get("png", PPT_RENDER_IMAGES) else None
+    writers: Dict[str, OrderedPartWriter] = {}
+    if want_html and out_stem:
+        writers = {"W": _part_writer(out_dir, out_stem, batch_size, post),
+                   "L": _part_writer(out_dir, f"{out_stem}_large", batch_size, post)}
+    recs: Dict[int, Dict] = {}
+    started: Dict[int, float] = {}
+    pdf_targets: Dict[int, Optional[Path]] = {}
+    write_q: "queue.Queue[Optional[Tuple[str, int, str, Optional[Dict]]]]" = queue.Queue()
+
+    def _write_loop() -> None:
+        while True:
+            item = write_q.get()
+            if item is None:
+                break  # sentinel
+            lane, seq, name, entry = item
+            try:
+                writers[lane].put(seq, name, entry)
+            except Exception as e:
+                print(f"[WRITE NG] {name} / {e}")
+                writers[lane].put(seq, name, None)
+
+    def _finish(seq: int, status: str, entry: Optional[Dict] = None, error: str = "", pdf_ok: Optional[bool] = None) -> None:
+        r = recs[seq]
+        if r["status"] is not None:
+            return
+        r.update(status=status, error=error, html=bool(entry), slides=len((entry or {}).get("slides") or {}),
+                 pdf=str(pdf_targets[seq]) if pdf_ok else None,
+                 sec=round(time.time() - started.get(seq, time.time()), 2))
+        if on_record is not None:
+            try:
+                on_record(_public_record(r))
+            except Exception as e:
+                print(f"[RECORD NG] {r['name']} / {e}")
+        if post is not None:
+            post.submit_entry(entry)
+        if writers:
+            write_q.put((r["lane"], seq, r["name"], entry))
+
+    def _status(entry: Optional[Dict], err: str, pdf_ok: Optional[bool]) -> str:
+        oks = ([bool(entry)] if want_html else []) + ([bool(pdf_ok)] if pdf_ok is not None else [])
+        if oks and all(oks) and not err:
+            return "ok"
+        if any(oks):
+            return "partial"
+        return "failed" if err else "empty"
+
+    def _on_done(seq: int, payload) -> None:
+        name, entry, err, pdf_ok = payload
+        _finish(seq, _status(entry, err, pdf_ok), entry, err, pdf_ok)
+
+    def _on_give_up(seq: int, reason: str) -> None:
+        print(f"[QUARANTINE] {recs[seq]['name']} / {reason}")
+        _finish(seq, "quarantined", error=reason)
+
+    def _on_retry(seq: int, attempt: int, reason: str) -> None:
+        recs[seq]["attempts"] = attempt
+
+    def _supervisor(name: str, n: int) -> WorkerSupervisor:
+        def _spawn(wid: int, task_q, status_q) -> mp.Process:
+            p = mp.Process(target=_doc_worker_loop, args=(name, wid, task_q, status_q, str(out_dir), opts), daemon=False)
+            p.start()
+            return p
+        return WorkerSupervisor(name, _spawn, n, _on_done, _on_give_up, _on_retry)
+
+    writer_t = threading.Thread(target=_write_loop, name="part-writer", daemon=True)
+    if writers:
+        writer_t.start()
+    lanes = {"W": _supervisor("W", workers),
+             "L": _supervisor("L", large_workers or LARGE_LANE_WORKERS)}
+    caps = {"W": None, "L": large_timeout_sec or LARGE_LANE_TIMEOUT_SEC}
+    preplanned = isinstance(routed, (list, tuple))
+    if writers and preplanned:
+        for seq, _, lane, _ in routed:
+            writers[lane].expect(seq)
+
+    for seq, p, lane, pdf_dst in routed:
+        if not recs:
+            out_dir.mkdir(parents=True, exist_ok=True)
+        recs[seq] = {"seq": seq, "path": str(p), "name": p.name, "lane": lane,
+                     "status": None, "html": False, "slides": 0, "pdf": None, "error": "", "sec": None, "attempts": 1}
+        if writers and not preplanned:
+            writers[lane].expect(seq)
+        pdf_targets[seq] = pdf_dst
+        started[seq] = time.time()
+        try:
+            size = p.stat().st_size
+        except OSError:
+            size = 0
+        lanes[lane].submit(seq, (seq, str(p), str(pdf_dst) if pdf_dst else None), deadline_for(size, caps[lane]))
+
+    for sup in lanes.values():
+        sup.wait()
+    if writers:
+        write_q.put(None)
+        writer_t.join()
+    if post is not None:
+        post.close()
+
+    # 通常 → 大容量の順に返す（キーワード抽出などの後段はまとめて受け取れる）
+    parts: List[Path] = []
+    if writers:
+        has_large = any(r["lane"] == "L" for r in recs.values())
+        parts = writers["W"].close(write_empty=not has_large) + writers["L"].close(write_empty=False)
+    return [recs[i] for i in sorted(recs)], parts
+
+def _public_record(r: Dict) -> Dict:
+    """呼び出し側へ返す 1 文書分（HTML 断片そのものは含めない）"""
+    return {"path": r["path"], "name": r["name"], "lane": r["lane"], "status": r["status"],
+            "html": r.get("html", False), "slides": r.get("slides", 0), "pdf": r.get("pdf"),
+            "error": r["error"], "sec": r["sec"], "attempts": r.get("attempts", 1)}
+
+def _write_reports(recs: List[Dict], meta: Dict[str, Tuple[int, Optional[int]]],
+                   out_dir: Path, out_stem: str, max_kb: int) -> None:
+    """
+    *_quarantine.jsonl（期限切れで諦めた文書）と *_large.jsonl（大容量レーンの件毎の結果）。
+    パート HTML は _run_doc_pool が変換と並行して書き終えている
+    """
+    large = [r for r in recs if r["lane"] == "L"]
+    stuck = [r for r in recs if r["status"] == "quarantined"]
+    if stuck:
+        q = write_manifest([{"path": r["path"], "lane": r["lane"], "reason": r["error"], "attempts": r.get("attempts", 1)}
+                            for r in stuck], out_dir, f"{out_stem}_quarantine")
+        print(f"[QUARANTINE report] {len(stuck)} 件 → {q}")
+    if not large:
+        return
+    rows = []
+    print(f"[LARGE] {len(large)} 件（>{max_kb}KB または {LARGE_PAGES_MIN} ページ以上）")
+    for r in large:
+        size, pages = meta.get(r["path"], (0, None))
+        rows.append({"path": r["path"], "size_kb": round(size / 1024, 1), "pages": pages,
+                     "status": r["status"], "pdf": r.get("pdf"), "sec": r["sec"], "error": r["error"]})
+        print(f"  - {r['name']}  {size/1024:.0f} KB / {pages if pages else '?'} p → {r['status']} ({r['sec']}s)")
+    report = write_manifest(rows, out_dir, f"{out_stem}_large")
+    print(f"[LARGE report] {report}")
+
+def _pdf_reserver(output_html_path: str | Path, pdf_output_dir: Optional[str | Path], pdf_dir: str,
+                  make_pdf: bool, overwrite_pdf: bool,
+                  pdf_needed: Optional[Callable[[Path], bool]]) -> Callable[[Path], Optional[Path]]:
+    """文書 → PDF 出力先（作らないなら None）。呼んだ順に名前を予約するので入力順に呼ぶこと"""
+    if not make_pdf:
+        return lambda p: None
+    pdf_out = (Path(pdf_output_dir if pdf_output_dir is not None else output_html_path) / pdf_dir).resolve()
+    pdf_out.mkdir(parents=True, exist_ok=True)
+    reserved: Dict[str, bool] = {}
+
+    def _target(p: Path) -> Optional[Path]:
+        if pdf_needed is not None and not pdf_needed(p):
+            return None
+        return _reserve_output_path(pdf_out, p.stem, overwrite_pdf, nullcontext(), reserved)
+    return _target
 
 # ==================== メイン API ====================
-def convert_office_to_html(
+def convert_office_documents(
     path_lst: Iterable[str | Path | Tuple[str, str]],
     output_html_path: str | Path,
     html_dir: str,
+    pdf_output_dir: Optional[str | Path] = None,
+    pdf_dir: str = "",
+    make_html: bool = True,
+    make_png: bool = PPT_RENDER_IMAGES,
+    make_pdf: bool = True,
+    overwrite_pdf: bool = False,
     batch_size: int = BATCH_SIZE_DEFAULT,
     size_kb_limit: int = MAX_FILE_KB_DEFAULT,
     max_agents: Optional[int] = None,
-) -> List[Path]:
+    pdf_needed: Optional[Callable[[Path], bool]] = None,
+    on_record: Optional[Callable[[Dict], None]] = None,
+) -> Dict[str, List]:
     """
-    path_lst: "C:/a/b.docx" または (dir, filename) の混在でOK
-    output_html_path: 出力ルートフォルダ（例: "C:/out"）
-    html_dir: まとめファイル名（例: "result.html" → 実際は *_partN.html）
+    HTML 抽出と PDF 化をまとめた 1 ステージ。各文書は Word / PowerPoint で 1 回だけ開く。
+    - make_html: *_partN.html 用の断片（Word は画像込み HTML / PPT はスライド毎テキスト）
+    - make_png : PPT のスライド PNG（make_html の一部。False なら .pptx/.pptm は PowerPoint を起動しない）
+    - make_pdf : pdf_output_dir/pdf_dir/<stem>.pdf（overwrite_pdf=False なら _1, _2 … で重複回避）
+    - pdf_needed(path) が False の文書は PDF を作らない（ジャーナルで済みの分。make_html も無ければ開かない）
+    - on_record(record) を 1 文書終わる毎に呼ぶ（全件を待たずに記録する用）
+    戻り値: {"html_parts": [Path...], "records": [1 文書 1 レコード]}
+        record = {"path", "name", "lane", "status"(ok/partial/empty/failed/quarantined),
+                  "html"(bool), "slides"(int), "pdf"(str or None), "error", "sec", "attempts"}
+    期限切れを WATCHDOG_MAX_ATTEMPTS 回繰り返した文書は quarantined とし、*_quarantine.jsonl にも出す
     """
     if KILL_AT_START:
         kill_office_processes()
 
     items = _normalize_items(path_lst)
-    filtered = _prefilter_items(items, max_kb=size_kb_limit)
+    filtered, meta = _plan_items(items)
 
     out_base = Path(output_html_path) / html_dir
     out_dir  = out_base.parent
     out_stem = out_base.stem
 
     if not filtered:
-        empty = out_dir / f"{out_stem}_part1.html"
-        empty.parent.mkdir(parents=True, exist_ok=True)
-        empty.write_text("<!DOCTYPE html><meta charset='UTF-8'><title>抽出テキスト</title><body><p>（内容なし：対象0件）</p></body>", encoding="utf-8")
-        print(f"[WRITE empty] {empty}")
+        parts: List[Path] = []
+        if make_html:
+            empty = out_dir / f"{out_stem}_part1.html"
+            empty.parent.mkdir(parents=True, exist_ok=True)
+            empty.write_text("<!DOCTYPE html><meta charset='UTF-8'><title>抽出テキスト</title><body><p>（内容なし：対象0件）</p></body>", encoding="utf-8")
+            print(f"[WRITE empty] {empty}")
+            parts.append(empty)
         if KILL_AT_END: kill_office_processes()
-        return [empty]
+        return {"html_parts": parts, "records": []}
+
+    # PDF の出力名は入力順に親で決める（並べ替え・並列実行に左右されない）
+    pdf_target = _pdf_reserver(output_html_path, pdf_output_dir, pdf_dir, make_pdf, overwrite_pdf, pdf_needed)
+    pdf_targets = {i: pdf_target(p) for i, p in enumerate(filtered)}
+
+    # 長い順に投入（最後に大物が 1 件だけ残る尻尾を防ぐ）。出力の並びは入力順のまま
+    routed = sorted(((i, p, _lane_of(meta[str(p)], size_kb_limit), pdf_targets[i]) for i, p in enumerate(filtered)
+                     if make_html or pdf_targets[i] is not None),
+                    key=lambda t: _cost(meta[str(t[1])]), reverse=True)
+    if not routed:
+        print("[PLAN] 対象なし（HTML なし・PDF はすべて済み）")
+        if KILL_AT_END: kill_office_processes()
+        return {"html_parts": [], "records": []}
+    n_large = sum(1 for t in routed if t[2] == "L")
+    workers = _pool_size(max_agents, max(1, len(routed) - n_large))
+    large_workers = max(1, min(LARGE_LANE_WORKERS, n_large))
+    outs = "+".join(k for k, on in (("html", make_html), ("png", make_html and make_png), ("pdf", make_pdf)) if on)
+    print(f"[PLAN] 有効 {len(filtered)} 件・変換 {len(routed)} 件（大容量 {n_large}）/ 常駐ワーカー {workers} + 大容量 {large_workers if n_large else 0}"
+          f" / 出力 {outs} / {batch_size}件/part")
+
+    recs, parts = _run_doc_pool(routed, out_dir, workers, large_workers, opts={"html": make_html, "png": make_png},
+                                out_stem=out_stem if make_html else None, batch_size=batch_size,
+                                on_record=on_record)
 
-    chunks = _chunk(filtered, batch_size)
-    total_parts = len(chunks)
-    workers = total_parts if max_agents is None else max(1, min(total_parts, max_agents))
+    if DEFER_QUIT_TO_PARENT and KILL_AT_END:
+        kill_office_processes()
 
-    print(f"[PLAN] 有効 {len(filtered)} 件 → {total_parts} part / 同時実行 {workers} / {batch_size}件/part")
-    for i, ch in enumerate(chunks, 1):
-        print(f"  - part{i}: {len(ch)} 件")
+    _write_reports(recs, meta, out_dir, out_stem, size_kb_limit)
+    return {"html_parts": parts, "records": [_public_record(r) for r in recs]}
 
-    tasks = [(idx + 1, [str(p) for p in chunk], str(out_dir), out_stem)
-             for idx, chunk in enumerate(chunks)]
+def convert_office_to_html(
+    path_lst: Iterable[str | Path | Tuple[str, str]],
+    output_html_path: str | Path,
+    html_dir: str,
+    batch_size: int = BATCH_SIZE_DEFAULT,
+    size_kb_limit: int = MAX_FILE_KB_DEFAULT,
+    max_agents: Optional[int] = None,
+) -> List[Path]:
+    """
+    path_lst: "C:/a/b.docx" または (dir, filename) の混在でOK
+    output_html_path: 出力ルートフォルダ（例: "C:/out"）
+    html_dir: まとめファイル名（例: "result.html" → 実際は *_partN.html）
+    batch_size: 1 HTML の収録件数（変換の並列度には影響しない）
+    size_kb_limit: これを超える文書は大容量レーン（別枠の同時数・タイムアウト）で処理し、
+                   *_large_partN.html / *_large.jsonl に分けて出す
+    max_agents: 常駐ワーカー数の上限（None ならコア数・空きメモリから決める）
+    PDF も要るなら convert_office_documents（同じ文書を 2 回開かずに済む）
+    """
+    return convert_office_documents(path_lst, output_html_path, html_dir, make_pdf=False,
+                                    batch_size=batch_size, size_kb_limit=size_kb_limit,
+                                    max_agents=max_agents)["html_parts"]
 
-    results = []
-    with ProcessPoolExecutor(max_workers=workers) as ex:
-        futs = [ex.submit(_worker_make_part, *t) for t in tasks]
-        for f in as_completed(futs):
-            results.append(f.result())
+def convert_office_documents_stream(
+    path_iter: Iterable[str | Path | Tuple[str, str]],
+    output_html_path: str | Path,
+    html_dir: str,
+    pdf_output_dir: Optional[str | Path] = None,
+    pdf_dir: str = "",
+    make_html: bool = True,
+    make_png: bool = PPT_RENDER_IMAGES,
+    make_pdf: bool = True,
+    overwrite_pdf: bool = False,
+    batch_size: int = BATCH_SIZE_DEFAULT,
+    size_kb_limit: int = MAX_FILE_KB_DEFAULT,
+    max_agents: int = STREAM_AGENTS_DEFAULT,
+    kill_office: bool = True,
+    pdf_needed: Optional[Callable[[Path], bool]] = None,
+    on_record: Optional[Callable[[Dict], None]] = None,
+) -> Dict[str, List]:
+    """
+    convert_office_documents の逐次投入版。path_iter はジェネレータ（前段のキュー）でよい。
+    - 届いた文書から順に常駐ワーカーのキューへ投入（総件数を待たない）。1 文書 1 回だけ開いて HTML と PDF を出す
+    - *_partN.html へは変換できた文書から到着順に追記（全件を待たない。途中で落ちても書けた分は残る）
+    - size_kb_limit 超は大容量レーンへ（並べ替えは総数が分からないのでしない）
+    - pdf_needed / on_record は convert_office_documents と同じ
+    - kill_office=False なら Office Kill は呼び出し側に任せる
+    戻り値: {"html_parts": [Path...], "records": [1 文書 1 レコード]}
+    """
+    if kill_office and KILL_AT_START:
+        kill_office_processes()
 
-    if DEFER_QUIT_TO_PARENT and KILL_AT_END:
+    out_base = Path(output_html_path) / html_dir
+    out_dir  = out_base.parent
+    out_stem = out_base.stem
+
+    meta: Dict[str, Tuple[int, Optional[int]]] = {}
+    pdf_target = _pdf_reserver(output_html_path, pdf_output_dir, pdf_dir, make_pdf, overwrite_pdf, pdf_needed)
+
+    def _routed() -> Iterable[Tuple[int, Path, str, Optional[Path]]]:
+        seq = 0
+        for item in path_iter:
+            ok, m = _plan_items(_normalize_items([item]))
+            meta.update(m)
+            for p in ok:
+                pdf_dst = pdf_target(p)
+                if not make_html and pdf_dst is None:
+                    continue
+                yield seq, p, _lane_of(m[str(p)], size_kb_limit), pdf_dst
+                seq += 1
+
+    workers = _pool_size(max_agents)
+    outs = "+".join(k for k, on in (("html", make_html), ("png", make_html and make_png), ("pdf", make_pdf)) if on)
+    print(f"[PLAN stream] 常駐ワーカー {workers} + 大容量 {LARGE_LANE_WORKERS} / 出力 {outs} / {batch_size}件/part")
+    recs, parts = _run_doc_pool(_routed(), out_dir, workers, opts={"html": make_html, "png": make_png},
+                                out_stem=out_stem if make_html else None, batch_size=batch_size,
+                                on_record=on_record)
+
+    if kill_office and DEFER_QUIT_TO_PARENT and KILL_AT_END:
         kill_office_processes()
 
-    results.sort(key=lambda x: x[0])
-    for idx, path_str, cnt in results:
-        print(f"[DONE part{idx}] {path_str}  (収録 {cnt} ファイル)")
+    _write_reports(recs, meta, out_dir, out_stem, size_kb_limit)
+    return {"html_parts": parts, "records": [_public_record(r) for r in recs]}
 
-    return [Path(p) for _, p, _ in results]
+def convert_office_to_html_stream(
+    path_iter: Iterable[str | Path | Tuple[str, str]],
+    output_html_path: str | Path,
+    html_dir: str,
+    batch_size: int = BATCH_SIZE_DEFAULT,
+    size_kb_limit: int = MAX_FILE_KB_DEFAULT,
+    max_agents: int = STREAM_AGENTS_DEFAULT,
+    kill_office: bool = True,
+) -> List[Path]:
+    """
+    convert_office_documents_stream の HTML だけ版（PDF は作らない）
+    """
+    return convert_office_documents_stream(path_iter, output_html_path, html_dir, make_pdf=False,
+                                           batch_size=batch_size, size_kb_limit=size_kb_limit,
+                                           max_agents=max_agents, kill_office=kill_office)["html_parts"]
 
 # # ==================== 直接実行テスト ====================
 # if __name__ == "__main__":
@@ -5,48 +5,52 @@ filter_extracted_html_by_keywords（完全版）
 - 処理: 指定キーワードに一致する <li> だけ再収集
 - 出力: 1つの HTML（見出し <h2>, <h3> は維持）
 - 照合: 全角/半角・大小無視（NFKC+casefold）。英数字/アンダーバーは語境界で完全一致
+  （Aho–Corasick で全キーワードを段落 1 回の走査で照合。キーワード毎の一致段落数も出す）
 - 入力パス: str, Path, WindowsPath(...) の repr 文字列まで受容。重複除去・順序維持
+- パートが複数ならプロセスプールで並列にパース（各ワーカーが 1 パート分の結果を返し、入力順に統合）
+- 文字コードは BOM / <meta charset> から 1 回で判定（既定 UTF-8。何度も読み直さない）
 - 出力先: フォルダ/ファイルどちらでもOK。安全なファイル名に正規化し、原子的置換で書き込み
 """
 
 from __future__ import annotations
 from pathlib import Path
-from typing import Iterable, List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Tuple
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from html.parser import HTMLParser
 import html as _html
-import unicodedata, re, time
+import codecs, os, re, time
 from tempfile import NamedTemporaryFile
 
-# ========= 正規化・キーワード =========
-def _nfkc_casefold(s: str) -> str:
-    return unicodedata.normalize("NFKC", s).casefold()
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-def _compile_keyword_patterns(keywords: Iterable[str]) -> List[re.Pattern]:
-    """
-    照合ルール:
-      - 全角/半角・大小を無視（NFKC+casefold）
-      - 英数字/アンダーバーは語境界で完全一致（部分一致を防ぐ）
-      - それ以外（和文等）は「含まれる」一致（語境界が曖昧なため）
-    """
-    pats: List[re.Pattern] = []
-    for kw in keywords:
-        kw = (kw or "").strip()
-        if not kw:
-            continue
-        kn = _nfkc_casefold(kw)
-        pats.append(re.compile(rf'(?<![0-9A-Za-z_]){re.escape(kn)}(?![0-9A-Za-z_])'))
-    return pats
+from combine.keyword_matcher import (
+    KeywordMatcher,
+    nfkc_casefold,
+    )
+
+# ==================== 調整フラグ ====================
+FILTER_WORKERS            = None    # 並列パースのプロセス数（None: min(パート数, コア数) / 1: 直列）
+FILTER_PARALLEL_MIN_PARTS = 3       # パートがこれ未満なら直列（プロセス起動の方が高くつく）
+SNIFF_BYTES               = 4096    # <meta charset> を探す先頭バイト数
+
+# ========= 正規化・キーワード =========
+_nfkc_casefold = nfkc_casefold
 
 # ========= HTML パーサ =========
 class _LiFilterParser(HTMLParser):
     """
     想定入力: <h2>=ファイル名, <h3>=Slide N, <li>=段落
-    条件一致の <li> だけ result に保持
+    条件一致の <li> だけ result に保持。hits[i] = keywords[i] に一致した段落数
+    照合ルール（KeywordMatcher）:
+      - 全角/半角・大小を無視（NFKC+casefold）
+      - 一致箇所の前後が英数字/アンダーバーなら不一致（部分一致を防ぐ）
     """
-    def __init__(self, patterns: List[re.Pattern]):
+    def __init__(self, matcher: KeywordMatcher):
         super().__init__(convert_charrefs=True)
-        self.patterns = patterns
+        self.matcher = matcher
+        self.hits: List[int] = [0] * len(matcher.keywords)
         self.current_file: Optional[str] = None
         self.current_slide: Optional[int] = None
         self.in_h2 = False
@@ -90,10 +94,11 @@ class _LiFilterParser(HTMLParser):
             raw = "".join(self._buf_li).strip()
             if not raw or not self.current_file:
                 return
-            text_norm = _nfkc_casefold(raw)
-            hit = any(p.search(text_norm) for p in self.patterns) if self.patterns else False
-            if not hit:
+            ids = self.matcher.match(_nfkc_casefold(raw)) if self.matcher else None
+            if not ids:
                 return
+            for i in ids:
+                self.hits[i] += 1
             if self.current_slide is not None:
                 self.result[self.current_file]["ppt"].setdefault(self.current_slide, []).append(raw)  # type: ignore[index]
             else:
@@ -107,6 +112,71 @@ class _LiFilterParser(HTMLParser):
         elif self.in_li:
             self._buf_li.append(data)
 
+# ========= 文字コード判定・1 パート分の処理 =========
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+def _sniff_encoding(head: bytes) -> str:
+    """BOM → <meta charset> → 既定 UTF-8"""
+    for bom, enc in _BOMS:
+        if head.startswith(bom):
+            return enc
+    m = _META_CHARSET.search(head[:SNIFF_BYTES])
+    if m:
+        name = m.group(1).decode("ascii", "replace").lower()
+        if name in {"shift_jis", "shift-jis", "sjis", "x-sjis", "windows-31j"}:
+            name = "cp932"   # Office/Windows の Shift_JIS は実質 cp932
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+def _decode_html(data: bytes, name: str) -> str:
+    """
+    BOM / <meta charset> で決めた文字コードで 1 回だけ厳密に読む。
+    それで例外になった時だけ cp932 → errors="replace"（文字化けは出るが取りこぼさない）
+    """
+    enc = _sniff_encoding(data[:SNIFF_BYTES])
+    try:
+        return data.decode(enc)
+    except UnicodeDecodeError:
+        pass
+    if enc != "cp932":
+        try:
+            return data.decode("cp932")
+        except UnicodeDecodeError:
+            pass
+    print(f"[DECODE] {name}: {enc} で読めないため置換して読む")
+    return data.decode(enc, errors="replace")
+
+def _filter_one(path_s: str, matcher: KeywordMatcher
+                ) -> Optional[Tuple["OrderedDict[str, Dict[str, object]]", List[int]]]:
+    """1 パート分（プール側でも実行）。(result, hits)。読めなければ None"""
+    p = Path(path_s)
+    if not p.is_file():
+        print(f"[SKIP] not found: {p}")
+        return None
+    try:
+        data = p.read_bytes()
+    except OSError as e:
+        print(f"[SKIP] cannot read: {p} / {e}")
+        return None
+    text = _decode_html(data, p.name)
+    parser = _LiFilterParser(matcher)
+    parser.feed(text); parser.close()
+    return parser.result, parser.hits
+
+def _merge_into(agg: "OrderedDict[str, Dict[str, object]]", result: "OrderedDict[str, Dict[str, object]]") -> None:
+    for fname, d in result.items():
+        if fname not in agg:
+            agg[fname] = {"word": [], "ppt": OrderedDict()}
+        agg[fname]["word"].extend(d.get("word", []))  # type: ignore[index]
+        ppt_dst: "OrderedDict[int, List[str]]" = agg[fname]["ppt"]  # type: ignore[index]
+        ppt_src: "OrderedDict[int, List[str]]" = d.get("ppt", OrderedDict())  # type: ignore[assignment]
+        for no, lst in ppt_src.items():
+            ppt_dst.setdefault(no, []).extend(lst)
+
 # ========= 入力パス正規化 =========
 def _coerce_to_path_list(html_paths) -> List[Path]:
     """
@@ -147,7 +217,7 @@ def _coerce_to_path_list(html_paths) -> List[Path]:
 
 # ========= 出力 HTML 構築 =========
 def _build_output_html(agg: "OrderedDict[str, Dict[str, object]]",
-                       keywords: List[str]) -> str:
+                       keywords: List[str], hits: Optional[List[int]] = None) -> str:
     parts: List[str] = []
     parts.append("<!DOCTYPE html>")
     parts.append('<html lang="ja">')
@@ -161,7 +231,11 @@ def _build_output_html(agg: "OrderedDict[str, Dict[str, object]]",
                  "</style>")
     parts.append("<body>")
     if keywords:
-        kdisp = ", ".join(_html.escape(k) for k in keywords if (k or "").strip())
+        kws = [k for k in keywords if (k or "").strip()]
+        if hits is not None and len(hits) == len(kws):
+            kdisp = ", ".join(f"{_html.escape(k)} ({n})" for k, n in zip(kws, hits))
+        else:
+            kdisp = ", ".join(_html.escape(k) for k in kws)
         parts.append(f"<div class='meta'>抽出キーワード: {kdisp}</div>")
 
     any_hit = False
@@ -238,12 +312,15 @@ def filter_extracted_html_by_keywords(
     html_paths: Iterable[str | Path],
     keywords: Iterable[str],
     output_html_path: str | Path,
+    workers: Optional[int] = None,
 ) -> Path:
     """
     指定HTML群から、指定語を含む <li> 段落だけを再収集して1つのHTMLにまとめる。
     - 見出しは <h2>=ファイル名、<h3>=Slide番号 を維持
     - 照合: NFKC+casefold、英数字は語境界で完全一致
+    - 見出しのキーワード一覧に一致段落数を添える（例: HARQ (12)）。同じ数をコンソールにも出す
     - output_html_path にディレクトリを渡した場合は 'filtered.html' を自動付与
+    - workers: 並列パースのプロセス数（None なら FILTER_WORKERS。1 で直列）
     戻り値: 生成したHTMLの Path
     """
     # 入力整形
@@ -251,38 +328,37 @@ def filter_extracted_html_by_keywords(
     kws = [k for k in (keywords or []) if (k or "").strip()]
     if not kws:
         raise ValueError("keywords が空です。少なくとも1語を指定してください。")
-    pats = _compile_keyword_patterns(kws)
+    matcher = KeywordMatcher(kws)
+    kws = matcher.keywords
+    hits = [0] * len(kws)
 
-    # 集約
+    # パース（複数パートは並列。map は入力順に返すので、統合結果は直列と同じ）
+    n = max(1, min(workers or FILTER_WORKERS or len(paths), len(paths), os.cpu_count() or 1))
     agg: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
-    for p in paths:
-        if not p.exists() or not p.is_file():
-            print(f"[SKIP] not found: {p}")
-            continue
-        parser = _LiFilterParser(pats)
-        text = None
-        for enc in ("utf-8", "utf-8-sig", "cp932"):
-            try:
-                text = p.read_text(encoding=enc)
-                break
-            except Exception:
+    ex = None
+    if n > 1 and len(paths) >= FILTER_PARALLEL_MIN_PARTS:
+        print(f"[FILTER] {len(paths)} パート / {n} プロセス")
+        ex = ProcessPoolExecutor(max_workers=n)
+    try:
+        if ex is not None:
+            outs = ex.map(_filter_one, [str(p) for p in paths], [matcher] * len(paths))
+        else:
+            outs = (_filter_one(str(p), matcher) for p in paths)
+        for out in outs:   # 先頭のパートが終わり次第、後ろのパースと並行して統合
+            if out is None:
                 continue
-        if text is None:
-            print(f"[SKIP] cannot read: {p}")
-            continue
-        parser.feed(text); parser.close()
-        for fname, d in parser.result.items():
-            if fname not in agg:
-                agg[fname] = {"word": [], "ppt": OrderedDict()}
-            agg[fname]["word"].extend(d.get("word", []))  # type: ignore[index]
-            ppt_dst: "OrderedDict[int, List[str]]" = agg[fname]["ppt"]  # type: ignore[index]
-            ppt_src: "OrderedDict[int, List[str]]" = d.get("ppt", OrderedDict())  # type: ignore[assignment]
-            for no, lst in ppt_src.items():
-                ppt_dst.setdefault(no, []).extend(lst)
+            result, part_hits = out
+            hits = [a + b for a, b in zip(hits, part_hits)]
+            _merge_into(agg, result)
+    finally:
+        if ex is not None:
+            ex.shutdown(wait=True)
 
     # 出力
     out_path = _decide_output_path(output_html_path)
-    out_html = _build_output_html(agg, kws)
+    for k, n in sorted(zip(kws, hits), key=lambda t: -t[1]):
+        print(f"[HITS] {n:6d}  {k}")
+    out_html = _build_output_html(agg, kws, hits)
     _atomic_write_text(out_path, out_html, encoding="utf-8")
     return out_path
 
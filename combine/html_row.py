@@ -11,11 +11,42 @@ import os, re, time, random, subprocess, shutil, hashlib
 from pathlib import Path
 from typing import Iterable, List, Dict, Tuple, Optional
 
-import pythoncom
-from win32com.client import gencache, DispatchEx
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+try:
+    import pythoncom
+    from win32com.client import gencache, DispatchEx
+except ImportError:   # Windows 以外: COM 無し（ooxml / fake バックエンドのみ）
+    pythoncom = None
+    gencache = DispatchEx = None
 from concurrent.futures import ProcessPoolExecutor, as_completed
 import html as _html
 
+from combine.ooxml_word import (
+    extract_docx_paragraphs,
+    is_ooxml_word,
+    )
+
+from combine.ooxml_ppt import (
+    extract_pptx_slide_texts,
+    is_ooxml_ppt,
+    )
+
+from combine.part_writer import (
+    PartWriter,
+    )
+
+from combine.paragraph_index import (
+    ParagraphIndex,
+    )
+
+from combine.converter_backends import (
+    call_with_retry,
+    close_converters,
+    get_converter,
+    )
+
 # ==================== 調整フラグ ====================
 BATCH_SIZE_DEFAULT      = 5          # 1 HTML の最大収録件数（part単位）
 MAX_FILE_KB_DEFAULT     = 1500       # 閾値超はスキップ
@@ -25,6 +56,9 @@ DEFER_QUIT_TO_PARENT    = True       # True: ワーカーで Quit しない（
 KILL_AT_START           = True       # 実行開始前に既存 Office Kill
 KILL_AT_END             = True       # 実行終了後に Office Kill
 USE_WORD_STORY_RANGES   = True       # Word: StoryRanges も走査して拾い漏れ低減
+WORD_BACKEND            = "ooxml"    # "ooxml": .docx/.docm は ZIP を直接読む（.doc/.rtf と失敗時のみ COM） / "com": 常に Word
+PPT_BACKEND             = "ooxml"    # "ooxml": .pptx/.pptm は ZIP を直接読む（.ppt と失敗時のみ COM） / "com": 常に PowerPoint
+PARAGRAPH_INDEX         = True       # 段落を SQLite FTS5 に登録（未変更の文書は Office を起動せず索引から出す）
 
 # ==================== 調整フラグ（追加/確認） ====================
 PPT_USE_TEXTFRAME2_FALLBACK = False   # Trueで TextFrame2 も試す（やや低速）
@@ -243,6 +277,11 @@ def extract_ppt_text(src: Path, ppt_app) -> Dict[int, List[str]]:
             except Exception: pass
     return result
 def _extract_ppt_safe_text(src: Path, mgr, retries: int = DEFAULT_RETRIES) -> Dict[int, List[str]]:
+    if PPT_BACKEND == "ooxml" and is_ooxml_ppt(src):
+        try:
+            return extract_pptx_slide_texts(src)
+        except Exception as e:
+            print(f"[PPT ooxml→COM] {src.name} / {e}")
     delay = 0.5
     for attempt in range(retries + 1):
         try:
@@ -353,6 +392,11 @@ def extract_word_text(src: Path, word_app) -> List[str]:
             try: word_app.Quit()
             except Exception: pass
 def _extract_word_safe_text(src: Path, mgr, retries: int = DEFAULT_RETRIES) -> List[str]:
+    if WORD_BACKEND == "ooxml" and is_ooxml_word(src):
+        try:
+            return extract_docx_paragraphs(src)
+        except Exception as e:
+            print(f"[WORD ooxml→COM] {src.name} / {e}")
     delay = 0.5
     for attempt in range(retries + 1):
         try:
@@ -396,53 +440,77 @@ class _PptManager:
         self.reset()
 
 # ==================== HTML 生成（Hタグ維持・テキストのみ） ====================
+_HTML_HEAD = "\n".join([
+    "<!DOCTYPE html>",
+    '<html lang="ja">',
+    '<meta charset="UTF-8">',
+    "<title>抽出テキスト</title>",
+    "<style>ul{margin:.3rem 1.2rem;} h2{margin-top:1.2rem;} .word-block,.slide-block{border:1px solid #e3e3e3;padding:.6rem;border-radius:.5rem;} .file-block{margin-bottom:1rem;}</style>",
+    "<body>",
+])
+_HTML_FOOT = "</body></html>"
+
+def entry_block_html(file_disp: str, data: Dict) -> str:
+    """1 文書分のブロック（entries_to_html / ワーカーの逐次書き出しの共通部品）"""
+    parts: List[str] = [f"<div class='file-block'><h2>{_html.escape(file_disp)}</h2>"]
+    if data.get("type") == "ppt":
+        slides = data.get("slides", {})
+        for slide_no in sorted(slides.keys()):
+            paras = slides[slide_no] or []
+            parts.append(f"<div class='slide-block'><h3>Slide {slide_no}</h3>")
+            if paras:
+                parts.append("<ul>")
+                for p in paras:
+                    li = _html.escape(p).replace("\n", "<br>")
+                    parts.append(f"<li>{li}</li>")
+                parts.append("</ul>")
+            parts.append("</div>")
+    else:
+        paras = data.get("paras", [])
+        if paras:
+            parts.append("<div class='word-block'><ul>")
+            for p in paras:
+                li = _html.escape(p).replace("\n", "<br>")
+                parts.append(f"<li>{li}</li>")
+            parts.append("</ul></div>")
+    parts.append("</div>")
+    return "\n".join(parts)
+
 def entries_to_html(entries: List[Tuple[str, Dict]]) -> str:
     """
     entries: [(display_name, data_dict), ...]
       - Word: {"type":"word","paras":[...]}
       - PPT : {"type":"ppt","slides": {no: [paras...]}}
+    ワーカーは PartWriter で 1 文書ずつ追記する（これは一括版）
     """
-    parts: List[str] = []
-    parts.append("<!DOCTYPE html>")
-    parts.append('<html lang="ja">')
-    parts.append('<meta charset="UTF-8">')
-    parts.append("<title>抽出テキスト</title>")
-    parts.append("<style>ul{margin:.3rem 1.2rem;} h2{margin-top:1.2rem;} .word-block,.slide-block{border:1px solid #e3e3e3;padding:.6rem;border-radius:.5rem;} .file-block{margin-bottom:1rem;}</style>")
-    parts.append("<body>")
-
-    for file_disp, data in entries:
-        parts.append(f"<div class='file-block'><h2>{_html.escape(file_disp)}</h2>")
-        if data.get("type") == "ppt":
-            slides = data.get("slides", {})
-            for slide_no in sorted(slides.keys()):
-                paras = slides[slide_no] or []
-                parts.append(f"<div class='slide-block'><h3>Slide {slide_no}</h3>")
-                if paras:
-                    parts.append("<ul>")
-                    for p in paras:
-                        parts.append(f"<li>{_html.escape(p).replace('\\n','<br>')}</li>")
-                    parts.append("</ul>")
-                parts.append("</div>")
-        else:
-            paras = data.get("paras", [])
-            if paras:
-                parts.append("<div class='word-block'><ul>")
-                for p in paras:
-                    parts.append(f"<li>{_html.escape(p).replace('\\n','<br>')}</li>")
-                parts.append("</ul></div>")
-        parts.append("</div>")
-    parts.append("</body></html>")
-    return "\n".join(parts)
+    return "\n".join([_HTML_HEAD] + [entry_block_html(d, data) for d, data in entries] + [_HTML_FOOT])
 
 # ==================== ワーカー（パート単位 / 並列維持） ====================
+def _index_settings(conv) -> str:
+    """段落索引の再利用キーに混ぜる設定。取れる段落が変わる設定を足したらここにも足す"""
+    backend = conv.name if conv is not None else f"{WORD_BACKEND}/{PPT_BACKEND}"
+    return "|".join([backend, f"story={int(USE_WORD_STORY_RANGES)}", f"tf2={int(PPT_USE_TEXTFRAME2_FALLBACK)}"])
+
 def _worker_make_part(part_index: int, paths: List[str], out_dir: str, out_stem: str) -> tuple[int, str, int]:
-    pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
+    conv = get_converter()   # None なら従来経路（WORD_BACKEND / PPT_BACKEND）
+    if pythoncom is not None:
+        pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
     # 起動ジッタで同時COMアクティベーション衝突を緩和
     time.sleep(0.2 + (part_index % 4) * 0.15 + random.uniform(0.0, 0.05))
 
     word_mgr = _WordManager()
     ppt_mgr  = _PptManager()
-    entries: List[Tuple[str, Dict]] = []
+    # 1 文書変換できる度に追記（パート分の断片をメモリに溜めない）
+    writer = PartWriter(Path(out_dir), out_stem, len(paths), _HTML_HEAD, _HTML_FOOT, entry_block_html,
+                        first_index=part_index)
+    written = 0
+    index = None
+    settings = _index_settings(conv)
+    if PARAGRAPH_INDEX:
+        try:
+            index = ParagraphIndex.for_output(Path(out_dir))
+        except Exception as e:
+            print(f"[part{part_index} INDEX] 使えないので登録なし: {e}")
 
     try:
         total = len(paths)
@@ -452,31 +520,47 @@ def _worker_make_part(part_index: int, paths: List[str], out_dir: str, out_stem:
                 continue
             print(f"[part{part_index}] {i}/{total}: {src.name}")
             try:
-                if src.suffix.lower() in WORD_EXTS:
-                    paras = _extract_word_safe_text(src, word_mgr)
-                    if paras:
-                        entries.append( (src.name, {"type": "word", "paras": paras}) )
-                else:
-                    slides = _extract_ppt_safe_text(src, ppt_mgr)
-                    if slides:
-                        entries.append( (src.name, {"type": "ppt", "slides": slides}) )
+                digest, data = None, None
+                if index is not None:
+                    digest, data = index.lookup(src, out_stem, settings)
+                if data is None:
+                    if conv is not None:
+                        with conv.open(src) as doc:
+                            if doc.kind == "word":
+                                data = {"type": "word", "paras": call_with_retry(conv, doc.to_text, src, "WORD", _is_transient_com_error, DEFAULT_RETRIES)}
+                            else:
+                                data = {"type": "ppt", "slides": call_with_retry(conv, doc.slides, src, "PPT", _is_transient_com_error, DEFAULT_RETRIES)}
+                    elif src.suffix.lower() in WORD_EXTS:
+                        data = {"type": "word", "paras": _extract_word_safe_text(src, word_mgr)}
+                    else:
+                        data = {"type": "ppt", "slides": _extract_ppt_safe_text(src, ppt_mgr)}
+                    if index is not None:
+                        try:
+                            index.add_document(src, out_stem, paras=data.get("paras"), slides=data.get("slides"),
+                                               digest=digest, settings=settings)
+                        except Exception as e:   # 索引に書けなくても HTML は出す
+                            print(f"[part{part_index} INDEX] 登録失敗: {src.name} / {e}")
+                if data.get("paras") or data.get("slides"):
+                    writer.add(src.name, data); written += 1
             except Exception as e:
                 print(f"[part{part_index} SKIP] {src} / {e}")
 
-        out_dir_p = Path(out_dir)
-        out_dir_p.mkdir(parents=True, exist_ok=True)
-        out_path = out_dir_p / f"{out_stem}_part{part_index}.html"
-        html_text = entries_to_html(entries) if entries else "<!DOCTYPE html><meta charset='UTF-8'><title>抽出テキスト</title><body><p>（内容なし）</p></body>"
-        out_path.write_text(html_text, encoding="utf-8")
-        return (part_index, str(out_path), len(entries))
+        out_path = writer.close(write_empty=True)[0]
+        if index is not None and index.skipped:
+            print(f"[part{part_index} INDEX] 未変更 {index.skipped} 件は索引から（Office 変換なし）")
+        return (part_index, str(out_path), written)
 
     finally:
+        if index is not None:
+            index.close()
         try: word_mgr.close()
         except Exception: pass
         try: ppt_mgr.close()
         except Exception: pass
-        try: pythoncom.CoUninitialize()
-        except Exception: pass
+        close_converters()
+        if pythoncom is not None:
+            try: pythoncom.CoUninitialize()
+            except Exception: pass
 
 # ==================== メイン API（関数名・並列仕様そのまま） ====================
 def convert_office_to_html(
@@ -530,9 +614,7 @@ def convert_office_to_html(
     if DEFER_QUIT_TO_PARENT and KILL_AT_END:
         kill_office_processes()
 
-    results.sort(key=lambda x: x[0])
-    for idx, path_str, cnt in results:
-        print(f"[DONE part{idx}] {path_str}  (収録 {cnt} ファイル)")
+    results.sort(key=lambda x: x[0])   # [DONE partN] は各ワーカーが書き終えた時点で出している
 
     return [Path(p) for _, p, _ in results]
 
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+複数キーワードの一括照合（Aho–Corasick）
+- キーワードは NFKC+casefold して 1 回だけオートマトン化
+- 段落 1 つにつき先頭から 1 回走査するだけ（キーワード数に比例しない）
+- 一致候補には従来どおりの語境界（前後が [0-9A-Za-z_] でない）を後から確認
+- どのキーワードが当たったかを返す（キーワード毎の件数集計用）
+pyahocorasick があればそれを使い、無ければ純 Python の DFA（遷移を全部前計算した表）で走査する。
+"""
+
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+try:
+    import ahocorasick  # pyahocorasick（任意）
+except ImportError:
+    ahocorasick = None
+
+_WORD_CHARS = frozenset("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_")
+
+def nfkc_casefold(s: str) -> str:
+    return unicodedata.normalize("NFKC", s).casefold()
+
+class KeywordMatcher:
+    """
+        m = KeywordMatcher(["UE", "BSR design", "HARQ"])
+        ids = m.match(nfkc_casefold(text))     # 一致したキーワードの番号（m.keywords の添字）
+    同じ正規化結果になるキーワード（"UE" と "ｕｅ" など）は両方とも一致扱い
+    """
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        norm_ids: Dict[str, List[int]] = {}
+        for kw in keywords:
+            kw = (kw or "").strip()
+            if not kw:
+                continue
+            kn = nfkc_casefold(kw)
+            if not kn:
+                continue
+            norm_ids.setdefault(kn, []).append(len(self.keywords))
+            self.keywords.append(kw)
+        self._norm: List[Tuple[str, Tuple[int, ...]]] = [(kn, tuple(ids)) for kn, ids in norm_ids.items()]
+        self._aho = None
+        if ahocorasick is not None and self._norm:
+            self._aho = ahocorasick.Automaton()
+            for n, (kn, _) in enumerate(self._norm):
+                self._aho.add_word(kn, n)
+            self._aho.make_automaton()
+        else:
+            self._build()
+
+    def __bool__(self) -> bool:
+        return bool(self._norm)
+
+    def __getstate__(self):
+        # プロセスプールへ渡す時はキーワードだけ送り、先で作り直す
+        return {"keywords": self.keywords}
+
+    def __setstate__(self, state):
+        self.__init__(state["keywords"])
+
+    # ---------- 純 Python 版 ----------
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for n, (kn, _) in enumerate(self._norm):
+            s = 0
+            for ch in kn:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({}); out.append([])
+                s = nxt
+            out[s].append(n)
+        # 幅優先で fail を張りつつ、遷移表（delta）を fail 先の遷移で埋めて DFA 化
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(g) for g in goto]
+        q = deque(goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, t in goto[s].items():
+                q.append(t)
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[t] = goto[f].get(ch, 0) if s else 0
+                out[t] = out[t] + out[fail[t]]
+            base = delta[fail[s]] if s else {}
+            for ch, t in base.items():
+                delta[s].setdefault(ch, t)
+        self._delta = delta
+        self._out: List[Tuple[int, ...]] = [tuple(o) for o in out]
+
+    def _candidates(self, text: str) -> Iterable[Tuple[int, int]]:
+        """(キーワード番号, 一致の末尾位置 + 1)"""
+        if self._aho is not None:
+            for end, n in self._aho.iter(text):
+                yield n, end + 1
+            return
+        delta, out = self._delta, self._out
+        s = 0
+        for i, ch in enumerate(text):
+            s = delta[s].get(ch, 0)
+            if out[s]:
+                for n in out[s]:
+                    yield n, i + 1
+
+    # ---------- 照合 ----------
+    def match(self, text_norm: str, prefix: bool = False) -> Set[int]:
+        """
+        正規化済みテキストで一致したキーワード番号の集合（語境界を満たすものだけ）
+        prefix=True なら後ろの語境界は見ない（"harq" が "HARQ-ACK" にも "harqs" にも当たる）
+        """
+        hit: Set[int] = set()
+        if not self._norm:
+            return hit
+        done: Set[int] = set()
+        size = len(text_norm)
+        for n, end in self._candidates(text_norm):
+            if n in done:
+                continue
+            start = end - len(self._norm[n][0])
+            if start > 0 and text_norm[start - 1] in _WORD_CHARS:
+                continue
+            if not prefix and end < size and text_norm[end] in _WORD_CHARS:
+                continue
+            done.add(n)
+            hit.update(self._norm[n][1])
+            if len(done) == len(self._norm):
+                break
+        return hit
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Office 変換ワーカーの監視（親プロセス内のスレッド）
+- 文書毎の期限 = WATCHDOG_BASE_SEC + WATCHDOG_SEC_PER_MB × MB（上限 WATCHDOG_MAX_SEC / レーン毎の上限）
+- 期限切れ・異常終了したワーカーは、そのワーカーが起動した Office の PID ごと止めて 1 本補充
+  （taskkill /IM で全 WINWORD.EXE を落とすと他ワーカーの変換まで巻き込むため、PID 指定で止める）
+- 処理中だった文書は WATCHDOG_MAX_ATTEMPTS 回まで再投入、それでも駄目なら quarantine
+
+ワーカー側の約束（status_q へ送る）:
+    ("start", wid, task_id) / ("done", wid, task_id, payload) / ("pid", wid, office_pid)
+    task_q から None を受けたら終了
+"""
+
+import os, time, uuid, queue, threading, subprocess
+import multiprocessing as mp
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# ==================== 調整フラグ ====================
+WATCHDOG_BASE_SEC      = 180      # どんなに小さい文書でもこれだけは待つ
+WATCHDOG_SEC_PER_MB    = 60       # 1MB あたりの追加猶予
+WATCHDOG_MAX_SEC       = 1800     # 期限の上限
+WATCHDOG_MAX_ATTEMPTS  = 2        # 同じ文書を試す回数（超えたら quarantine）
+WATCHDOG_POLL_SEC      = 0.5
+
+def deadline_for(size_bytes: int, cap_sec: Optional[float] = None) -> float:
+    """ファイルサイズから 1 文書の期限（秒）"""
+    sec = WATCHDOG_BASE_SEC + WATCHDOG_SEC_PER_MB * (max(0, int(size_bytes)) / (1024 * 1024))
+    sec = min(sec, WATCHDOG_MAX_SEC)
+    return min(sec, cap_sec) if cap_sec else sec
+
+# ==================== Office PID ====================
+_reporter: Optional[Callable[[int], None]] = None
+
+def set_office_pid_reporter(fn: Optional[Callable[[int], None]]) -> None:
+    """ワーカープロセス内で 1 回設定。以後 report_office_app() で起動した Office の PID を親へ送る"""
+    global _reporter
+    _reporter = fn
+
+def office_app_pid(app) -> Optional[int]:
+    """
+    COM アプリのプロセス ID。PowerPoint は HWND、Word は Caption を一時的に一意にして FindWindow で引く。
+    取れなければ None（その場合はワーカーを止めるだけになる）
+    """
+    try:
+        import win32gui, win32process  # type: ignore
+    except ImportError:
+        return None
+    hwnd = 0
+    try:
+        hwnd = int(app.HWND)
+    except Exception:
+        try:
+            old = app.Caption
+            tag = f"wd-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            app.Caption = tag
+            try:
+                hwnd = win32gui.FindWindow("OpusApp", tag)
+            finally:
+                app.Caption = old
+        except Exception:
+            return None
+    if not hwnd:
+        return None
+    try:
+        return int(win32process.GetWindowThreadProcessId(hwnd)[1])
+    except Exception:
+        return None
+
+def report_office_app(app) -> None:
+    """Office アプリを起動した直後に呼ぶ（監視されていないプロセスでは何もしない）"""
+    if _reporter is None or app is None:
+        return
+    pid = office_app_pid(app)
+    if pid:
+        try:
+            _reporter(pid)
+        except Exception:
+            pass
+
+def kill_pid_tree(pid: int) -> None:
+    """指定 PID（と子プロセス）だけを強制終了。失敗は無視"""
+    try:
+        import psutil  # type: ignore
+        try:
+            proc = psutil.Process(pid)
+            for ch in proc.children(recursive=True):
+                try: ch.kill()
+                except Exception: pass
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+        return
+    except ImportError:
+        pass
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/PID", str(pid), "/F", "/T"], capture_output=True, text=True, check=False)
+    else:
+        try: os.kill(pid, 9)
+        except Exception: pass
+
+# ==================== 監視 ====================
+class WorkerSupervisor:
+    """
+    1 つの task_q を共有する常駐ワーカー群を監視する。
+        sup = WorkerSupervisor("W", spawn, workers)
+        sup.submit(task_id, payload, deadline_sec)   # 何度でも（ジェネレータから逐次でよい）
+        sup.wait()                                    # 全タスクの完了/quarantine 待ち → 終了センチネル → join
+    spawn(wid, task_q, status_q) -> mp.Process（start 済みで返す）
+    コールバックは監視スレッドから呼ばれる:
+        on_done(task_id, payload) / on_give_up(task_id, reason) / on_retry(task_id, attempt, reason)
+    """
+    def __init__(self, name: str, spawn: Callable[[int, Any, Any], mp.Process], workers: int,
+                 on_done: Optional[Callable[[Any, Any], None]] = None,
+                 on_give_up: Optional[Callable[[Any, str], None]] = None,
+                 on_retry: Optional[Callable[[Any, int, str], None]] = None,
+                 max_attempts: int = WATCHDOG_MAX_ATTEMPTS):
+        self.name = name
+        self._spawn_fn = spawn
+        self.workers = max(1, int(workers))
+        self.on_done = on_done
+        self.on_give_up = on_give_up
+        self.on_retry = on_retry
+        self.max_attempts = max(1, int(max_attempts))
+        self.task_q: Optional[Any] = None
+        self.status_q: Optional[Any] = None
+        self.procs: Dict[int, mp.Process] = {}
+        self.office_pids: Dict[int, List[int]] = {}
+        self.running: Dict[int, Tuple[Any, float]] = {}        # wid → (task_id, 着手時刻)
+        self._tasks: Dict[Any, Tuple[Any, float, int]] = {}    # task_id → (payload, 期限, 試行回数)
+        self._lock = threading.Lock()
+        self._idle = threading.Event(); self._idle.set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_wid = 0
+        self.killed = 0
+        self.quarantined: List[Tuple[Any, str]] = []
+
+    # ---------- 起動/投入 ----------
+    def _spawn(self) -> None:
+        self._next_wid += 1
+        self.procs[self._next_wid] = self._spawn_fn(self._next_wid, self.task_q, self.status_q)
+
+    def _start(self) -> None:
+        self.task_q, self.status_q = mp.Queue(), mp.Queue()
+        for _ in range(self.workers):
+            self._spawn()
+        self._thread = threading.Thread(target=self._loop, name=f"watchdog-{self.name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, task_id: Any, payload: Any, deadline_sec: float) -> None:
+        if self.task_q is None:
+            self._start()
+        with self._lock:
+            self._tasks[task_id] = (payload, float(deadline_sec), 1)
+            self._idle.clear()
+        self.task_q.put(payload)
+
+    # ---------- 監視スレッド ----------
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                msg = self.status_q.get(timeout=WATCHDOG_POLL_SEC)
+                self._handle(msg)
+                continue
+            except queue.Empty:
+                pass
+            except (EOFError, OSError):
+                pass
+            self._check()
+
+    def _handle(self, msg) -> None:
+        kind, wid = msg[0], msg[1]
+        if kind == "pid":
+            self.office_pids.setdefault(wid, []).append(int(msg[2]))
+        elif kind == "start":
+            self.running[wid] = (msg[2], time.time())
+        elif kind == "done":
+            self.running.pop(wid, None)
+            with self._lock:
+                known = self._tasks.pop(msg[2], None) is not None
+                if not self._tasks: self._idle.set()
+            if known and self.on_done:
+                self.on_done(msg[2], msg[3])
+        self._check()
+
+    def _check(self) -> None:
+        now = time.time()
+        for wid, proc in list(self.procs.items()):
+            cur = self.running.get(wid)
+            if cur is not None:
+                task_id, t0 = cur
+                with self._lock:
+                    deadline = self._tasks.get(task_id, (None, float("inf"), 0))[1]
+                if now - t0 > deadline:
+                    self._recycle(wid, f"timeout>{deadline:.0f}s")
+                    continue
+            if not proc.is_alive() and (cur is not None or not self._stop.is_set()):
+                self._recycle(wid, f"worker exit {proc.exitcode}")
+
+    def _recycle(self, wid: int, reason: str) -> None:
+        """ワーカーと、そのワーカーの Office だけを止めて補充。処理中の文書は再投入 or quarantine"""
+        proc = self.procs.pop(wid)
+        if proc.is_alive():
+            proc.kill()
+        proc.join(5)
+        for pid in self.office_pids.pop(wid, []):
+            kill_pid_tree(pid)
+        self.killed += 1
+        cur = self.running.pop(wid, None)
+        self._spawn()
+        if cur is None:
+            return
+        task_id = cur[0]
+        with self._lock:
+            if task_id not in self._tasks:
+                return
+            payload, deadline, attempt = self._tasks[task_id]
+            if attempt < self.max_attempts:
+                self._tasks[task_id] = (payload, deadline, attempt + 1)
+                retry = True
+            else:
+                del self._tasks[task_id]
+                if not self._tasks: self._idle.set()
+                retry = False
+        if retry:
+            print(f"[{self.name} WATCHDOG] {reason} → 再投入 ({attempt + 1}/{self.max_attempts})", flush=True)
+            if self.on_retry: self.on_retry(task_id, attempt + 1, reason)
+            self.task_q.put(payload)
+        else:
+            print(f"[{self.name} WATCHDOG] {reason} → quarantine", flush=True)
+            self.quarantined.append((task_id, reason))
+            if self.on_give_up: self.on_give_up(task_id, reason)
+
+    # ---------- 終了 ----------
+    def wait(self) -> None:
+        """全タスクが done / quarantine になるまで待ち、ワーカーを終了させる"""
+        if self.task_q is None:
+            return
+        self._idle.wait()
+        self._stop.set()
+        self._thread.join()
+        for _ in self.procs:
+            self.task_q.put(None)
+        for proc in self.procs.values():
+            proc.join()
+        # 終了センチネルの後に届いた分（done の取りこぼし防止）
+        try:
+            while True:
+                self._handle(self.status_q.get_nowait())
+        except queue.Empty:
+            pass
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+PowerPoint(.pptx/.pptm) → スライド毎テキスト（COM 不使用・純 Python）
+- ppt/presentation.xml の sldIdLst 順に ppt/slides/slideN.xml を直接読む
+- グループ図形（p:grpSp）・表（graphicFrame の a:tbl）・ノート（notesSlide）も拾う
+- 戻り値は COM 版と同じ形: html_row 用 {no: [paras]} / extract_paragraphs 用 {no: {"paras": [...]}}
+- スライド画像化は含まない（必要なら COM 側の描画を別ステップで呼ぶ）
+"""
+
+import re, posixpath, zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+import xml.etree.ElementTree as ET
+
+# ==================== 調整フラグ ====================
+OOXML_PPT_EXTS      = {".pptx", ".pptm"}
+INCLUDE_NOTES       = True       # ノートのテキストもスライドの段落に含める
+NOTES_PREFIX        = "[Note] "  # ノート由来の段落の先頭に付ける（空文字で付けない）
+NOTES_SKIP_PH_TYPES = {"sldNum", "dt", "ftr", "hdr", "sldImg"}  # ノート側で読まないプレースホルダー
+
+# ==================== 名前空間 ====================
+_A_NS = {
+    "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "http://purl.oclc.org/ooxml/drawingml/main",                  # Strict
+}
+_P_NS = {
+    "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "http://purl.oclc.org/ooxml/presentationml/main",
+}
+_R_NS = {
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "http://purl.oclc.org/ooxml/officeDocument/relationships",
+}
+_MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+
+_para_splitter = re.compile(r"[\r\n\x0b]+")
+
+def _split(tag: str) -> Tuple[str, str]:
+    if tag[:1] == "{":
+        ns, _, local = tag[1:].partition("}")
+        return ns, local
+    return "", tag
+
+def _attr(elem: ET.Element, local: str, ns_set=None):
+    for k, v in elem.attrib.items():
+        ns, name = _split(k)
+        if name == local and (ns_set is None or ns in ns_set):
+            return v
+    return None
+
+def _rels_path(part: str) -> str:
+    d, name = posixpath.split(part)
+    return posixpath.join(d, "_rels", name + ".rels")
+
+def _read_rels(zf: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """rId → (type 末尾, パッケージ内パス)。外部リンクは除外"""
+    path = _rels_path(part)
+    if path not in zf.NameToInfo:
+        return {}
+    base = posixpath.dirname(part)
+    out: Dict[str, Tuple[str, str]] = {}
+    for rel in ET.fromstring(zf.read(path)):
+        if _split(rel.tag)[1] != "Relationship":
+            continue
+        if (rel.get("TargetMode") or "").lower() == "external":
+            continue
+        target = rel.get("Target") or ""
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+        out[rel.get("Id") or ""] = ((rel.get("Type") or "").rsplit("/", 1)[-1], target)
+    return out
+
+def _presentation_part(zf: zipfile.ZipFile) -> str:
+    for rtype, target in _read_rels(zf, "").values():
+        if rtype == "officeDocument":
+            return target
+    return "ppt/presentation.xml"
+
+def _slide_parts(zf: zipfile.ZipFile) -> List[str]:
+    """表示順（sldIdLst の順）のスライドパス"""
+    pres = _presentation_part(zf)
+    rels = _read_rels(zf, pres)
+    out: List[str] = []
+    root = ET.fromstring(zf.read(pres))
+    for el in root.iter():
+        ns, local = _split(el.tag)
+        if ns in _P_NS and local == "sldId":
+            rid = _attr(el, "id", _R_NS)
+            rel = rels.get(rid or "")
+            if rel and rel[1] in zf.NameToInfo:
+                out.append(rel[1])
+    return out
+
+def _iter_part_paragraphs(zf: zipfile.ZipFile, part: str, skip_ph_types=frozenset()) -> Iterator[str]:
+    """
+    スライド/ノート XML を iterparse し、a:p（段落）毎の文字列を文書順に返す。
+    グループ図形・表セルも XML 上の入れ子順にそのまま出てくる。
+    skip_ph_types に当たるプレースホルダー図形（p:sp）の中身は読まない。
+    """
+    chunks: List[str] = []
+    in_p = 0
+    fallback = 0
+    sp_skip: List[bool] = []   # p:sp の入れ子毎に「読まない」か
+    with zf.open(part) as f:
+        for ev, el in ET.iterparse(f, events=("start", "end")):
+            ns, local = _split(el.tag)
+            if ns == _MC_NS and local == "Fallback":
+                fallback += 1 if ev == "start" else -1
+                continue
+            if fallback:
+                continue
+            if ns in _P_NS:
+                if local == "sp":
+                    if ev == "start":
+                        sp_skip.append(False)
+                    else:
+                        if sp_skip:
+                            sp_skip.pop()
+                        el.clear()
+                elif local == "ph" and ev == "start" and sp_skip and skip_ph_types:
+                    if (el.get("type") or "") in skip_ph_types:
+                        sp_skip[-1] = True
+                continue
+            if ns not in _A_NS:
+                continue
+            if any(sp_skip):
+                continue
+            if local == "p":
+                if ev == "start":
+                    in_p += 1
+                    if in_p == 1:
+                        chunks = []
+                else:
+                    in_p -= 1
+                    if in_p == 0:
+                        yield "".join(chunks)
+                continue
+            if ev != "end" or not in_p:
+                continue
+            if local == "t":
+                if el.text:
+                    chunks.append(el.text)
+            elif local == "br":
+                chunks.append("\n")
+
+def _clean_paras(raws: List[str], prefix: str = "") -> List[str]:
+    out: List[str] = []
+    for raw in raws:
+        for x in _para_splitter.split(raw or ""):
+            x = x.replace("\x07", "").replace("\u200b", "").replace("\ufeff", "").strip()
+            if x:
+                out.append(prefix + x)
+    return out
+
+# ==================== 公開 API ====================
+def is_ooxml_ppt(src: Path) -> bool:
+    return Path(src).suffix.lower() in OOXML_PPT_EXTS
+
+def extract_pptx_slide_texts(src: Path, include_notes: bool = INCLUDE_NOTES) -> Dict[int, List[str]]:
+    """
+    html_row.extract_ppt_text の COM 不要版: {スライド番号(1始まり): [段落...]}
+    """
+    result: Dict[int, List[str]] = {}
+    with zipfile.ZipFile(Path(src)) as zf:
+        for no, part in enumerate(_slide_parts(zf), 1):
+            paras = _clean_paras(list(_iter_part_paragraphs(zf, part)))
+            if include_notes:
+                notes = next((t for ty, t in _read_rels(zf, part).values()
+                              if ty == "notesSlide" and t in zf.NameToInfo), None)
+                if notes:
+                    paras.extend(_clean_paras(
+                        list(_iter_part_paragraphs(zf, notes, frozenset(NOTES_SKIP_PH_TYPES))), NOTES_PREFIX))
+            result[no] = paras
+    return result
+
+def extract_pptx_slides(src: Path, include_notes: bool = INCLUDE_NOTES) -> Dict[int, Dict[str, object]]:
+    """
+    extract_paragraphs.extract_ppt_with_images と同じ形（img_rel 無し）: {no: {"paras": [...]}}
+    画像が必要なら呼び出し側で COM 描画の結果（img_rel）をマージする。
+    """
+    return {no: {"paras": paras} for no, paras in extract_pptx_slide_texts(src, include_notes).items()}
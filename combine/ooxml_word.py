@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+Word(.docx/.docm) → テキスト / HTML 断片（COM 不使用・純 Python）
+- ZIP コンテナから word/document.xml ＋ header/footer/footnotes/endnotes を直接読む
+- XML は iterparse でストリーム処理（段落ごとに clear してメモリを抑える）
+- 画像は各パートの .rels から media を引き、assets へコピーして <img> で参照
+  （asset_store.WORD_ASSET_CAS なら assets/cas/ に内容ハッシュ名で 1 つだけ置く）
+- .doc / .rtf（バイナリ/RTF）は対象外 → 呼び出し側で COM にフォールバック
+"""
+
+import os, re, html, shutil, posixpath, zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import xml.etree.ElementTree as ET
+
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from combine.asset_store import (
+    store_for,
+    )
+
+# ==================== 調整フラグ ====================
+OOXML_WORD_EXTS        = {".docx", ".docm"}
+INCLUDE_HEADERS_FOOTERS = True     # ヘッダー/フッターも拾う（重複は 1 回だけ）
+INCLUDE_NOTES           = True     # 脚注/文末脚注も拾う
+WEB_IMAGE_EXTS          = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".svg", ".webp"}  # これ以外（emf/wmf 等）は [図] 表記
+
+# ==================== 名前空間 ====================
+_W_NS = {
+    "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "http://purl.oclc.org/ooxml/wordprocessingml/main",           # Strict
+}
+_R_NS = {
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "http://purl.oclc.org/ooxml/officeDocument/relationships",
+}
+_MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+_A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_V_NS = "urn:schemas-microsoft-com:vml"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_HEADING_NAME = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+
+def _split(tag: str) -> Tuple[str, str]:
+    if tag[:1] == "{":
+        ns, _, local = tag[1:].partition("}")
+        return ns, local
+    return "", tag
+
+def _attr(elem: ET.Element, local: str, ns_set=None) -> Optional[str]:
+    """名前空間違い（Transitional/Strict）を吸収して属性を取る"""
+    for k, v in elem.attrib.items():
+        ns, name = _split(k)
+        if name == local and (ns_set is None or ns in ns_set):
+            return v
+    return None
+
+# ==================== パッケージ（ZIP）読み ====================
+def _rels_path(part: str) -> str:
+    d, name = posixpath.split(part)
+    return posixpath.join(d, "_rels", name + ".rels")
+
+def _read_rels(zf: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str, bool]]:
+    """rId → (type 末尾, パッケージ内パス or 外部 URL, external)"""
+    path = _rels_path(part)
+    if path not in zf.NameToInfo:
+        return {}
+    base = posixpath.dirname(part)
+    out: Dict[str, Tuple[str, str, bool]] = {}
+    root = ET.fromstring(zf.read(path))
+    for rel in root:
+        if _split(rel.tag)[1] != "Relationship":
+            continue
+        rid = rel.get("Id") or ""
+        rtype = (rel.get("Type") or "").rsplit("/", 1)[-1]
+        target = rel.get("Target") or ""
+        external = (rel.get("TargetMode") or "").lower() == "external"
+        if not external:
+            target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+        out[rid] = (rtype, target, external)
+    return out
+
+def _main_part(zf: zipfile.ZipFile) -> str:
+    for rtype, target, _ in _read_rels(zf, "").values():
+        if rtype == "officeDocument":
+            return target
+    return "word/document.xml"
+
+def _heading_levels(zf: zipfile.ZipFile, main_part: str, rels: Dict[str, Tuple[str, str, bool]]) -> Dict[str, int]:
+    """styleId → 見出しレベル（1..9）。名前 'heading N' か outlineLvl で判定"""
+    styles = next((t for ty, t, ext in rels.values() if ty == "styles" and not ext), None)
+    if not styles or styles not in zf.NameToInfo:
+        return {}
+    levels: Dict[str, int] = {}
+    root = ET.fromstring(zf.read(styles))
+    for st in root:
+        ns, local = _split(st.tag)
+        if local != "style" or ns not in _W_NS:
+            continue
+        sid = _attr(st, "styleId", _W_NS)
+        if not sid:
+            continue
+        for ch in st.iter():
+            cns, clocal = _split(ch.tag)
+            if cns not in _W_NS:
+                continue
+            if clocal == "name":
+                m = _HEADING_NAME.match(_attr(ch, "val", _W_NS) or "")
+                if m:
+                    levels[sid] = int(m.group(1)); break
+            elif clocal == "outlineLvl":
+                v = _attr(ch, "val", _W_NS) or ""
+                if v.isdigit() and int(v) < 9:
+                    levels[sid] = int(v) + 1; break
+    return levels
+
+# ==================== 本体（iterparse） ====================
+class _Para:
+    __slots__ = ("chunks", "level", "images")
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.level = 0
+        self.images: List[str] = []   # 画像 rId（段落内の出現順）
+
+def _iter_part_events(zf: zipfile.ZipFile, part: str,
+                      heading_levels: Dict[str, int]) -> Iterator[Tuple[str, object]]:
+    """
+    パート 1 つを iterparse し、次のイベントを順に返す:
+      ("p", _Para) / ("tbl", "start"|"end") / ("tr", ...) / ("tc", ...) / ("note", id)
+    mc:Fallback（AlternateContent の代替表現）は重複するので読まない。
+    """
+    stack: List[_Para] = []
+    skip = 0
+    with zf.open(part) as f:
+        for ev, el in ET.iterparse(f, events=("start", "end")):
+            ns, local = _split(el.tag)
+            if ns == _MC_NS and local == "Fallback":
+                skip += 1 if ev == "start" else -1
+                if ev == "end":
+                    el.clear()
+                continue
+            if skip:
+                continue
+
+            if ns in _W_NS:
+                if local == "p":
+                    if ev == "start":
+                        stack.append(_Para())
+                    else:
+                        para = stack.pop() if stack else _Para()
+                        el.clear()
+                        yield ("p", para)
+                    continue
+                if local in ("tbl", "tr", "tc"):
+                    yield (local, ev)
+                    if ev == "end" and local == "tbl":
+                        el.clear()
+                    continue
+                if local in ("footnote", "endnote") and ev == "start":
+                    yield ("note", _attr(el, "id", _W_NS))
+                    continue
+                if ev != "end" or not stack:
+                    continue
+                cur = stack[-1]
+                if local == "t":
+                    if el.text:
+                        cur.chunks.append(el.text)
+                elif local == "tab":
+                    cur.chunks.append("\t")
+                elif local in ("br", "cr"):
+                    cur.chunks.append("\n")
+                elif local == "noBreakHyphen":
+                    cur.chunks.append("-")
+                elif local in ("footnoteReference", "endnoteReference"):
+                    nid = _attr(el, "id", _W_NS)
+                    if nid:
+                        cur.chunks.append(f"[{nid}]")
+                elif local == "pStyle":
+                    cur.level = heading_levels.get(_attr(el, "val", _W_NS) or "", cur.level)
+                elif local == "outlineLvl":
+                    v = _attr(el, "val", _W_NS) or ""
+                    if v.isdigit() and int(v) < 9:
+                        cur.level = int(v) + 1
+                continue
+
+            if ev == "end" and stack:
+                if ns == _A_NS and local == "blip":
+                    rid = _attr(el, "embed", _R_NS)
+                    if rid: stack[-1].images.append(rid)
+                elif ns == _V_NS and local == "imagedata":
+                    rid = _attr(el, "id", _R_NS)
+                    if rid: stack[-1].images.append(rid)
+
+def _para_text(p: _Para) -> str:
+    s = "".join(p.chunks).replace("\r", "").replace("\x07", "")
+    return s.strip()
+
+def _story_parts(zf: zipfile.ZipFile, rels: Dict[str, Tuple[str, str, bool]]) -> List[str]:
+    """ヘッダー/フッター/脚注/文末脚注パート（rels の出現順、重複除去）"""
+    want = set()
+    if INCLUDE_HEADERS_FOOTERS: want |= {"header", "footer"}
+    if INCLUDE_NOTES: want |= {"footnotes", "endnotes"}
+    seen: List[str] = []
+    for rtype, target, ext in rels.values():
+        if rtype in want and not ext and target in zf.NameToInfo and target not in seen:
+            seen.append(target)
+    order = {"header": 0, "footer": 1, "footnotes": 2, "endnotes": 3}
+    kinds = {t: r for r, t, _ in rels.values()}
+    seen.sort(key=lambda t: order.get(kinds.get(t, ""), 9))
+    return seen
+
+# ==================== 公開 API ====================
+def is_ooxml_word(src: Path) -> bool:
+    return Path(src).suffix.lower() in OOXML_WORD_EXTS
+
+def extract_docx_paragraphs(src: Path) -> List[str]:
+    """
+    html_row.extract_word_text の COM 不要版。
+    本文の段落（表セル内も 1 段落ずつ）→ ヘッダー/フッター/脚注 の順、重複除去して返す。
+    """
+    src = Path(src)
+    with zipfile.ZipFile(src) as zf:
+        main = _main_part(zf)
+        rels = _read_rels(zf, main)
+        levels = _heading_levels(zf, main, rels)
+        out: List[str] = []
+        seen = set()
+        for part in [main] + _story_parts(zf, rels):
+            for kind, obj in _iter_part_events(zf, part, levels):
+                if kind != "p":
+                    continue
+                t = _para_text(obj)
+                for line in t.split("\n"):
+                    line = line.strip()
+                    if line and line not in seen:
+                        seen.add(line); out.append(line)
+    return out
+
+def extract_docx_html_with_images(src: Path, assets_base_dir: Path, html_base_dir: Path, asset_label: str) -> str:
+    """
+    extract_paragraphs.extract_word_html_with_images の COM 不要版（<body> 内 HTML を返す）。
+    - 見出しスタイル → <hN>、表 → <table>、画像 → assets/cas/（または assets/word/<label>/）に置いて <img>
+    - ヘッダー/フッター/脚注は本文の後ろにまとめて出す
+    """
+    src = Path(src)
+    store = store_for(assets_base_dir)
+    dest_img_dir = Path(assets_base_dir) / "word" / asset_label
+    dest_rel: Optional[str] = None
+    copied: Dict[str, str] = {}      # パッケージ内パス → HTML からの相対パス
+    out: List[str] = []
+
+    def _rel_from_html() -> str:
+        nonlocal dest_rel
+        if dest_rel is None:
+            dest_img_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                dest_rel = dest_img_dir.relative_to(html_base_dir).as_posix()
+            except Exception:
+                dest_rel = os.path.relpath(dest_img_dir, html_base_dir).replace("\\", "/")
+        return dest_rel
+
+    def _image_html(zf: zipfile.ZipFile, part_rels: Dict[str, Tuple[str, str, bool]], rid: str) -> str:
+        rel = part_rels.get(rid)
+        if not rel or rel[2] or rel[1] not in zf.NameToInfo:
+            return ""
+        target = rel[1]
+        name = posixpath.basename(target)
+        if Path(name).suffix.lower() not in WEB_IMAGE_EXTS:
+            return f"<p>[図: {html.escape(name)}]</p>"
+        if target not in copied and store is not None:
+            with zf.open(target) as s:
+                dst = store.add_stream(s, Path(name).suffix)
+            try:
+                copied[target] = dst.relative_to(html_base_dir).as_posix()
+            except Exception:
+                copied[target] = os.path.relpath(dst, html_base_dir).replace("\\", "/")
+        elif target not in copied:
+            base = _rel_from_html()
+            dst = dest_img_dir / name
+            with zf.open(target) as s, open(dst, "wb") as d:
+                shutil.copyfileobj(s, d)
+            copied[target] = f"{base}/{name}"
+        return f"<img src='{html.escape(copied[target])}' alt='{html.escape(name)}'>"
+
+    def _render_part(zf: zipfile.ZipFile, part: str, levels: Dict[str, int],
+                     seen_text: Optional[set] = None) -> List[str]:
+        part_rels = _read_rels(zf, part)
+        buf: List[str] = []
+        note_prefix = ""
+        for kind, obj in _iter_part_events(zf, part, levels):
+            if kind == "p":
+                para: _Para = obj  # type: ignore[assignment]
+                t = _para_text(para)
+                imgs = [h for h in (_image_html(zf, part_rels, r) for r in para.images) if h]
+                if t and note_prefix:
+                    t = f"{note_prefix} {t}"; note_prefix = ""
+                if t and seen_text is not None:
+                    if t in seen_text:
+                        t = ""
+                    else:
+                        seen_text.add(t)
+                if t:
+                    body = html.escape(t).replace("\n", "<br>")
+                    if para.level:
+                        lv = min(para.level, 6)
+                        buf.append(f"<h{lv}>{body}</h{lv}>")
+                    else:
+                        buf.append(f"<p>{body}</p>")
+                buf.extend(imgs)
+            elif kind == "note":
+                note_prefix = f"[{obj}]" if obj else ""
+            else:
+                tag = {"tbl": "table", "tr": "tr", "tc": "td"}[kind]
+                buf.append(f"<{tag}>" if obj == "start" else f"</{tag}>")
+        return buf
+
+    with zipfile.ZipFile(src) as zf:
+        main = _main_part(zf)
+        rels = _read_rels(zf, main)
+        levels = _heading_levels(zf, main, rels)
+        out.extend(_render_part(zf, main, levels))
+        extras: List[str] = []
+        seen_text: set = set()
+        for part in _story_parts(zf, rels):
+            extras.extend(_render_part(zf, part, levels, seen_text))
+        if extras:
+            out.append("<div class='word-stories'><hr>")
+            out.extend(extras)
+            out.append("</div>")
+    return "\n".join(out)
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+抽出した段落の全文検索インデックス（SQLite FTS5）
+- 抽出ステージが 1 文書ずつ（ファイル名・スライド番号・段落番号・原文・正規化文）を登録
+- 文書は (collection, パス) 単位。内容ハッシュと抽出設定が同じなら何もしない / 変わっていれば入れ替え
+- 検索は FTS5 の trigram（部分一致）で候補を絞り、filter_extracted_html_by_keywords と同じ語境界ルールで確認
+  → 新しいキーワードで昔の会合を調べ直すのに Office 変換も HTML の再パースも要らない
+- 結果は filter_extracted_html_by_keywords と同じ形の HTML に出せる
+
+CLI:
+    python combine/paragraph_index.py search --index D:/out/paragraphs.sqlite3 HARQ "BSR design" --out D:/out/hits.html
+    python combine/paragraph_index.py search --prefix harq --collection row_result
+    python combine/paragraph_index.py stats --index D:/out/paragraphs.sqlite3
+"""
+
+import os, time, sqlite3, argparse
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from combine.conversion_cache import (
+    sha256_of_file,
+    )
+
+from combine.keyword_matcher import (
+    KeywordMatcher,
+    nfkc_casefold,
+    )
+
+# ==================== 調整フラグ ====================
+INDEX_FILE_NAME      = "paragraphs.sqlite3"      # 既定: 出力フォルダ直下
+ENV_INDEX_PATH       = "OFFICE_PARAGRAPH_INDEX"  # 指定があればこちら（会合を跨いで 1 つにまとめる場合）
+INDEX_FORMAT_VER     = "1"                       # 段落の切り方を変えたら上げる（旧登録は再登録される）
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs(
+    doc_id      INTEGER PRIMARY KEY,
+    collection  TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    sha256      TEXT NOT NULL,
+    settings    TEXT NOT NULL DEFAULT '',
+    kind        TEXT NOT NULL,
+    slide_nos   TEXT NOT NULL,
+    indexed_at  REAL NOT NULL,
+    UNIQUE(collection, path)
+);
+CREATE TABLE IF NOT EXISTS paras(
+    id      INTEGER PRIMARY KEY,
+    doc_id  INTEGER NOT NULL REFERENCES docs(doc_id) ON DELETE CASCADE,
+    slide   INTEGER,
+    idx     INTEGER NOT NULL,
+    raw     TEXT NOT NULL,
+    norm    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paras_doc ON paras(doc_id, slide, idx);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS paras_fts USING fts5(norm, content='paras', content_rowid='id', tokenize='{tok}');
+CREATE TRIGGER IF NOT EXISTS paras_ai AFTER INSERT ON paras BEGIN
+    INSERT INTO paras_fts(rowid, norm) VALUES (new.id, new.norm);
+END;
+CREATE TRIGGER IF NOT EXISTS paras_ad AFTER DELETE ON paras BEGIN
+    INSERT INTO paras_fts(paras_fts, rowid, norm) VALUES ('delete', old.id, old.norm);
+END;
+"""
+
+def document_digest(path: Path) -> str:
+    """登録の単位になる内容ハッシュ（形式バージョン込み）"""
+    return f"{INDEX_FORMAT_VER}:{sha256_of_file(path)}"
+
+def _fts_phrase(kn: str) -> str:
+    return '"' + kn.replace('"', '""') + '"'
+
+class ParagraphIndex:
+    """
+    登録（抽出ワーカー内。複数プロセスから同時に書いてよい）:
+        idx = ParagraphIndex.for_output(out_dir)
+        digest, entry = idx.lookup(src, "row_result", settings)     # 未変更なら前回の段落（Office 不要）
+        if entry is None:
+            idx.add_document(src, "row_result", paras=[...], digest=digest, settings=settings)            # Word
+            idx.add_document(src, "row_result", slides={1: [...], ...}, digest=digest, settings=settings)  # PPT
+    settings は段落の取り方を変える設定（バックエンド等）の文字列。違えば未登録扱い
+    検索:
+        result, hits = idx.search(["HARQ", "BSR design"])
+        idx.write_filtered_html(["HARQ"], "hits.html")
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self.trigram = self._ensure_fts()
+        self._conn.commit()
+        self.added = 0
+        self.skipped = 0
+        self.last_hits: Tuple[List[str], List[int]] = ([], [])
+
+    @classmethod
+    def for_output(cls, out_dir: Path) -> "ParagraphIndex":
+        env = os.environ.get(ENV_INDEX_PATH)
+        return cls(Path(env) if env else Path(out_dir) / INDEX_FILE_NAME)
+
+    def _migrate(self) -> None:
+        """settings 列の無い旧い索引に列を足す（旧登録は設定不明 = 次回の lookup で再登録）"""
+        cols = {r[1] for r in self._conn.execute("PRAGMA table_info(docs)")}
+        if "settings" not in cols:
+            self._conn.execute("ALTER TABLE docs ADD COLUMN settings TEXT NOT NULL DEFAULT '?'")
+
+    def _ensure_fts(self) -> bool:
+        """trigram（SQLite 3.34+）が使えればそれ。無ければ unicode61（その場合の検索は候補を LIKE で拾う）"""
+        row = self._conn.execute("SELECT sql FROM sqlite_master WHERE name='paras_fts'").fetchone()
+        if row:
+            return "trigram" in (row[0] or "")
+        try:
+            self._conn.executescript(_FTS_SCHEMA.format(tok="trigram"))
+            return True
+        except sqlite3.OperationalError:
+            self._conn.executescript(_FTS_SCHEMA.format(tok="unicode61"))
+            return False
+
+    # ---------- 登録 ----------
+    def lookup(self, src: Path, collection: str, settings: str = "") -> Tuple[str, Optional[Dict[str, object]]]:
+        """
+        (内容ハッシュ, 登録済みの段落) を返す。未登録/内容か抽出設定が変わっていれば段落は None
+        段落は {"type":"word","paras":[...]} / {"type":"ppt","slides":{no:[...]}}（html_row の entry と同じ形）
+        """
+        src = Path(src)
+        digest = document_digest(src)
+        row = self._conn.execute("SELECT doc_id, sha256, kind, slide_nos, settings FROM docs WHERE collection=? AND path=?",
+                                 (collection, str(src.resolve()))).fetchone()
+        if not row or row[1] != digest or row[4] != settings:
+            return digest, None
+        paras: List[str] = []
+        # 段落の無いスライドも見出しは出すので、スライド番号は docs 側に持っている
+        slides: Dict[int, List[str]] = {int(n): [] for n in row[3].split(",") if n}
+        for slide, raw in self._conn.execute("SELECT slide, raw FROM paras WHERE doc_id=? ORDER BY slide, idx", (row[0],)):
+            if slide is None:
+                paras.append(raw)
+            else:
+                slides.setdefault(slide, []).append(raw)
+        self.skipped += 1
+        if row[2] == "ppt":
+            return digest, {"type": "ppt", "slides": slides}
+        return digest, {"type": "word", "paras": paras}
+
+    def add_document(self, src: Path, collection: str,
+                     paras: Optional[Sequence[str]] = None,
+                     slides: Optional[Dict[int, Sequence[str]]] = None,
+                     digest: Optional[str] = None,
+                     settings: str = "") -> bool:
+        """登録/更新したら True、内容ハッシュと抽出設定が同じで何もしなかったら False"""
+        src = Path(src)
+        digest = digest or document_digest(src)
+        key = str(src.resolve())
+        row = self._conn.execute("SELECT doc_id, sha256, settings FROM docs WHERE collection=? AND path=?",
+                                 (collection, key)).fetchone()
+        if row and row[1] == digest and row[2] == settings:
+            return False
+        rows: List[Tuple[Optional[int], int, str]] = []
+        for i, p in enumerate(paras or []):
+            rows.append((None, i, p))
+        for no in sorted(slides or {}):
+            for i, p in enumerate(slides[no] or []):
+                rows.append((int(no), i, p))
+        kind = "ppt" if slides is not None else "word"
+        slide_nos = ",".join(str(int(n)) for n in sorted(slides or {}))
+        with self._conn:
+            if row:
+                self._conn.execute("DELETE FROM paras WHERE doc_id=?", (row[0],))
+                self._conn.execute("UPDATE docs SET name=?, sha256=?, settings=?, kind=?, slide_nos=?, indexed_at=? WHERE doc_id=?",
+                                   (src.name, digest, settings, kind, slide_nos, time.time(), row[0]))
+                doc_id = row[0]
+            else:
+                doc_id = self._conn.execute(
+                    "INSERT INTO docs(collection, path, name, sha256, settings, kind, slide_nos, indexed_at) VALUES(?,?,?,?,?,?,?,?)",
+                    (collection, key, src.name, digest, settings, kind, slide_nos, time.time())).lastrowid
+            self._conn.executemany(
+                "INSERT INTO paras(doc_id, slide, idx, raw, norm) VALUES(?,?,?,?,?)",
+                [(doc_id, slide, i, raw, nfkc_casefold(raw)) for slide, i, raw in rows])
+        self.added += 1
+        return True
+
+    # ---------- 検索 ----------
+    def _candidate_ids(self, kn: str, collections: Optional[Sequence[str]]) -> Iterable[int]:
+        where, args = "", []
+        if collections:
+            where = f" AND p.doc_id IN (SELECT doc_id FROM docs WHERE collection IN ({','.join('?' * len(collections))}))"
+            args = list(collections)
+        if self.trigram and len(kn) >= 3:
+            sql = ("SELECT p.id FROM paras_fts f JOIN paras p ON p.id = f.rowid "
+                   "WHERE paras_fts MATCH ?" + where)
+            return (r[0] for r in self._conn.execute(sql, [_fts_phrase(kn)] + args))
+        # trigram は 3 文字未満を引けない → 正規化文を直接なめる
+        sql = "SELECT p.id FROM paras p WHERE instr(p.norm, ?) > 0" + where
+        return (r[0] for r in self._conn.execute(sql, [kn] + args))
+
+    def search(self, keywords: Iterable[str], collections: Optional[Sequence[str]] = None,
+               prefix: bool = False) -> Tuple["OrderedDict[str, Dict[str, object]]", List[str], List[int]]:
+        """
+        いずれかのキーワードを含む段落（filter_extracted_html_by_keywords と同じ照合ルール）。
+        "BSR design" のような空白入りはフレーズとして扱う。prefix=True は前方一致（後ろの語境界を見ない）
+        戻り値: (結果 {ファイル名: {"word": [...], "ppt": {slide: [...]}}}, キーワード, キーワード毎の段落数)
+        """
+        matcher = KeywordMatcher(keywords)
+        hits = [0] * len(matcher.keywords)
+        result: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        if not matcher:
+            return result, matcher.keywords, hits
+        ids = set()
+        for kn in {nfkc_casefold(k) for k in matcher.keywords}:
+            ids.update(self._candidate_ids(kn, collections))
+        if not ids:
+            return result, matcher.keywords, hits
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS _hit(id INTEGER PRIMARY KEY)")
+        self._conn.execute("DELETE FROM _hit")
+        self._conn.executemany("INSERT INTO _hit(id) VALUES(?)", ((i,) for i in ids))
+        rows = self._conn.execute(
+            "SELECT d.name, p.slide, p.raw, p.norm FROM _hit h JOIN paras p ON p.id = h.id "
+            "JOIN docs d ON d.doc_id = p.doc_id ORDER BY d.collection, d.path, p.slide IS NOT NULL, p.slide, p.idx")
+        for name, slide, raw, norm in rows:
+            matched = matcher.match(norm, prefix=prefix)
+            if not matched:
+                continue
+            for i in matched:
+                hits[i] += 1
+            d = result.setdefault(name, {"word": [], "ppt": OrderedDict()})
+            if slide is None:
+                d["word"].append(raw)                                  # type: ignore[union-attr]
+            else:
+                d["ppt"].setdefault(slide, []).append(raw)             # type: ignore[union-attr]
+        return result, matcher.keywords, hits
+
+    def write_filtered_html(self, keywords: Iterable[str], output_html_path, collections: Optional[Sequence[str]] = None,
+                            prefix: bool = False) -> Path:
+        """search の結果を filter_extracted_html_by_keywords と同じ HTML で書く"""
+        from combine.filter_extracted_html_by_keywords import (
+            _atomic_write_text,
+            _build_output_html,
+            _decide_output_path,
+            )
+        result, kws, hits = self.search(keywords, collections, prefix)
+        self.last_hits = (kws, hits)
+        out_path = _decide_output_path(output_html_path)
+        _atomic_write_text(out_path, _build_output_html(result, kws, hits), encoding="utf-8")
+        return out_path
+
+    # ---------- その他 ----------
+    def stats(self) -> Dict[str, object]:
+        docs = self._conn.execute("SELECT collection, COUNT(*) FROM docs GROUP BY collection ORDER BY collection").fetchall()
+        paras = self._conn.execute("SELECT COUNT(*) FROM paras").fetchone()[0]
+        return {"path": str(self.path), "tokenizer": "trigram" if self.trigram else "unicode61",
+                "paragraphs": paras, "collections": {c: n for c, n in docs}}
+
+    def close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+
+# ==================== CLI ====================
+def _default_index_path() -> Path:
+    env = os.environ.get(ENV_INDEX_PATH)
+    return Path(env) if env else Path.cwd() / INDEX_FILE_NAME
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="抽出段落の全文検索（SQLite FTS5）")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("search", help="キーワード/フレーズ/前方一致で検索")
+    s.add_argument("keywords", nargs="+", help='キーワード（空白入りは "..." でフレーズ）')
+    s.add_argument("--index", type=Path, default=None, help=f"インデックス（既定: ${ENV_INDEX_PATH} または ./{INDEX_FILE_NAME}）")
+    s.add_argument("--collection", action="append", default=None, help="対象の collection（複数可。省略で全部）")
+    s.add_argument("--prefix", action="store_true", help="前方一致（後ろの語境界を見ない）")
+    s.add_argument("--out", default=None, help="結果を HTML で書く先（省略時は一覧を表示）")
+    t = sub.add_parser("stats", help="登録件数")
+    t.add_argument("--index", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    idx = ParagraphIndex(args.index or _default_index_path())
+    try:
+        if args.cmd == "stats":
+            for k, v in idx.stats().items():
+                print(f"{k}: {v}")
+            return 0
+        t0 = time.perf_counter()
+        if args.out:
+            out = idx.write_filtered_html(args.keywords, args.out, args.collection, args.prefix)
+            for k, n in sorted(zip(*idx.last_hits), key=lambda t: -t[1]):
+                print(f"[HITS] {n:6d}  {k}")
+            print(f"→ {out}  ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+            return 0
+        result, kws, hits = idx.search(args.keywords, args.collection, args.prefix)
+        for name, d in result.items():
+            for p in d["word"]:                                            # type: ignore[union-attr]
+                print(f"{name}\t-\t{p}")
+            for no, lst in d["ppt"].items():                               # type: ignore[union-attr]
+                for p in lst:
+                    print(f"{name}\tSlide {no}\t{p}")
+        for k, n in sorted(zip(kws, hits), key=lambda t: -t[1]):
+            print(f"[HITS] {n:6d}  {k}")
+        print(f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+        return 0
+    finally:
+        idx.close()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
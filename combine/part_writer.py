@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+まとめ HTML（*_partN.html）の逐次書き出し
+- パートファイルは開いたまま、1 文書変換できる度にそのブロックを追記して flush
+  （全文書の断片を溜めて "\n".join → write_text しない。途中で落ちても書けた分は残る）
+- batch_size 件書いたら閉じて（フッター）次のパートへ
+- OrderedPartWriter: 完了順がばらばらでも入力順（seq）で書く。
+  先に終わった分はブロックを描画してスプールファイルに逃がし、メモリには持たない
+"""
+
+import os, shutil, threading, uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, List, Optional, Set
+
+EMPTY_PART_HTML = "<!DOCTYPE html><meta charset='UTF-8'><title>抽出テキスト</title><body><p>（内容なし）</p></body>"
+SPOOL_DIR_NAME  = ".part_spool"
+
+class PartWriter:
+    """
+        w = PartWriter(out_dir, "result", 5, head, "</body></html>", render)
+        w.add("a.docx", data)     # 描画して即追記
+        paths = w.close()
+    render(name, data) -> str（1 文書分の HTML ブロック）
+    """
+    def __init__(self, out_dir: Path, out_stem: str, batch_size: int, head: str, foot: str,
+                 render: Callable[[str, Any], str], first_index: int = 1):
+        self.out_dir = Path(out_dir)
+        self.out_stem = out_stem
+        self.batch_size = max(1, int(batch_size))
+        self.head = head
+        self.foot = foot
+        self.render = render
+        self.index = first_index - 1
+        self.paths: List[Path] = []
+        self._f: Optional[IO[str]] = None
+        self._count = 0
+
+    def _open(self) -> None:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.index += 1
+        path = self.out_dir / f"{self.out_stem}_part{self.index}.html"
+        self._f = open(path, "w", encoding="utf-8")
+        self._f.write(self.head)
+        self._f.write("\n")
+        self._count = 0
+        self.paths.append(path)
+
+    def _close_part(self) -> None:
+        if self._f is None:
+            return
+        self._f.write(self.foot)
+        self._f.close()
+        self._f = None
+        print(f"[DONE part{self.index}] {self.paths[-1]}  (収録 {self._count} ファイル)")
+
+    def _before_block(self) -> IO[str]:
+        if self._f is not None and self._count >= self.batch_size:
+            self._close_part()
+        if self._f is None:
+            self._open()
+        return self._f
+
+    def add(self, name: str, data: Any) -> None:
+        self.write_block(self.render(name, data))
+
+    def write_block(self, block: str) -> None:
+        f = self._before_block()
+        f.write(block)
+        f.write("\n")
+        f.flush()
+        self._count += 1
+
+    def copy_block(self, src: IO[str]) -> None:
+        """スプール済みのブロックをそのまま流し込む"""
+        f = self._before_block()
+        shutil.copyfileobj(src, f)
+        f.write("\n")
+        f.flush()
+        self._count += 1
+
+    def close(self, write_empty: bool = True) -> List[Path]:
+        """最後のパートを閉じる。1 件も書いていなければ（write_empty なら）空のパートを 1 つ作る"""
+        self._close_part()
+        if not self.paths and write_empty:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            self.index += 1
+            empty = self.out_dir / f"{self.out_stem}_part{self.index}.html"
+            empty.write_text(EMPTY_PART_HTML, encoding="utf-8")
+            print(f"[WRITE empty] {empty}")
+            self.paths.append(empty)
+        return list(self.paths)
+
+class OrderedPartWriter:
+    """
+    seq（入力順の番号）で並べて PartWriter に渡す。
+        w.expect(seq)                  # 投入する文書（完了前に必ず登録）
+        w.put(seq, name, data|None)    # 完了（None = 出力なし。順番だけ進める）
+    まだ前の seq が終わっていない分は、描画済みブロックを spool_dir に書いておき、順番が来たら流し込む。
+    before_write(data) があれば描画の直前に呼ぶ（スライド画像の後処理待ちなど）
+    """
+    def __init__(self, writer: PartWriter, before_write: Optional[Callable[[Any], None]] = None):
+        self.writer = writer
+        self.before_write = before_write
+        self._lock = threading.Lock()
+        self._expected: Set[int] = set()
+        self._ready: Dict[int, Optional[Path]] = {}   # seq → スプール（None = 出力なし）
+        self._spool = writer.out_dir / SPOOL_DIR_NAME / f"{writer.out_stem}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+    @property
+    def expected(self) -> int:
+        return len(self._expected)
+
+    def expect(self, seq: int) -> None:
+        with self._lock:
+            self._expected.add(seq)
+
+    def put(self, seq: int, name: str, data: Any) -> None:
+        block = None
+        if data:
+            if self.before_write is not None:
+                self.before_write(data)
+            block = self.writer.render(name, data)
+        with self._lock:
+            if seq not in self._expected:
+                return
+            if seq == min(self._expected):
+                if block is not None:
+                    self.writer.write_block(block)
+                self._expected.discard(seq)
+                self._drain()
+                return
+            spooled = None
+            if block is not None:
+                self._spool.mkdir(parents=True, exist_ok=True)
+                spooled = self._spool / f"{seq}.html"
+                spooled.write_text(block, encoding="utf-8")
+            self._ready[seq] = spooled
+
+    def _drain(self) -> None:
+        while self._expected:
+            head = min(self._expected)
+            if head not in self._ready:
+                return
+            spooled = self._ready.pop(head)
+            self._expected.discard(head)
+            if spooled is not None:
+                with open(spooled, "r", encoding="utf-8") as f:
+                    self.writer.copy_block(f)
+                try: spooled.unlink()
+                except OSError: pass
+
+    def close(self, write_empty: bool = True) -> List[Path]:
+        with self._lock:
+            # 完了しなかった seq（想定外）は飛ばして残りを書く
+            for seq in sorted(self._expected):
+                if seq not in self._ready:
+                    self._ready[seq] = None
+            self._drain()
+        shutil.rmtree(self._spool, ignore_errors=True)
+        try: self._spool.parent.rmdir()
+        except OSError: pass
+        return self.writer.close(write_empty)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+スライド PNG の後処理（Office の外・別プロセスプールで実行）
+- PowerPoint が書き出した PNG を WebP / JPEG に再圧縮（必要なら縮小）
+- サムネイルを作る（HTML はサムネイル → クリックで原寸）
+- 幅/高さを記録して <img width height> に出す（読み込み前にレイアウト確保）
+Office ワーカーは PNG を書いた時点で次の文書へ進み、再圧縮はこちらが並行して進める。
+Pillow が無ければ何もしない（PNG のまま）。
+"""
+
+import os, threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    from PIL import Image
+except ImportError:   # Pillow 無し: 後処理は無効
+    Image = None
+
+# ==================== 調整フラグ ====================
+SLIDE_IMAGE_POSTPROCESS = False     # True: スライド画像を再圧縮・サムネイル化（PNG はそのままなら False）
+SLIDE_IMAGE_FORMAT      = "webp"    # "webp" / "jpeg" / "png"（png は optimize のみ）
+SLIDE_IMAGE_QUALITY     = 80        # webp / jpeg の品質
+SLIDE_IMAGE_MAX_WIDTH   = 1600      # これより横長なら縮小（0 で縮小しない）
+SLIDE_THUMB_WIDTH       = 320       # サムネイル幅（0 で作らない）
+SLIDE_KEEP_PNG          = False     # 変換後も元 PNG を残す
+SLIDE_POST_WORKERS      = None      # None: コア数の半分（Office ワーカーと CPU を分け合う）
+
+_EXT = {"webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+
+def _save(img, dst: Path, fmt: str, quality: int) -> None:
+    if fmt == "jpeg":
+        img.convert("RGB").save(dst, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "webp":
+        img.save(dst, "WEBP", quality=quality, method=4)
+    else:
+        img.save(dst, "PNG", optimize=True)
+
+def process_slide_image(src_s: str, fmt: str, quality: int, max_width: int, thumb_width: int,
+                        keep_src: bool) -> Dict[str, object]:
+    """
+    1 枚分（プール側で実行）。戻り値 {"img": 出力パス, "thumb": パス or None, "w", "h", "tw", "th"}
+    """
+    src = Path(src_s)
+    ext = _EXT.get(fmt, ".png")
+    with Image.open(src) as im:
+        im.load()
+        if max_width and im.width > max_width:
+            im = im.resize((max_width, max(1, round(im.height * max_width / im.width))), Image.LANCZOS)
+        dst = src.with_suffix(ext)
+        tmp = dst.with_name(f".{dst.name}.tmp")
+        _save(im, tmp, fmt, quality)
+        os.replace(tmp, dst)
+        out: Dict[str, object] = {"img": str(dst), "thumb": None, "w": im.width, "h": im.height}
+        if thumb_width and im.width > thumb_width:
+            th = im.copy()
+            th.thumbnail((thumb_width, thumb_width * 10))
+            tdst = src.with_name(f"{src.stem}_thumb{ext}")
+            _save(th, tdst, fmt, quality)
+            out.update(thumb=str(tdst), tw=th.width, th=th.height)
+    if not keep_src and dst != src:
+        try: src.unlink()
+        except OSError: pass
+    return out
+
+def postprocess_signature() -> str:
+    """出力（画像の形式・サイズ・サムネイル）を変える設定。無効なら off"""
+    if not SLIDE_IMAGE_POSTPROCESS or Image is None:
+        return "off"
+    return f"{SLIDE_IMAGE_FORMAT}/q{SLIDE_IMAGE_QUALITY}/w{SLIDE_IMAGE_MAX_WIDTH}/t{SLIDE_THUMB_WIDTH}"
+
+def _rel(p: Path, base: Path) -> str:
+    try:
+        return p.relative_to(base).as_posix()
+    except Exception:
+        return os.path.relpath(p, base).replace("\\", "/")
+
+class SlideImagePool:
+    """
+        pool = SlideImagePool.create(html_base_dir)     # 無効/Pillow 無しなら None
+        pool.submit_entry(entry)                        # {"type":"ppt","slides":{no:{"img_rel":...}}}
+        pool.finish_entry(entry)                        # その文書の分だけ待って entry を書き換え
+        pool.close()                                    # 残り全部を待って反映・終了
+    書き換え後のスライド: {"img_rel", "w", "h", ["thumb_rel", "tw", "th"], "paras"}
+    失敗した画像は PNG のまま（img_rel も元のまま）
+    同じ PNG を指す entry（変換キャッシュ命中で同一デッキを共有）は 1 回だけ処理し、結果を全部に反映する
+    （最初の処理で PNG が消えていても、後から来た entry は同じ結果を受け取る）
+    """
+    def __init__(self, html_base_dir: Path, workers: Optional[int] = None):
+        self.base = Path(html_base_dir)
+        n = workers or SLIDE_POST_WORKERS or max(1, (os.cpu_count() or 2) // 2)
+        self._ex = ProcessPoolExecutor(max_workers=n)
+        self._pending: Dict[int, Tuple[Dict, List[Tuple[Dict, str, Future]]]] = {}
+        self._by_src: Dict[str, Future] = {}   # PNG の絶対パス → 処理（同じ PNG は 1 回だけ）
+        self._counted: Set[str] = set()
+        self._lock = threading.Lock()   # submit は各レーンの監視スレッドから呼ばれる
+        self.done = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @classmethod
+    def create(cls, html_base_dir: Path, workers: Optional[int] = None) -> Optional["SlideImagePool"]:
+        if not SLIDE_IMAGE_POSTPROCESS:
+            return None
+        if Image is None:
+            print("[SLIDE IMG] Pillow が無いので後処理なし（PNG のまま）")
+            return None
+        return cls(html_base_dir, workers)
+
+    def submit_entry(self, entry: Optional[Dict]) -> None:
+        if not entry or entry.get("type") != "ppt":
+            return
+        jobs: List[Tuple[Dict, str, Future]] = []
+        for slide in (entry.get("slides") or {}).values():
+            rel = slide.get("img_rel")
+            if not rel:
+                continue
+            src = str((self.base / rel).resolve())
+            with self._lock:
+                fut = self._by_src.get(src)
+                if fut is None:
+                    try:
+                        size = Path(src).stat().st_size
+                    except OSError:
+                        continue
+                    self.bytes_in += size
+                    fut = self._ex.submit(process_slide_image, src, SLIDE_IMAGE_FORMAT,
+                                          SLIDE_IMAGE_QUALITY, SLIDE_IMAGE_MAX_WIDTH,
+                                          SLIDE_THUMB_WIDTH, SLIDE_KEEP_PNG)
+                    self._by_src[src] = fut
+            jobs.append((slide, src, fut))
+        if jobs:
+            with self._lock:
+                self._pending[id(entry)] = (entry, jobs)
+
+    def finish_entry(self, entry: Optional[Dict]) -> None:
+        with self._lock:
+            _, jobs = self._pending.pop(id(entry), (None, []))
+        for slide, src, fut in jobs:
+            try:
+                r = fut.result()
+            except Exception as e:
+                with self._lock:
+                    first = src not in self._counted
+                    self._counted.add(src)
+                    if first:
+                        self.failed += 1
+                if first:
+                    print(f"[SLIDE IMG] 失敗（PNG のまま）: {slide.get('img_rel')} → {e}")
+                continue
+            img = Path(r["img"])
+            slide.update(img_rel=_rel(img, self.base), w=r["w"], h=r["h"])
+            if r.get("thumb"):
+                slide.update(thumb_rel=_rel(Path(r["thumb"]), self.base), tw=r["tw"], th=r["th"])
+            with self._lock:
+                first = src not in self._counted
+                self._counted.add(src)
+            if first:
+                size = img.stat().st_size
+                if r.get("thumb"):
+                    size += Path(r["thumb"]).stat().st_size
+                with self._lock:
+                    self.bytes_out += size
+                    self.done += 1
+            elif not SLIDE_KEEP_PNG and Path(src) != img:
+                # キャッシュから PNG が戻されていたら消す（変換済みの画像を共有する）
+                try: Path(src).unlink()
+                except OSError: pass
+
+    def close(self) -> None:
+        """未回収の分も全部待って entry に反映してから終了"""
+        for entry, _ in list(self._pending.values()):
+            self.finish_entry(entry)
+        self._ex.shutdown(wait=True)
+        if self.done or self.failed:
+            print(f"[SLIDE IMG] {self.done} 枚 → {SLIDE_IMAGE_FORMAT}"
+                  f" {self.bytes_in / 1048576:.1f}MB → {self.bytes_out / 1048576:.1f}MB"
+                  + (f" / 失敗 {self.failed}" if self.failed else ""))
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Word の「フィルター後の HTML」body 断片を 1 パスで軽量化する
+- コメント / 条件付きコメント（<!--[if ...]>…<![endif]-->）は丸ごと削除
+  ダウンレベル表示用の <![if ...]> / <![endif]> は印だけ消して中身（箇条書きの記号など）は残す
+- 名前空間付きタグ（<o:p> <v:shape> <w:…> 等）はタグだけ消して中身は残す
+- class="Mso…"（head の <style> を捨てているので効かない）、lang、mso-* 等の CSS プロパティを削除
+- 属性が無くなった <span> は外し、中身の無い <span> は消す
+- 同じ書式の <span> が隣り合えば 1 つにまとめる（間の空白は中に入れる）
+- 残った inline style は内容ハッシュのクラス名にして先頭の <style> へ集約（同じ style は 1 行）
+- 表・画像など他のタグと属性（src / width / colspan …）はそのまま
+正規表現の置換を何回もかけず、タグ/テキストを先頭から 1 回だけ走査する。
+"""
+
+import re, hashlib
+from typing import Dict, List, Optional, Tuple
+
+# ==================== 調整フラグ ====================
+HOIST_STYLES       = True       # inline style → 共有クラス
+STYLE_CLASS_PREFIX = "w"        # 生成クラス名の接頭辞（w + ハッシュ 8 桁）
+DROP_ATTRS         = {"lang", "xml:lang"}
+DROP_CSS_PROPS     = {"tab-stops", "layout-grid-mode", "text-autospace", "punctuation-wrap",
+                      "text-justify-trim", "font-kerning", "page-break-after", "page-break-before",
+                      "break-before", "break-after"}
+
+_TOKEN = re.compile(
+    r"<!--.*?-->"                       # コメント（条件付きコメントを含む）
+    r"|<!\[[^\]]*\]>"                   # <![if ...]> / <![endif]>
+    r"|<(/?)([A-Za-z][\w:.-]*)((?:\"[^\"]*\"|'[^']*'|[^'\">])*)>"   # タグ
+    r"|[^<]+|<",                        # テキスト（単独の < も文字として通す）
+    re.S)
+_ATTR = re.compile(r"""([^\s=/>]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]+))?""")
+_WS = re.compile(r"\s+")
+
+def _clean_style(style: str) -> str:
+    out: List[str] = []
+    for decl in style.split(";"):
+        name, sep, value = decl.partition(":")
+        name = name.strip().lower()
+        if not sep or not name or name.startswith("mso-") or name in DROP_CSS_PROPS:
+            continue
+        out.append(f"{name}:{_WS.sub(' ', value.strip())}")
+    return ";".join(out)
+
+class _Compactor:
+    def __init__(self):
+        self.rules: Dict[str, str] = {}     # style → クラス名
+        self._seen: Dict[str, str] = {}     # 元の属性文字列 → 整理後（Word は同じ属性列を何千回も出す）
+
+    def _class_for(self, style: str) -> str:
+        cls = self.rules.get(style)
+        if cls is None:
+            cls = STYLE_CLASS_PREFIX + hashlib.blake2s(style.encode("utf-8"), digest_size=4).hexdigest()
+            self.rules[style] = cls
+        return cls
+
+    def attrs(self, raw: str) -> str:
+        """属性文字列を整理して ' a="b" …' の形で返す（残す属性が無ければ空）"""
+        if not raw or raw.isspace():
+            return ""
+        done = self._seen.get(raw)
+        if done is not None:
+            return done
+        keep: List[Tuple[str, Optional[str]]] = []
+        classes: List[str] = []
+        style = ""
+        for m in _ATTR.finditer(raw):
+            name = m.group(1)
+            lname = name.lower()
+            value = m.group(2)
+            if value is not None and value[:1] in "\"'":
+                value = value[1:-1]
+            if lname == "/" or lname in DROP_ATTRS or lname.startswith("xmlns") or ":" in lname:
+                continue
+            if lname == "class":
+                classes.extend(c for c in (value or "").split() if not c.lower().startswith("mso"))
+            elif lname == "style":
+                style = _clean_style(value or "")
+            else:
+                keep.append((name, value))
+        if style:
+            if HOIST_STYLES:
+                classes.append(self._class_for(style))
+            else:
+                keep.append(("style", style))
+        if classes:
+            keep.insert(0, ("class", " ".join(classes)))
+        done = "".join(f' {n}="{v.replace(chr(34), "&quot;")}"' if v is not None else f" {n}" for n, v in keep)
+        self._seen[raw] = done
+        return done
+
+    def stylesheet(self) -> str:
+        if not self.rules:
+            return ""
+        body = "".join(f".{cls}{{{style}}}" for style, cls in self.rules.items())
+        return f"<style>{body}</style>"
+
+def compact_word_html(body_inner: str) -> str:
+    """Word のフィルター後 HTML（<body> 内）→ 軽量化した断片（先頭に共有 <style>）"""
+    cx = _Compactor()
+    out: List[str] = []
+    # <span> の入れ子: (整理後の属性 or None=外した, 開始タグの out 位置 or -1=直前の span の続き)
+    stack: List[Tuple[Optional[str], int]] = []
+    pending: Optional[str] = None        # 閉じを保留中の span の属性（次が同じ書式ならまとめる）
+    pending_ws: List[str] = []
+
+    def flush() -> None:
+        nonlocal pending
+        if pending is not None:
+            out.append("</span>")
+            pending = None
+        if pending_ws:
+            out.extend(pending_ws)
+            pending_ws.clear()
+
+    for m in _TOKEN.finditer(body_inner):
+        tok, slash, name, raw = m.group(0, 1, 2, 3)
+        if name is None:
+            if tok.startswith("<!"):
+                continue                                    # コメント / 条件付きの印
+            if pending is not None and tok.isspace():
+                pending_ws.append(tok)
+                continue
+            flush()
+            out.append(tok)
+            continue
+        if ":" in name:
+            continue                                        # <o:p> 等: タグだけ捨てる
+        closing = bool(slash)
+        lname = name.lower()
+        if lname != "span":
+            flush()
+            out.append(f"</{lname}>" if closing else f"<{lname}{cx.attrs(raw)}>")
+            continue
+        if not closing:
+            a = cx.attrs(raw) or None
+            if pending is not None and a == pending:
+                out.extend(pending_ws); pending_ws.clear()  # 同じ書式の続き: </span><span …> を省く
+                pending = None
+                stack.append((a, -1))
+                continue
+            flush()
+            if a is None:
+                stack.append((None, -1))
+            else:
+                stack.append((a, len(out)))
+                out.append(f"<span{a}>")
+            continue
+        if not stack:
+            continue                                        # 対応の無い </span>
+        a, at = stack.pop()
+        if a is None:
+            continue
+        flush()
+        if at >= 0 and at == len(out) - 1:
+            out.pop()                                       # 中身の無い span
+            continue
+        pending = a
+    flush()
+    return cx.stylesheet() + "".join(out)
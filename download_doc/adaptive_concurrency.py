@@ -0,0 +1,220 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import threading
+from time import monotonic, sleep
+from collections import deque
+from urllib.parse import urlparse
+from typing import Any, Dict, Optional
+
+# ==================== 調整フラグ ====================
+INITIAL_AGENTS        = 4      # 開始時の同時実行数（ここから増減）
+MIN_AGENTS            = 1      # 縮退の下限
+INCREASE_EVERY        = 8      # 連続成功何回で +1 するか（加算増加）
+DECREASE_FACTOR       = 0.5    # 混雑検知時の倍率（乗算減少）
+DECREASE_COOLDOWN_SEC = 5.0    # 連続で何度も半減しないための猶予
+LATENCY_FACTOR        = 3.0    # 応答時間 EWMA が最小値のこの倍を超えたら混雑とみなす
+LATENCY_EWMA_ALPHA    = 0.2
+THROUGHPUT_WINDOW_SEC = 30.0   # スループット計測の窓
+THROUGHPUT_DROP_RATIO = 0.8    # 前回増加時よりこの割合を下回ったら増加を取り消す
+HOST_RATE_PER_SEC     = 8.0    # ホスト毎のリクエスト発行レート上限（トークン/秒）
+HOST_MIN_RATE_PER_SEC = 0.5
+THROTTLE_BACKOFF_SEC  = 5.0    # 418/429 で Retry-After が無い時のホスト全体の停止時間
+
+class TokenBucket:
+    """
+    ホスト単位で共有するトークンバケット。
+    pause() 中は全エージェントがそのホストへのリクエストを待つ。
+    """
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self._ts = monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now < self._paused_until:
+            return  # 停止中は _ts が未来（停止明け）を指しているので貯めない
+        self.tokens = min(self.capacity, self.tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        return
+                    wait = (1.0 - self.tokens) / self.rate
+            sleep(min(max(wait, 0.01), 1.0))
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill(monotonic())
+            self.rate = float(rate)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            now = monotonic()
+            self._paused_until = max(self._paused_until, now + float(seconds))
+            self.tokens = 0.0
+            self._ts = self._paused_until
+
+def _parse_retry_after(v: Optional[str]) -> Optional[float]:
+    v = (v or "").strip()
+    return float(v) if v.isdigit() else None
+
+class AdaptiveConcurrency:
+    """
+    AIMD で同時実行数を実行時に増減するコントローラ。
+    - acquire_slot()/release_slot(): 現在の上限（limit）までしかエージェントを走らせない
+    - before(url)/after(url, status, elapsed, retry_after): 転送エンジンが 1 リクエスト毎に呼ぶ
+        * 418/429: そのホストのバケットを停止（Retry-After 優先）＋レート半減＋ limit 半減
+        * 5xx / 通信例外 / 応答時間の悪化: limit 半減（cooldown 付き）
+        * 2xx/304 が INCREASE_EVERY 回続き、スループットが落ちていなければ limit +1
+    - record_transfer(nbytes, seconds): ファイル単位の転送量（スループット判定用）
+    """
+    def __init__(self, *,
+                 max_agents: int,
+                 min_agents: int = MIN_AGENTS,
+                 initial: int = INITIAL_AGENTS,
+                 host_rate: float = HOST_RATE_PER_SEC,
+                 min_host_rate: float = HOST_MIN_RATE_PER_SEC,
+                 verbose: bool = True):
+        self.max_agents = max(1, int(max_agents))
+        self.min_agents = max(1, min(int(min_agents), self.max_agents))
+        self.limit = max(self.min_agents, min(int(initial), self.max_agents))
+        self.host_rate = float(host_rate)
+        self.min_host_rate = float(min_host_rate)
+        self.verbose = verbose
+
+        self._cv = threading.Condition()
+        self._active = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._lat_ewma: Optional[float] = None
+        self._lat_min: Optional[float] = None
+        self._transfers: "deque[tuple[float, int]]" = deque()
+        self._tput_at_increase: Optional[float] = None
+        self.stats = {"requests": 0, "throttled": 0, "server_errors": 0, "failures": 0,
+                      "increases": 0, "decreases": 0, "peak_limit": self.limit}
+
+    # ---------- エージェント枠 ----------
+    def acquire_slot(self) -> None:
+        with self._cv:
+            while self._active >= self.limit:
+                self._cv.wait(timeout=1.0)
+            self._active += 1
+
+    def release_slot(self) -> None:
+        with self._cv:
+            self._active -= 1
+            self._cv.notify_all()
+
+    # ---------- ホスト毎のトークンバケット ----------
+    def _bucket(self, url: str) -> TokenBucket:
+        host = (urlparse(url).hostname or "").lower()
+        with self._cv:
+            b = self._buckets.get(host)
+            if b is None:
+                b = TokenBucket(self.host_rate)
+                self._buckets[host] = b
+            return b
+
+    def before(self, url: str) -> None:
+        self._bucket(url).acquire()
+
+    def after(self, url: str, status: Optional[int], elapsed: float,
+              retry_after: Optional[str] = None) -> None:
+        bucket = self._bucket(url)
+        with self._cv:
+            self.stats["requests"] += 1
+            if status in (418, 429):
+                self.stats["throttled"] += 1
+                pause = _parse_retry_after(retry_after) or THROTTLE_BACKOFF_SEC
+                bucket.set_rate(max(self.min_host_rate, bucket.rate * DECREASE_FACTOR))
+                bucket.pause(pause)
+                self._decrease(f"HTTP {status}（{pause:.0f}s 停止）")
+                return
+            if status is None or status >= 500:
+                self.stats["failures" if status is None else "server_errors"] += 1
+                self._decrease("通信失敗" if status is None else f"HTTP {status}")
+                return
+            if not (200 <= status < 400):
+                return  # 404 等は混雑の指標にしない
+
+            self._lat_min = elapsed if self._lat_min is None else min(self._lat_min, elapsed)
+            self._lat_ewma = elapsed if self._lat_ewma is None else (
+                LATENCY_EWMA_ALPHA * elapsed + (1 - LATENCY_EWMA_ALPHA) * self._lat_ewma)
+            if self._lat_ewma > LATENCY_FACTOR * max(self._lat_min, 0.05):
+                self._decrease(f"応答時間悪化 {self._lat_ewma:.2f}s")
+                self._lat_ewma = None
+                return
+
+            if bucket.rate < self.host_rate:
+                bucket.set_rate(min(self.host_rate, bucket.rate + 0.5))
+            self._successes += 1
+            if self._successes >= INCREASE_EVERY:
+                self._successes = 0
+                self._increase()
+
+    # ---------- スループット ----------
+    def record_transfer(self, nbytes: int, seconds: float) -> None:
+        now = monotonic()
+        with self._cv:
+            self._transfers.append((now, int(nbytes)))
+            self._prune_transfers(now)
+
+    def _prune_transfers(self, now: float) -> None:
+        # 窓より古い記録を捨てる（_cv を持った状態で呼ぶ）
+        while self._transfers and now - self._transfers[0][0] > THROUGHPUT_WINDOW_SEC:
+            self._transfers.popleft()
+
+    def _recent_throughput(self) -> float:
+        """直近 THROUGHPUT_WINDOW_SEC 秒の完了バイト数 / 秒（_cv を持った状態で呼ぶ）"""
+        self._prune_transfers(monotonic())
+        return sum(n for _, n in self._transfers) / THROUGHPUT_WINDOW_SEC
+
+    # ---------- AIMD ----------
+    def _set_limit(self, new: int, reason: str) -> None:
+        old = self.limit
+        self.limit = max(self.min_agents, min(int(new), self.max_agents))
+        if self.limit != old:
+            self.stats["peak_limit"] = max(self.stats["peak_limit"], self.limit)
+            if self.verbose:
+                print(f"[AIMD] agents {old} → {self.limit} ({reason})")
+            self._cv.notify_all()
+
+    def _increase(self) -> None:
+        tput = self._recent_throughput()
+        if self._tput_at_increase and tput < THROUGHPUT_DROP_RATIO * self._tput_at_increase:
+            self._tput_at_increase = tput
+            self._set_limit(self.limit - 1, "増やしてもスループット低下")
+            return
+        if self.limit < self.max_agents:
+            self._tput_at_increase = tput
+            self.stats["increases"] += 1
+            self._set_limit(self.limit + 1, "安定")
+
+    def _decrease(self, reason: str) -> None:
+        self._successes = 0
+        now = monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN_SEC:
+            return
+        self._last_decrease = now
+        self.stats["decreases"] += 1
+        self._set_limit(int(self.limit * DECREASE_FACTOR), reason)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cv:
+            d = dict(self.stats)
+            d["limit"] = self.limit
+            d["host_rates"] = {h: round(b.rate, 2) for h, b in self._buckets.items()}
+        return d
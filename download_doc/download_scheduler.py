@@ -0,0 +1,284 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from emoji.emoscript import emo
+
+import os
+import queue, threading
+from time import monotonic
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from urllib3.util.retry import Retry
+except Exception:
+    from requests.packages.urllib3.util.retry import Retry  # type: ignore
+
+from pure_download.download_file import (
+    download_file_safely,
+    )
+from pure_download.http_cache import HttpMetaCache
+
+from download_doc.adaptive_concurrency import (
+    INITIAL_AGENTS,
+    AdaptiveConcurrency,
+    )
+
+from folder_and_file.create_subfolder_when_absent import (
+    create_subfolder_when_absent,
+    )
+
+# ==================== 調整フラグ ====================
+UA_STR                  = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"  # ← 全エージェントで統一
+MAX_AGENTS_DEFAULT      = 12          # 同時実行スレッド数の上限（全ホスト合計）
+ADAPTIVE_CONCURRENCY    = True        # True: AIMD で INITIAL_AGENTS〜MAX_AGENTS の間を自動調整
+DEFAULT_HOST_LIMIT      = None        # ホスト毎の同時接続上限（None = MAX_AGENTS と同じ）
+DOWNLOAD_BACKEND        = "requests"  # "requests": 共有プールで本文も転送 / "msxml2": 従来経路
+PROBE_MODE              = "resume"    # "resume": .part 再開時のみ HEAD / "always": 毎回 HEAD → GET
+SEGMENTS_DEFAULT        = 1           # 2 以上で大きなファイルを Range 分割取得（opt-in）
+SEGMENT_MIN_BYTES       = 8 * 1024 * 1024  # 分割取得の対象にする最小サイズ
+REVALIDATE_EXISTING     = True        # True: 既存 ZIP を ETag/Last-Modified で条件付き GET（304 なら転送なし）
+
+LANDING_MAP = {
+    "3gpp": "https://www.3gpp.org/ftp",
+    "ieee": "https://mentor.ieee.org/802.11",
+}
+
+def _normalize_proxy(p: Optional[str]) -> Optional[str]:
+    if not p: return None
+    p = p.strip()
+    return p if "://" in p else f"http://{p}"
+
+def make_shared_session(kind: str, proxy: Optional[str],
+                        pool: int = 64, retries: int = 2) -> Tuple[str, requests.Session]:
+    """
+    全エージェントで共有する keep-alive セッションを 1 つだけ作る。
+    - landing GET（Cookie 獲得）はここで 1 回だけ
+    - HEAD / landing / 本文転送が同じ接続プールを使う（requests バックエンド時）
+    """
+    kind_norm = (kind or "").strip().lower()
+    if kind_norm not in LANDING_MAP:
+        raise ValueError('kind は "ieee" か "3gpp" を指定してください。')
+    landing = LANDING_MAP[kind_norm]
+
+    s = requests.Session()
+    retry = Retry(total=retries, connect=retries, read=retries,
+                  backoff_factor=0.5, status_forcelist=(500,502,503,504),
+                  allowed_methods=False)
+    ad = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+    s.mount("http://", ad); s.mount("https://", ad)
+
+    s.headers.update({
+        "User-Agent": UA_STR,
+        "Accept": "*/*",
+        "Accept-Language": "en-US,en;q=0.9,ja;q=0.8",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    })
+    s.trust_env = False
+    prx = _normalize_proxy(proxy)
+    if prx: s.proxies.update({"http": prx, "https": prx})
+
+    try: s.get(landing, timeout=15)
+    except Exception: pass
+    return landing, s
+
+class HostLimiter:
+    """
+    ホスト単位の同時実行数制限（BoundedSemaphore をホスト毎に遅延生成）。
+    limits に無いホストは default_limit（None なら無制限）。
+    """
+    def __init__(self, limits: Optional[Dict[str, int]] = None, default_limit: Optional[int] = None):
+        self._limits = {k.lower(): max(1, int(v)) for k, v in (limits or {}).items()}
+        self._default = default_limit
+        self._sems: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _sem(self, host: str) -> Optional[threading.BoundedSemaphore]:
+        host = (host or "").lower()
+        n = self._limits.get(host, self._default)
+        if n is None:
+            return None
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(max(1, int(n)))
+                self._sems[host] = sem
+            return sem
+
+    def acquire(self, url: str) -> Callable[[], None]:
+        sem = self._sem(urlparse(url).hostname or "")
+        if sem is None:
+            return lambda: None
+        sem.acquire()
+        return sem.release
+
+def _build_tasks(download_urls: List[str]) -> List[Dict[str, Any]]:
+    tasks: List[Dict[str, Any]] = []
+    for i,u in enumerate(download_urls, start=1):
+        parsed = urlparse(u)
+        pure_filename = os.path.basename(parsed.path) or "download.bin"
+        stem = os.path.splitext(pure_filename)[0] or "download"
+        ext_guess = os.path.splitext(pure_filename)[1] or ".bin"
+        tasks.append({"index":i, "url":str(u).strip(),
+                      "pure_filename":pure_filename,"stem":stem,"ext_guess":ext_guess})
+    return tasks
+
+def fetch_docs_queue(kind: str, base_path: str, download_urls: List[str], doc_dir: str, proxy: Optional[str],
+                     *,
+                     max_agents: int = MAX_AGENTS_DEFAULT,
+                     host_limits: Optional[Dict[str, int]] = None,
+                     default_host_limit: Optional[int] = DEFAULT_HOST_LIMIT,
+                     backend: str = DOWNLOAD_BACKEND,
+                     probe_mode: str = PROBE_MODE,
+                     revalidate: bool = REVALIDATE_EXISTING,
+                     segments: int = SEGMENTS_DEFAULT,
+                     segment_min_bytes: int = SEGMENT_MIN_BYTES,
+                     adaptive: bool = ADAPTIVE_CONCURRENCY,
+                     initial_agents: int = INITIAL_AGENTS,
+                     on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    共有セッション 1 つ + スレッドプールでダウンロードキューを処理する。
+    - セッション（= 接続プール）と landing GET は 1 回だけ
+    - host_limits={"www.3gpp.org": 6} のようにホスト毎の同時数を制限可能
+    - probe_mode="resume"（既定）で新規ファイルは GET 1 往復のみ
+    - revalidate=True なら ZIP フォルダの .http_meta.json を使い、既存ファイルも条件付き GET で確認
+      （キャッシュに記録の無い既存ファイルは従来どおりスキップ）
+    - segments>=2 なら segment_min_bytes 以上の Range 対応ファイルを分割取得
+    - adaptive=True なら max_agents は上限。418/429/5xx/応答時間/スループットを見て同時数を増減し、
+      ホスト毎の共有トークンバケットで全エージェントの発行レートを揃える
+    - on_result を渡すと 1 件完了（既存スキップ含む）ごとに結果辞書を渡して呼ぶ。
+      後段をダウンロード中に開始するためのフック（呼び出しがブロックすれば背圧になる）
+    - 戻り値は index 昇順の結果辞書リスト（従来の fetch_*_docs_queue と同じ形）
+    """
+    create_subfolder_when_absent(Path(base_path), doc_dir)   # type: ignore[name-defined]
+    download_path = Path(base_path) / doc_dir
+
+    total = len(download_urls)
+    if total == 0:
+        print(f"{emo.warn} ダウンロード対象がありません。")  # type: ignore[name-defined]
+        return []
+
+    tasks = _build_tasks(download_urls)
+
+    results: List[Dict[str, Any]] = []
+    results_lock = threading.Lock()
+    q: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    meta_cache = HttpMetaCache.for_dir(str(download_path)) if revalidate else None
+
+    # 既存スキップ（検証可能なものは再検証キューへ）、未DLをキューへ
+    for t in tasks:
+        target_zip = download_path / t["pure_filename"]
+        if (target_zip.exists() and meta_cache is not None
+                and meta_cache.conditional_headers(t["url"], str(target_zip))):
+            t["revalidate"] = True
+            q.put(t)
+        elif target_zip.exists():
+            pct = round(t["index"]/total*100)
+            print(f"[Agent-0 {t['index']}/{total} {pct}%] ✅ 既存: {target_zip.name}")
+            results.append({
+                "index": t["index"], "url": t["url"],
+                "filename": t["pure_filename"], "download_path": str(download_path),
+                "name": t["pure_filename"], "saved_path": str(target_zip),
+                "ext": t["ext_guess"], "skipped": True, "not_modified": False, "error": None
+            })
+        else:
+            q.put(t)
+
+    if on_result is not None:
+        for r in results:
+            on_result(r)
+
+    if q.empty():
+        results.sort(key=lambda r: r.get("index",0)); return results
+
+    workers = max(1, min(int(max_agents), q.qsize()))
+    landing, sess = make_shared_session(kind, proxy, pool=max(workers, 10))
+    limiter = HostLimiter(host_limits, default_host_limit)
+    use_com = (backend or "").strip().lower() == "msxml2"
+    controller = AdaptiveConcurrency(max_agents=workers, initial=initial_agents) if adaptive else None
+
+    def agent_run(agent_slot: int):
+        # ★ MSXML2 バックエンドのときだけ各スレッドで COM 初期化
+        if use_com:
+            import pythoncom
+            pythoncom.CoInitialize()
+        try:
+            while True:
+                if controller is not None:
+                    controller.acquire_slot()
+                try:
+                    t = q.get_nowait()
+                except queue.Empty:
+                    if controller is not None:
+                        controller.release_slot()
+                    break
+                i = t["index"]; pct = round(i/total*100)
+                saved = download_path / t["pure_filename"]
+                release = limiter.acquire(t["url"])
+                t0 = monotonic()
+                try:
+                    ext = download_file_safely(
+                        t["url"], str(download_path), t["stem"],
+                        backend=backend,
+                        session=sess, referer=landing, proxy=_normalize_proxy(proxy),
+                        connect_timeout=10, read_timeout=180, max_retries=5,
+                        user_agent=UA_STR, probe_mode=probe_mode,
+                        meta_cache=meta_cache,
+                        segments=segments, min_size=segment_min_bytes,
+                        throttle=controller,
+                    )
+                    saved = download_path / f"{t['stem']}{ext or '.zip'}"
+                    not_modified = bool(t.get("revalidate")) and meta_cache.last_status(t["url"]) == "not_modified"
+                    if controller is not None and not not_modified and saved.exists():
+                        controller.record_transfer(saved.stat().st_size, monotonic() - t0)
+                    mark = "304 未更新" if not_modified else f"ext:{ext or '(不明)'}"
+                    print(f"[Agent-{agent_slot+1} {i}/{total} {pct}%] ✅ {mark} → {saved.name}")
+                    item = {
+                            "index": t["index"], "url": t["url"],
+                            "filename": t["pure_filename"], "download_path": str(download_path),
+                            "name": t["pure_filename"], "saved_path": str(saved),
+                            "ext": t["ext_guess"], "skipped": not_modified, "not_modified": not_modified,
+                            "error": None
+                    }
+                except Exception as e:
+                    print(f"[Agent-{agent_slot+1} {i}/{total} {pct}%] ⚠️ エラー: {e}")
+                    item = {
+                            "index": t["index"], "url": t["url"],
+                            "filename": t["pure_filename"], "download_path": str(download_path),
+                            "name": t["pure_filename"], "saved_path": str(saved),
+                            "ext": t["ext_guess"], "skipped": False, "not_modified": False,
+                            "error": str(e)
+                    }
+                finally:
+                    release()
+                    if controller is not None:
+                        controller.release_slot()
+                    with results_lock:
+                        results.append(item)
+                    q.task_done()
+                if on_result is not None:
+                    on_result(item)
+        finally:
+            if use_com:
+                pythoncom.CoUninitialize()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent") as ex:
+            futs = [ex.submit(agent_run, slot) for slot in range(workers)]
+            for f in futs: f.result()
+    finally:
+        try: sess.close()
+        except Exception: pass
+        if meta_cache is not None:
+            try: meta_cache.save()
+            except Exception as e: print(f"{emo.warn} HTTP メタキャッシュ保存失敗: {e}")
+        if controller is not None:
+            print(f"[AIMD] summary: {controller.snapshot()}")
+
+    results.sort(key=lambda r: r.get("index",0))
+    return results
@@ -0,0 +1,92 @@
+"""
+result_manifest
+- ステージ間の受け渡し用 JSONL マニフェスト（1 行 = 1 レコード）
+- xlsx の書き出し→読み直しの代わりに使う。Excel はレポートとして最後に 1 回だけ書けばよい
+- 別プロセス（main_convert_and_extract 等）からは read_manifest_column で列を取り出す
+"""
+import os
+import json
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+MANIFEST_EXT = ".jsonl"
+
+def manifest_path(folder: Union[str, Path], name: Union[str, Path]) -> Path:
+    """folder/name(.jsonl)。name に .xlsx が付いていても .jsonl に置き換える。"""
+    p = Path(folder) / str(name)
+    if p.suffix.lower() in (".xlsx", ".xlsm", ".xls"):
+        p = p.with_suffix("")
+    return p.with_name(p.name + MANIFEST_EXT) if p.suffix.lower() != MANIFEST_EXT else p
+
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, Path):
+        return str(v)
+    if isinstance(v, str):
+        return v.replace("\r\n", "\n").strip()
+    return v
+
+def write_manifest(records: Iterable[Dict[str, Any]],
+                   folder: Union[str, Path],
+                   name: Union[str, Path]) -> Path:
+    """records を JSONL で原子的に書き出す（一時ファイル→置換）。"""
+    path = manifest_path(folder, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = None
+    try:
+        with NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=str(path.parent),
+                                suffix=".tmp", newline="\n") as f:
+            tmp = f.name
+            for r in records:
+                f.write(json.dumps({k: _jsonable(v) for k, v in r.items()}, ensure_ascii=False))
+                f.write("\n")
+        os.replace(tmp, path)
+    except Exception:
+        if tmp and os.path.exists(tmp):
+            try: os.remove(tmp)
+            except Exception: pass
+        raise
+    return path
+
+def read_manifest(folder: Union[str, Path], name: Union[str, Path]) -> List[Dict[str, Any]]:
+    path = manifest_path(folder, name)
+    out: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                out.append(json.loads(line))
+    return out
+
+def manifest_exists(folder: Union[str, Path], name: Union[str, Path]) -> bool:
+    return manifest_path(folder, name).is_file()
+
+def read_manifest_column(folder: Union[str, Path],
+                         name: Union[str, Path],
+                         key: str) -> List[Any]:
+    """read_column_as_list の JSONL 版（列番号ではなくキー名で指定）。"""
+    return [r.get(key) for r in read_manifest(folder, name)]
+
+def zip_paths_to_records(res_zip: Iterable[Any]) -> List[Dict[str, str]]:
+    """extract_zip_to_docs の戻り値（List[List[Path]] / List[Path]）を saved_path レコードへ平坦化。"""
+    recs: List[Dict[str, str]] = []
+    for item in res_zip:
+        items = item if isinstance(item, (list, tuple, set)) else [item]
+        for p in items:
+            if p is not None:
+                recs.append({"saved_path": str(Path(p))})
+    return recs
+
+def read_column_prefer_manifest(folder: Union[str, Path],
+                                name: Union[str, Path],
+                                key: str,
+                                col_index: Optional[int] = None) -> List[Any]:
+    """
+    マニフェストがあればそれを読み、無ければ（旧バージョンの出力）xlsx の col_index 列を読む。
+    """
+    if manifest_exists(folder, name):
+        return read_manifest_column(folder, name, key)
+    from download_doc.save_results_to_xlsx import read_column_as_list
+    if col_index is None:
+        raise FileNotFoundError(f"manifest not found: {manifest_path(folder, name)}")
+    return read_column_as_list(folder, name, col_index)
@@ -1,17 +1,63 @@
-# pip install pandas openpyxl
+# pip install openpyxl
 from pathlib import Path
-from typing import Any, Iterable
-import pandas as pd
-from openpyxl import load_workbook
+from typing import Any, Iterable, List, Sequence, Union
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
 
 # ===== 出力列の順序 =====
 COLUMNS = ["index", "url", "filename", "download_path", "name", "saved_path", "ext", "skipped"]
 
+# ===== 見た目 =====
+COL_WIDTH_MAX = 80      # 列幅の上限（文字数）
+COL_WIDTH_PAD = 2       # 最大文字数に足す余白
+SHEET_TITLE   = "Sheet1"
+
 def _ensure_xlsx_name(name: str | Path) -> str:
     """拡張子 .xlsx を保証して返す"""
     s = str(name)
-    return s if s.lower().endswith(".xsx") else s + ".xlsx"
+    return s if s.lower().endswith(".xlsx") else s + ".xlsx"
+
+def _clean(v: Any) -> Any:
+    """文字列/Path は CRLF→LF 正規化と trim、それ以外はそのまま"""
+    if isinstance(v, (str, Path)):
+        return str(v).replace("\r\n", "\n").strip()
+    return v
+
+def _write_table_xlsx(xlsx_path: Path, headers: Sequence[str], rows: List[Sequence[Any]]) -> Path:
+    """
+    write_only で 1 回だけ書き出す（書いた後に読み直さない）。
+    - 列幅はメモリ上の rows から先に求める（write_only は最初の append 前に列定義を確定する必要がある）
+    - オートフィルタ / ヘッダー固定も同じパスで設定
+    """
+    widths = [len(h) for h in headers]
+    for row in rows:
+        for i, v in enumerate(row):
+            if v is not None:
+                n = len(str(v))
+                if n > widths[i]:
+                    widths[i] = n
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_TITLE)
+    for i, w in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = min(w + COL_WIDTH_PAD, COL_WIDTH_MAX)
+    ws.freeze_panes = "A2"
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(headers))}{len(rows) + 1}"
+
+    bold = Font(bold=True)
+    header_cells = []
+    for h in headers:
+        c = WriteOnlyCell(ws, value=h)
+        c.font = bold
+        header_cells.append(c)
+    ws.append(header_cells)
+    for row in rows:
+        ws.append(row)
+
+    wb.save(xlsx_path)
+    return xlsx_path
 
 def save_results_to_xlsx(results: Iterable[dict[str, Any]],
                          folder: str | Path,
@@ -20,62 +66,16 @@ def save_results_to_xlsx(results: Iterable[dict[str, Any]],
     results（辞書のリスト等）を folder/filename(.xlsx) に保存する。
     - 列順は COLUMNS に固定
     - 文字列は trim と CRLF→LF 正規化
-    - オートフィルタ、ヘッダー固定、列幅自動調整
+    - オートフィルタ、ヘッダー固定、列幅自動調整（write_only で 1 回書くだけ）
     """
-    # ===== DataFrame 構築（列順固定） =====
-    rows = []
-    for r in results:
-        row = {}
-        for col in COLUMNS:
-            v = r.get(col, None)
-            if isinstance(v, (str, Path)):
-                s = str(v).replace("\r\n", "\n").strip()
-                row[col] = s
-            else:
-                row[col] = v
-        rows.append(row)
-    df = pd.DataFrame(rows, columns=COLUMNS)
+    rows = [[_clean(r.get(col, None)) for col in COLUMNS] for r in results]
 
     # ===== パス決定 =====
     folder = Path(folder)
     folder.mkdir(parents=True, exist_ok=True)
     xlsx_path = folder / _ensure_xlsx_name(filename)
 
-    # ===== 保存 =====
-    df.to_excel(xlsx_path, index=False)
-
-    # ===== 見た目調整 =====
-    wb = load_workbook(xlsx_path)
-    ws = wb.active
-
-    # オートフィルタ（全範囲）
-    last_col_letter = get_column_letter(ws.max_column)
-    last_row = ws.max_row
-    ws.auto_filter.ref = f"A1:{last_col_letter}{last_row}"
-
-    # ヘッダー固定
-    ws.freeze_panes = "A2"
-
-    # 列幅自動調整
-    for col_idx, col_name in enumerate(COLUMNS, start=1):
-        max_len = len(col_name)
-        for cell_vals in ws.iter_cols(min_col=col_idx, max_col=col_idx, min_row=2, values_only=True):
-            for v in cell_vals:
-                if v is None:
-                    continue
-                s = str(v)
-                max_len = max(max_len, len(s))
-        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_len + 2, 80)
-
-    wb.save(xlsx_path)
-    return xlsx_path
-
-# pip install pandas openpyxl
-from pathlib import Path
-from typing import Iterable, List, Union
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
+    return _write_table_xlsx(xlsx_path, COLUMNS, rows)
 
 def write_res_zip_paths_to_xlsx(
     res_zip: Union[List[List[Path]], List[Path], Iterable],
@@ -91,14 +91,12 @@ def write_res_zip_paths_to_xlsx(
     - A1 にヘッダー 'saved_path'、オートフィルタ、ヘッダー固定(A2)、列幅自動調整
     """
     # ===== パス展開（フラット化） =====
-    flat_paths: List[str] = []
+    rows: List[List[str]] = []
 
     def _push(v):
         if v is None:
             return
-        s = str(Path(v))  # Path化して正規化
-        s = s.replace("\r\n", "\n").strip()
-        flat_paths.append(s)
+        rows.append([_clean(Path(v))])  # Path化して正規化
 
     for item in res_zip:
         # 二重/一次元どちらも受ける
@@ -108,43 +106,12 @@ def write_res_zip_paths_to_xlsx(
         else:
             _push(item)
 
-    # ===== DataFrame 作成 =====
-    df = pd.DataFrame({"saved_path": flat_paths})
-
     # ===== 出力先決定 =====
     folder = Path(folder)
     folder.mkdir(parents=True, exist_ok=True)
-    filename = str(filename)
-    if not filename.lower().endswith(".xlsx"):
-        filename += ".xlsx"
-    xlsx_path = folder / filename
-
-    # ===== 書き出し =====
-    df.to_excel(xlsx_path, index=False)
-
-    # ===== 見た目調整 =====
-    wb = load_workbook(xlsx_path)
-    ws = wb.active
-
-    # オートフィルタ（全範囲）
-    last_col_letter = get_column_letter(ws.max_column)
-    last_row = ws.max_row
-    ws.auto_filter.ref = f"A1:{last_col_letter}{last_row}"
-
-    # ヘッダー固定（1行目固定 → 表示開始を2行目に）
-    ws.freeze_panes = "A2"
-
-    # 列幅自動調整（最大長 + 余白）
-    max_len = len("saved_path")
-    for col_vals in ws.iter_cols(min_col=1, max_col=1, min_row=2, values_only=True):
-        for v in col_vals:
-            if v is None:
-                continue
-            max_len = max(max_len, len(str(v)))
-    ws.column_dimensions["A"].width = min(max_len + 2, 80)
+    xlsx_path = folder / _ensure_xlsx_name(filename)
 
-    wb.save(xlsx_path)
-    return xlsx_path
+    return _write_table_xlsx(xlsx_path, ["saved_path"], rows)
 
 # pip install openpyxl
 from pathlib import Path
@@ -50,6 +50,10 @@ from download_doc.save_results_to_xlsx import(
     read_column_as_list
 )
 
+from download_doc.result_manifest import (
+    read_column_prefer_manifest,
+    )
+
 from about_zip.extract_zip_to_docs import(
     extract_zip_to_docs_from_fold
 )
@@ -469,7 +473,7 @@ def run(excel_path: Path) -> int:
 
     if str(database) == "3gpp":
         print("3gpp")
-        l = read_column_as_list(str(xlsx_path),"out_file_"+str(database),0)
+        l = read_column_prefer_manifest(str(xlsx_path),"out_file_"+str(database),"saved_path",0)
         outputs= convert_office_to_html(l,str(html_path),"row_"+combined_html_name)
         print(outputs)
         outs = filter_extracted_html_by_keywords(
@@ -481,7 +485,7 @@ def run(excel_path: Path) -> int:
 
     if str(database) == "ieee":
         print("ieee")
-        l = read_column_as_list(str(xlsx_path),"out_"+str(database),5)
+        l = read_column_prefer_manifest(str(xlsx_path),"out_"+str(database),"saved_path",5)
         outputs= convert_office_to_html(l,str(html_path),"row_"+combined_html_name)
         outs = filter_extracted_html_by_keywords(
             html_paths=outputs,
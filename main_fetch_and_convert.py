@@ -47,25 +47,38 @@ from download_doc.download_doc_ieee import(
 from download_doc.save_results_to_xlsx import(
     save_results_to_xlsx,
     write_res_zip_paths_to_xlsx,
-    read_column_as_list
 )
 
+from download_doc.result_manifest import (
+    write_manifest,
+    zip_paths_to_records,
+    )
+
 from about_zip.extract_zip_to_docs import(
-    extract_zip_to_docs_from_fold
+    extract_zip_to_docs_from_results
 )
 
 from combine.extract_paragraphs import(
-    convert_office_to_html
-)
-
-from combine.convert_from_get_files_to_PDF import (
-    convert_list_to_pdf_in_dir_parallel
+    convert_office_documents
 )
 
 from folder_and_file.create_subfolder_when_absent import (
     create_subfolder_when_absent,
     )
 
+from pipeline.job_journal import (
+    JobJournal,
+    )
+
+from pipeline.journaled_stages import (
+    convert_documents_journaled,
+    extract_zips_journaled,
+    )
+
+from pipeline.streaming_pipeline import (
+    run_streaming_pipeline,
+    )
+
 
 
 
@@ -78,6 +91,11 @@ from folder_and_file.create_subfolder_when_absent import (
 __app_name__ = "myapp"
 __version__ = "0.4.0"
 
+# ============== 調整フラグ ==============
+USE_JOB_JOURNAL    = True   # True: download_dir/job_journal.sqlite3 で文書×ステージの進捗を記録し再開
+STREAMING_PIPELINE = True   # True: DL 完了分から展開/HTML/PDF を並行して流す（ジャーナル有効時）
+WRITE_XLSX_REPORT  = True   # True: 最後に out_*.xlsx をレポートとして 1 回だけ書く（ステージ間の受け渡しは JSONL）
+
 # ============== ログ設定 ==============
 def setup_logging() -> None:
     logging.basicConfig(
@@ -415,6 +433,50 @@ def _signal_handler(signum, frame):
     logging.getLogger(__app_name__).warning("received signal %s; shutting down...", signum)
     _SHOULD_STOP = True
 
+def _write_stage_outputs(database: str, xlsx_path: Path,
+                         res: List[Dict[str, Any]],
+                         res_zip: Optional[List[List[Path]]] = None) -> None:
+    """
+    ステージ結果を xlsx_path に書き出す（パイプライン完了後に 1 回だけ）。
+    - out_<db>.jsonl / out_file_<db>.jsonl: main_convert_and_extract が読む受け渡し用マニフェスト
+    - out_<db>.xlsx / out_file_<db>.xlsx: WRITE_XLSX_REPORT 時のみ、人が見るためのレポート
+    """
+    write_manifest(res, str(xlsx_path), "out_"+str(database))
+    if res_zip is not None:
+        write_manifest(zip_paths_to_records(res_zip), str(xlsx_path), "out_file_"+str(database))
+    if WRITE_XLSX_REPORT:
+        save_results_to_xlsx(res,str(xlsx_path),"out_"+str(database))
+        if res_zip is not None:
+            write_res_zip_paths_to_xlsx(res_zip,str(xlsx_path),"out_file_"+str(database))
+
+def _run_stages_plain(database: str, xr: "ExcelReader", sheet_url_list_path: int, hyperlink_3gppp: Any,
+                      proxy_url: Any, download_dir: Path, xlsx_path: Path, html_path: Path,
+                      zip_dir: str, doc_dir: str, combined_html_name: str) -> None:
+    """
+    ジャーナル無しの従来経路（全ステージを毎回実行、ステージ間はメモリ上のレコードで受け渡す）
+    HTML と PDF は convert_office_documents で 1 文書 1 回だけ開いて同時に出す（結果は convert_<db>.jsonl）
+    """
+    if database == "3gpp":
+        print("3gpp")
+        download_urls =  xr.xread("col", 1, header=True, sheet = sheet_url_list_path, hyperlink = hyperlink_3gppp)
+        res = fetch_3gpp_docs_queue(str(download_dir),download_urls,zip_dir,proxy=proxy_url)
+
+        res_zip = extract_zip_to_docs_from_results(res,doc_dir)
+
+        l = [str(p) for paths in res_zip for p in paths]
+        conv = convert_office_documents(l,str(html_path),combined_html_name,str(download_dir),doc_dir)
+        write_manifest(conv["records"], str(xlsx_path), "convert_"+str(database))
+        _write_stage_outputs(database, xlsx_path, res, res_zip)
+
+    if database == "ieee":
+        print("ieee")
+        download_urls =  xr.xread("col", 1, header=True, sheet = sheet_url_list_path, hyperlink = hyperlink_3gppp)
+        res = fetch_ieee_docs_queue(str(download_dir),download_urls,zip_dir,proxy=proxy_url)
+        l = [r.get("saved_path") for r in res if not r.get("error") and r.get("saved_path")]
+        conv = convert_office_documents(l,str(html_path),combined_html_name,str(download_dir),doc_dir)
+        write_manifest(conv["records"], str(xlsx_path), "convert_"+str(database))
+        _write_stage_outputs(database, xlsx_path, res)
+
 def run(excel_path: Path) -> int:
     """
     ここに実処理を実装。例として print('process')。
@@ -458,27 +520,54 @@ def run(excel_path: Path) -> int:
     xlsx_path = download_dir / str(xlsx_dir)
 
 
-    if str(database) == "3gpp":
-        print("3gpp")
-        download_urls =  xr.xread("col", 1, header=True, sheet = sheet_url_list_path, hyperlink = hyperlink_3gppp)
-        res = fetch_3gpp_docs_queue(str(download_dir),download_urls,zip_dir,proxy=proxy_url)
-        save_results_to_xlsx(res,str(xlsx_path),"out_"+str(database))
-        
-        res_zip = extract_zip_to_docs_from_fold(str(xlsx_path),"out_"+str(database),doc_dir)
-        write_res_zip_paths_to_xlsx(res_zip,str(xlsx_path),"out_file_"+str(database))
-        
-        l = read_column_as_list(str(xlsx_path),"out_file_"+str(database),0)
-        convert_office_to_html(l,str(html_path),combined_html_name)
-        convert_list_to_pdf_in_dir_parallel(l,str(download_dir),doc_dir)
-
-    if str(database) == "ieee":
-        print("ieee")
-        download_urls =  xr.xread("col", 1, header=True, sheet = sheet_url_list_path, hyperlink = hyperlink_3gppp)
-        res = fetch_ieee_docs_queue(str(download_dir),download_urls,zip_dir,proxy=proxy_url)
-        save_results_to_xlsx(res,str(xlsx_path),"out_"+str(database))
-        l = read_column_as_list(str(xlsx_path),"out_"+str(database),5)
-        convert_office_to_html(l,str(html_path),combined_html_name)
-        convert_list_to_pdf_in_dir_parallel(l,str(download_dir),doc_dir)
+    if not USE_JOB_JOURNAL:
+        _run_stages_plain(str(database), xr, sheet_url_list_path, hyperlink_3gppp, proxy_url,
+                          download_dir, xlsx_path, html_path, zip_dir, doc_dir, combined_html_name)
+        logging.getLogger(__app_name__).info("run() executed with: %s", excel_path)
+        return 0
+
+    # ---- ジャーナル付き: 文書×ステージ毎に入力ハッシュを記録し、済みのものは再実行しない ----
+    journal = JobJournal.for_dir(download_dir)
+    journal.begin_run(str(database))
+    status = "failed"
+    try:
+        if STREAMING_PIPELINE and str(database) in ("3gpp", "ieee"):
+            print(str(database))
+            download_urls =  xr.xread("col", 1, header=True, sheet = sheet_url_list_path, hyperlink = hyperlink_3gppp)
+            out = run_streaming_pipeline(str(database), str(download_dir), download_urls, zip_dir, doc_dir,
+                                         str(html_path), combined_html_name, proxy_url, journal=journal)
+            journal.record_downloads(out["results"])
+            _write_stage_outputs(str(database), xlsx_path, out["results"],
+                                 out["res_zip"] if str(database) == "3gpp" else None)
+            write_manifest(out["records"], str(xlsx_path), "convert_"+str(database))
+
+        elif str(database) == "3gpp":
+            print("3gpp")
+            download_urls =  xr.xread("col", 1, header=True, sheet = sheet_url_list_path, hyperlink = hyperlink_3gppp)
+            res = fetch_3gpp_docs_queue(str(download_dir),download_urls,zip_dir,proxy=proxy_url)
+            journal.record_downloads(res)
+
+            res_zip = extract_zips_journaled(journal, [r.get("saved_path") for r in res if not r.get("error")], doc_dir)
+
+            l = [str(p) for paths in res_zip for p in paths]
+            conv = convert_documents_journaled(journal, l, str(html_path), combined_html_name, str(download_dir), doc_dir)
+            write_manifest(conv["records"], str(xlsx_path), "convert_"+str(database))
+            _write_stage_outputs(str(database), xlsx_path, res, res_zip)
+
+        elif str(database) == "ieee":
+            print("ieee")
+            download_urls =  xr.xread("col", 1, header=True, sheet = sheet_url_list_path, hyperlink = hyperlink_3gppp)
+            res = fetch_ieee_docs_queue(str(download_dir),download_urls,zip_dir,proxy=proxy_url)
+            journal.record_downloads(res)
+            l = [r.get("saved_path") for r in res if not r.get("error")]
+            conv = convert_documents_journaled(journal, l, str(html_path), combined_html_name, str(download_dir), doc_dir)
+            write_manifest(conv["records"], str(xlsx_path), "convert_"+str(database))
+            _write_stage_outputs(str(database), xlsx_path, res)
+        status = "ok"
+    finally:
+        print(f"[JOURNAL] {journal.summary()}")
+        journal.end_run(status)
+        journal.close()
 
     logging.getLogger(__app_name__).info("run() executed with: %s", excel_path)
     return 0
@@ -0,0 +1,210 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from emoji.emoscript import emo
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+# ==================== 調整フラグ ====================
+JOURNAL_NAME      = "job_journal.sqlite3"   # download_dir 直下に置くジャーナル
+HASH_BLOCK_BYTES  = 1024 * 1024
+
+# ステージ名（doc_key の意味はステージ毎に異なる）
+STAGE_DOWNLOAD = "download"   # doc_key = URL
+STAGE_EXTRACT  = "extract"    # doc_key = ZIP パス、output = 展開先パスの JSON 配列
+STAGE_PDF      = "pdf"        # doc_key = 文書パス、output = PDF パス
+STAGE_HTML     = "html"       # doc_key = "html:<まとめ名>"、output = part HTML の JSON 配列
+
+STATUS_DONE   = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs(
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    label       TEXT,
+    started_at  TEXT,
+    finished_at TEXT,
+    status      TEXT
+);
+CREATE TABLE IF NOT EXISTS stages(
+    doc_key     TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    input_hash  TEXT,
+    status      TEXT NOT NULL,
+    output      TEXT,
+    error       TEXT,
+    run_id      INTEGER,
+    updated_at  TEXT,
+    PRIMARY KEY(doc_key, stage)
+);
+CREATE TABLE IF NOT EXISTS file_hashes(
+    path        TEXT PRIMARY KEY,
+    size        INTEGER,
+    mtime_ns    INTEGER,
+    sha256      TEXT
+);
+"""
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+class JobJournal:
+    """
+    fetch → unzip → HTML → PDF の各ステージの文書毎の状態を SQLite に記録する。
+    - (doc_key, stage) 毎に input_hash / status / output を保持。同じ入力ハッシュで done なら再実行不要
+    - ファイルハッシュは (size, mtime_ns) が変わらない限り再計算しない（file_hashes テーブル）
+    - 1 行更新ごとに commit するので、途中で落ちても直前までの状態が残る
+    - doc_key は str(...) した値で照合する（パスは呼び出し側で str(Path(...)) に揃える）
+    """
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = str(db_path)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.run_id: Optional[int] = None
+
+    @classmethod
+    def for_dir(cls, dir_path: Union[str, Path], name: str = JOURNAL_NAME) -> "JobJournal":
+        return cls(Path(dir_path) / name)
+
+    # ---------- run ----------
+    def begin_run(self, label: str = "") -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO runs(label, started_at, status) VALUES(?,?,?)", (label, _now(), "running"))
+            self._conn.commit()
+            self.run_id = int(cur.lastrowid)
+        print(f"{emo.info} ジャーナル run #{self.run_id}: {self.db_path}")
+        return self.run_id
+
+    def end_run(self, status: str = "ok") -> None:
+        if self.run_id is None:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished_at=?, status=? WHERE run_id=?",
+                               (_now(), status, self.run_id))
+            self._conn.commit()
+
+    # ---------- ハッシュ ----------
+    def file_hash(self, path: Union[str, Path]) -> Optional[str]:
+        """sha256。存在しなければ None。(size, mtime_ns) が同じならキャッシュを返す。"""
+        p = str(path)
+        try:
+            st = os.stat(p)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path=?", (p,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        h = hashlib.sha256()
+        with open(p, "rb") as f:
+            while True:
+                b = f.read(HASH_BLOCK_BYTES)
+                if not b:
+                    break
+                h.update(b)
+        digest = h.hexdigest()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes(path, size, mtime_ns, sha256) VALUES(?,?,?,?)",
+                (p, st.st_size, st.st_mtime_ns, digest))
+            self._conn.commit()
+        return digest
+
+    # ---------- ステージ状態 ----------
+    def get(self, doc_key: Union[str, Path], stage: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT input_hash, status, output, error, run_id, updated_at FROM stages "
+                "WHERE doc_key=? AND stage=?", (str(doc_key), stage)
+            ).fetchone()
+        if not row:
+            return None
+        out = row[2]
+        try:
+            out = json.loads(out) if out else None
+        except Exception:
+            pass
+        return {"input_hash": row[0], "status": row[1], "output": out,
+                "error": row[3], "run_id": row[4], "updated_at": row[5]}
+
+    def is_done(self, doc_key: Union[str, Path], stage: str, input_hash: Optional[str]) -> bool:
+        e = self.get(doc_key, stage)
+        return bool(e and e["status"] == STATUS_DONE and e["input_hash"] == input_hash)
+
+    def mark(self,
+             doc_key: Union[str, Path],
+             stage: str,
+             input_hash: Optional[str],
+             status: str,
+             output: Any = None,
+             error: Optional[str] = None) -> None:
+        key = str(doc_key)
+        out = None if output is None else json.dumps(output, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages(doc_key, stage, input_hash, status, output, error, run_id, updated_at) "
+                "VALUES(?,?,?,?,?,?,?,?)",
+                (key, stage, input_hash, status, out, error, self.run_id, _now()))
+            self._conn.commit()
+
+    def mark_done(self, doc_key, stage, input_hash, output=None) -> None:
+        self.mark(doc_key, stage, input_hash, STATUS_DONE, output=output)
+
+    def mark_failed(self, doc_key, stage, input_hash, error: str) -> None:
+        self.mark(doc_key, stage, input_hash, STATUS_FAILED, error=error)
+
+    def record_downloads(self, results: Iterable[Dict[str, Any]]) -> None:
+        """fetch_docs_queue の結果を download ステージとして記録（ハッシュは保存ファイルの sha256）。"""
+        for r in results:
+            url = r.get("url")
+            if not url:
+                continue
+            if r.get("error"):
+                self.mark_failed(url, STAGE_DOWNLOAD, None, str(r["error"]))
+            else:
+                sp = r.get("saved_path")
+                self.mark_done(url, STAGE_DOWNLOAD, self.file_hash(sp) if sp else None, output=sp)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, status, COUNT(*) FROM stages GROUP BY stage, status").fetchall()
+        d: Dict[str, Dict[str, int]] = {}
+        for stage, status, n in rows:
+            d.setdefault(stage, {})[status] = n
+        return d
+
+    def close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+
+    def __enter__(self) -> "JobJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def combined_hash(pairs: Iterable[Tuple[str, Optional[str]]], *extra: str) -> str:
+    """(パス, ハッシュ) の並びと設定文字列から 1 つのハッシュを作る（順序も入力の一部）。"""
+    h = hashlib.sha256()
+    for s in extra:
+        h.update(str(s).encode("utf-8")); h.update(b"\0")
+    for p, d in pairs:
+        h.update(str(p).encode("utf-8")); h.update(b"\t")
+        h.update((d or "-").encode("ascii")); h.update(b"\n")
+    return h.hexdigest()
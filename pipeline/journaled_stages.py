@@ -0,0 +1,147 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from emoji.emoscript import emo
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from pipeline.job_journal import (
+    STAGE_EXTRACT,
+    STAGE_HTML,
+    STAGE_PDF,
+    STATUS_DONE,
+    JobJournal,
+    combined_hash,
+    )
+
+from about_zip.extract_zip_to_docs import (
+    extract_zip_to_docs,
+    )
+
+from combine.extract_paragraphs import (
+    BATCH_SIZE_DEFAULT,
+    MAX_FILE_KB_DEFAULT,
+    convert_office_documents,
+    html_settings_signature,
+    )
+
+from combine.convert_from_get_files_to_PDF import (
+    PPT_EXTS,
+    WORD_EXTS,
+    )
+
+def _outputs_exist(entry: Optional[dict]) -> bool:
+    if not entry or entry.get("status") != STATUS_DONE:
+        return False
+    out = entry.get("output")
+    outs = out if isinstance(out, list) else [out]
+    return all(o and Path(o).exists() for o in outs)
+
+def extract_zips_journaled(journal: JobJournal,
+                           zip_paths: Iterable[Any],
+                           doc_dir: str) -> List[List[Path]]:
+    """
+    ZIP 毎に sha256 をジャーナルと照合し、未展開 / 中身が変わった ZIP だけ展開する。
+    - 変わった ZIP は overwrite=True で展開し直す
+    - 戻り値は extract_zip_to_docs_from_fold と同じ List[List[Path]]
+    """
+    res_zip: List[List[Path]] = []
+    reused = 0
+    for z in zip_paths:
+        if not z:
+            continue
+        zp = str(Path(str(z)))
+        h = journal.file_hash(zp)
+        if h is None:
+            print(f"{emo.warn} ZIP が見つかりません: {zp}")
+            journal.mark_failed(zp, STAGE_EXTRACT, None, "not found")
+            continue
+        e = journal.get(zp, STAGE_EXTRACT)
+        if e and e["input_hash"] == h and _outputs_exist(e):
+            res_zip.append([Path(p) for p in e["output"]])
+            reused += 1
+            continue
+        changed = bool(e and e["input_hash"] and e["input_hash"] != h)
+        try:
+            created = extract_zip_to_docs(zp, doc_dir, overwrite=changed)
+            journal.mark_done(zp, STAGE_EXTRACT, h, [str(p) for p in created])
+            res_zip.append(created)
+        except Exception as ex:
+            print(f"{emo.warn} 展開失敗: {zp} → {ex}")
+            journal.mark_failed(zp, STAGE_EXTRACT, h, str(ex))
+    print(f"{emo.info} 展開: 再利用 {reused} / 処理 {len(res_zip) - reused}")
+    return res_zip
+
+def _html_stage_key(html_path: Union[str, Path], combined_html_name: str) -> str:
+    return f"html:{Path(html_path) / str(combined_html_name)}"
+
+def _html_stage_hash(journal: JobJournal, docs: List[str], combined_html_name: str,
+                    batch_size: int = BATCH_SIZE_DEFAULT, size_kb_limit: int = MAX_FILE_KB_DEFAULT) -> str:
+    return combined_hash([(d, journal.file_hash(d)) for d in docs], str(combined_html_name),
+                         html_settings_signature(batch_size, size_kb_limit))
+
+def convert_documents_journaled(journal: JobJournal,
+                                doc_paths: Iterable[Any],
+                                html_path: Union[str, Path],
+                                combined_html_name: str,
+                                pdf_output_dir: Union[str, Path],
+                                pdf_dir: str,
+                                batch_size: int = BATCH_SIZE_DEFAULT,
+                                size_kb_limit: int = MAX_FILE_KB_DEFAULT,
+                                max_agents: Optional[int] = None) -> Dict[str, List]:
+    """
+    HTML と PDF を convert_office_documents の 1 ステージで出す（各文書を開くのは 1 回だけ）。
+    - HTML: まとめ HTML は全文書の結合なので、文書リスト（この順）・各 sha256・変換設定
+      （バックエンド/フラグ/batch_size 等）が前回と同じで part が揃っていればステージごと省略。1 つでも変われば作り直す
+    - PDF : 文書毎に sha256 を照合し、PDF 未作成 / 中身が変わった文書だけ作る（同じ PDF 名に上書き）
+    - 両方済みの文書は開かない。PDF は 1 文書終わる毎にジャーナルへ記録（中断しても済んだ分は次回再利用）
+    戻り値: {"html_parts", "pdfs", "records"}
+    """
+    docs = [str(Path(str(d))) for d in doc_paths if d]
+    key = _html_stage_key(html_path, combined_html_name)
+    h = _html_stage_hash(journal, docs, combined_html_name, batch_size, size_kb_limit)
+    e = journal.get(key, STAGE_HTML)
+    make_html = not (e and e["input_hash"] == h and _outputs_exist(e))
+    if not make_html:
+        print(f"{emo.ok} HTML: 入力に変化なし → 省略")
+
+    reused: List[Path] = []
+    pending: Dict[str, Optional[str]] = {}
+    for dp in docs:
+        if Path(dp).suffix.lower() not in WORD_EXTS | PPT_EXTS:
+            continue
+        dh = journal.file_hash(dp)
+        pe = journal.get(dp, STAGE_PDF)
+        if dh is not None and pe and pe["input_hash"] == dh and _outputs_exist(pe):
+            reused.append(Path(pe["output"]))
+        else:
+            pending[dp] = dh
+    print(f"{emo.info} PDF: 再利用 {len(reused)} / 変換対象 {len(pending)}")
+
+    def _on_record(r: Dict) -> None:
+        dp = str(Path(r["path"]))
+        if dp not in pending:
+            return
+        if r.get("pdf"):
+            journal.mark_done(dp, STAGE_PDF, pending[dp], r["pdf"])
+        else:
+            journal.mark_failed(dp, STAGE_PDF, pending[dp], r.get("error") or "PDF 変換失敗")
+
+    if not make_html and not pending:
+        return {"html_parts": [Path(p) for p in e["output"]], "records": [], "pdfs": reused}
+    try:
+        out = convert_office_documents(docs, str(html_path), combined_html_name, str(pdf_output_dir), pdf_dir,
+                                       make_html=make_html, make_pdf=bool(pending), overwrite_pdf=True,
+                                       batch_size=batch_size, size_kb_limit=size_kb_limit, max_agents=max_agents,
+                                       pdf_needed=lambda p: str(Path(p)) in pending, on_record=_on_record)
+    except Exception as ex:
+        if make_html:
+            journal.mark_failed(key, STAGE_HTML, h, str(ex))
+        raise
+    if make_html:
+        parts = out["html_parts"]
+        journal.mark_done(key, STAGE_HTML, h, [str(p) for p in parts])
+    else:
+        parts = [Path(p) for p in e["output"]]
+    pdfs = reused + [Path(r["pdf"]) for r in out["records"] if r.get("pdf")]
+    return {"html_parts": parts, "records": out["records"], "pdfs": pdfs}
@@ -0,0 +1,247 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from emoji.emoscript import emo
+
+import queue, threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from download_doc.download_scheduler import (
+    fetch_docs_queue,
+    )
+
+from about_zip.extract_zip_to_docs import (
+    extract_zip_to_docs,
+    )
+
+from combine.extract_paragraphs import (
+    convert_office_documents_stream,
+    )
+
+from combine.convert_from_get_files_to_PDF import (
+    PPT_EXTS,
+    WORD_EXTS,
+    kill_office_processes,
+    )
+
+from pipeline.job_journal import (
+    STAGE_EXTRACT,
+    STAGE_PDF,
+    JobJournal,
+    )
+
+# ==================== 調整フラグ ====================
+QUEUE_MAXSIZE     = 64    # ステージ間キューの上限（満杯なら前段が待つ = 背圧）
+EXTRACT_WORKERS   = 2     # ZIP 展開スレッド数
+OFFICE_AGENTS     = 4     # HTML+PDF 変換の常駐ワーカー数の上限（1 文書 1 回だけ開いて両方出す）
+
+class StageAborted(RuntimeError):
+    """後段が落ちたので前段の投入を打ち切る"""
+
+class StageQueue:
+    """
+    ステージ間の有界キュー。
+    - put() は満杯なら待つ。abort 済みなら StageAborted（後段が落ちた時に前段が固まらない）
+    - close() 後に iter() が終端する（消費者ごとに 1 回）
+    """
+    _END = object()
+
+    def __init__(self, name: str, abort: threading.Event, maxsize: int = QUEUE_MAXSIZE):
+        self.name = name
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._abort = abort
+
+    def put(self, item: Any) -> None:
+        while True:
+            if self._abort.is_set():
+                raise StageAborted(f"{self.name}: 後段が停止したため投入を中止")
+            try:
+                self._q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def close(self, consumers: int = 1) -> None:
+        for _ in range(consumers):
+            self.put(self._END)
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            try:
+                item = self._q.get(timeout=0.5)
+            except queue.Empty:
+                if self._abort.is_set():
+                    return
+                continue
+            if item is self._END:
+                return
+            yield item
+
+class _StageThread(threading.Thread):
+    """例外を保持して join 後に再送出するためのスレッド。落ちたら abort を立てる。"""
+    def __init__(self, name: str, target: Callable[[], Any], abort: threading.Event):
+        super().__init__(name=name, daemon=True)
+        self._target_fn = target
+        self._abort = abort
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        try:
+            self.result = self._target_fn()
+        except BaseException as e:
+            self.error = e
+            self._abort.set()
+            print(f"{emo.fail} [{self.name}] 停止: {e}")
+
+def run_streaming_pipeline(kind: str,
+                           download_dir: str | Path,
+                           download_urls: List[str],
+                           zip_dir: str,
+                           doc_dir: str,
+                           html_path: str | Path,
+                           combined_html_name: str,
+                           proxy: Optional[str],
+                           *,
+                           journal: Optional[JobJournal] = None,
+                           extract_workers: int = EXTRACT_WORKERS,
+                           office_agents: int = OFFICE_AGENTS,
+                           queue_size: int = QUEUE_MAXSIZE,
+                           **fetch_options: Any) -> Dict[str, Any]:
+    """
+    download → (unzip) → HTML+PDF を有界キューでつないで同時に流す。
+    - ダウンロード 1 件完了ごとに展開ワーカーへ（3gpp）、または直接文書キューへ（ieee）
+    - 文書キュー（有界 = 背圧）から convert_office_documents_stream が 1 文書 1 回だけ開いて HTML と PDF を出す
+    - Office Kill は開始時と終了時に 1 回だけ
+    - journal があれば展開/PDF は文書毎に済み判定（PDF 済みの文書は HTML だけ。1 件終わる毎に記録）
+    - HTML は毎回作り直す（part の並びは届いた順で実行毎に変わるため、ジャーナルには記録しない。
+      HTML を省略したい時は STREAMING_PIPELINE=False の convert_documents_journaled 経路を使う）
+    戻り値: {"results", "res_zip", "docs", "html_parts", "pdfs", "records"}
+    """
+    unzip = (kind or "").strip().lower() == "3gpp"
+    abort = threading.Event()
+    zip_q = StageQueue("zip", abort, queue_size)
+    doc_q = StageQueue("doc", abort, queue_size)
+
+    lock = threading.Lock()
+    res_zip: List[List[Path]] = []
+    docs: List[str] = []
+    pdf_hashes: Dict[str, Optional[str]] = {}
+    reused_pdfs: List[Path] = []
+
+    def _emit_doc(doc: Path) -> None:
+        d = str(doc)
+        with lock:
+            docs.append(d)
+        doc_q.put(d)
+
+    def _pdf_needed(doc: Path) -> bool:
+        """変換ステージが文書毎に呼ぶ。ジャーナルで PDF 済みなら作らない"""
+        d = str(doc)
+        if doc.suffix.lower() not in WORD_EXTS | PPT_EXTS:
+            return False
+        if journal is not None:
+            h = journal.file_hash(d)
+            e = journal.get(d, STAGE_PDF)
+            if h is not None and e and e["status"] == "done" and e["input_hash"] == h and e["output"] and Path(e["output"]).exists():
+                with lock:
+                    reused_pdfs.append(Path(e["output"]))
+                return False
+            with lock:
+                pdf_hashes[d] = h
+        return True
+
+    def _extract_one(zp: str) -> List[Path]:
+        if journal is None:
+            return extract_zip_to_docs(zp, doc_dir)
+        h = journal.file_hash(zp)
+        e = journal.get(zp, STAGE_EXTRACT)
+        if e and e["status"] == "done" and e["input_hash"] == h and all(Path(p).exists() for p in (e["output"] or [])):
+            return [Path(p) for p in e["output"]]
+        changed = bool(e and e["input_hash"] and e["input_hash"] != h)
+        try:
+            created = extract_zip_to_docs(zp, doc_dir, overwrite=changed)
+        except Exception as ex:
+            journal.mark_failed(zp, STAGE_EXTRACT, h, str(ex))
+            raise
+        journal.mark_done(zp, STAGE_EXTRACT, h, [str(p) for p in created])
+        return created
+
+    def _extract_loop() -> None:
+        for zp in zip_q:
+            try:
+                created = _extract_one(zp)
+            except StageAborted:
+                raise
+            except Exception as ex:
+                print(f"{emo.warn} 展開失敗: {zp} → {ex}")
+                continue
+            with lock:
+                res_zip.append(created)
+            for doc in created:
+                _emit_doc(doc)
+
+    def _on_result(r: Dict[str, Any]) -> None:
+        if r.get("error") or not r.get("saved_path"):
+            return
+        if unzip:
+            zip_q.put(str(r["saved_path"]))
+        else:
+            _emit_doc(Path(str(r["saved_path"])))
+
+    def _on_record(r: Dict[str, Any]) -> None:
+        # 1 文書終わる毎に PDF を記録（途中で落ちても済んだ PDF は次回再利用される）
+        if journal is None:
+            return
+        d = str(Path(r["path"]))
+        with lock:
+            if d not in pdf_hashes:
+                return
+            h = pdf_hashes[d]
+        if r.get("pdf"):
+            journal.mark_done(d, STAGE_PDF, h, r["pdf"])
+        else:
+            journal.mark_failed(d, STAGE_PDF, h, r.get("error") or "PDF 変換失敗")
+
+    kill_office_processes()
+
+    office_t = _StageThread("office", lambda: convert_office_documents_stream(
+        iter(doc_q), str(html_path), combined_html_name, str(download_dir), doc_dir,
+        overwrite_pdf=journal is not None, max_agents=office_agents, kill_office=False,
+        pdf_needed=_pdf_needed, on_record=_on_record), abort)
+    ext_ts = [_StageThread(f"extract-{i+1}", _extract_loop, abort) for i in range(extract_workers if unzip else 0)]
+    for t in [office_t, *ext_ts]:
+        t.start()
+
+    results: List[Dict[str, Any]] = []
+    fetch_error: Optional[BaseException] = None
+    try:
+        results = fetch_docs_queue(kind, str(download_dir), download_urls, zip_dir, proxy,
+                                   on_result=_on_result, **fetch_options)
+        if unzip:
+            zip_q.close(consumers=len(ext_ts))
+        for t in ext_ts:
+            t.join()
+        doc_q.close()
+    except BaseException as e:
+        abort.set()
+        fetch_error = e
+    finally:
+        for t in [*ext_ts, office_t]:
+            t.join()
+        kill_office_processes()
+
+    # 後段の本当の失敗原因を優先して送出（前段の StageAborted はその結果にすぎない）
+    for t in [*ext_ts, office_t]:
+        if t.error is not None and not isinstance(t.error, StageAborted):
+            raise t.error
+    if fetch_error is not None:
+        raise fetch_error
+
+    out = office_t.result or {"html_parts": [], "records": []}
+    html_parts: List[Path] = out["html_parts"]
+    pdfs = reused_pdfs + [Path(r["pdf"]) for r in out["records"] if r.get("pdf")]
+
+    print(f"{emo.ok} pipeline: ダウンロード {len(results)} / 文書 {len(docs)} / HTML part {len(html_parts)} / PDF {len(pdfs)}")
+    return {"results": results, "res_zip": res_zip, "docs": docs, "html_parts": html_parts, "pdfs": pdfs,
+            "records": out["records"]}
@@ -3,41 +3,47 @@ sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 from emoji.emoscript import emo
 
 import os
-from time import sleep
+import hashlib
+from time import monotonic, sleep
 from urllib.parse import urlparse
 from typing import Optional
 
-from pure_download.msxml2_util import (
-    msxml2_all_headers_dict,
-    msxml2_available,
-    msxml2_request,
-    msxml2_read_body_bytes,
-    probe_remote_msxml2,
-)
+try:
+    from pure_download.msxml2_util import (
+        msxml2_all_headers_dict,
+        msxml2_available,
+        msxml2_request,
+        msxml2_read_body_bytes,
+        probe_remote_msxml2,
+    )
+except ImportError:
+    # win32com が無い環境（Linux 等）では requests バックエンドのみ利用可
+    def msxml2_available() -> bool:
+        return False
 
 from pure_download.download_util import (
     cookie_header_from_session,
+    current_partial_size,
     get_landing_and_session,
     is_dir_like,
     normalize_proxy_for_msxml2,
+    remote_meta_from_headers,
     sanitize_filename,
     to_double_backslash_literal,
+    truncate_file,
 )
 
-def current_partial_size(
-        path: str
-    ) -> int:
-    try:
-        return os.path.getsize(path)
-    except Exception:
-        return 0
+from pure_download.http_cache import HttpMetaCache
+
+from pure_download.download_stream import (
+    PROBE_MODES,
+    download_file_safely_requests,
+)
+from pure_download.download_segmented import (
+    download_file_segmented_requests,
+)
 
-def truncate_file(
-        path: str,
-        size: int
-    ) -> None:
-    with open(path, "r+b") as f:
-        f.truncate(size)
+DOWNLOAD_BACKENDS = ("msxml2", "requests")
 
 def download_file_safely_msxml2(
         download_url: str,
@@ -52,12 +58,23 @@ def download_file_safely_msxml2(
         referer: Optional[str] = None,
         user_agent: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
         use_curl_fallback: bool = True,
+        probe_mode: str = "always",
+        meta_cache: Optional[HttpMetaCache] = None,
+        throttle=None,
     ) -> str:
-
+    """
+    MSXML2.ServerXMLHTTP で取得する従来版。
+    - probe_mode="always": HEAD でサイズ/ETag/Range 可否を調べてから GET
+    - probe_mode="resume": .part がある時だけ HEAD。新規取得は GET の応答ヘッダから学習
+    - meta_cache を渡すと既存ファイルを条件付き GET で再検証し、304 なら転送しない
+    - throttle を渡すと各 GET の前にホスト毎のレート制御で待ち、応答状況を報告する
+    """
     if not msxml2_available():
         raise RuntimeError(f"{emo.warn} MSXML2 ヘルパが未定義です（msxml2_request/msxml2_all_headers_dict/msxml2_read_body_bytes）。")
     if not download_url:
         raise ValueError("download_url が指定されていません。")
+    if probe_mode not in PROBE_MODES:
+        raise ValueError(f"probe_mode は {PROBE_MODES} のいずれかを指定してください: {probe_mode!r}")
 
     parsed = urlparse(download_url)
     pure_filename = os.path.basename(parsed.path) or "download.bin"
@@ -89,9 +106,12 @@ def download_file_safely_msxml2(
     tms = (connect_timeout * 1000, connect_timeout * 1000, read_timeout * 1000, read_timeout * 1000)
     pxy = normalize_proxy_for_msxml2(proxy)
 
-    total_size, accept_ranges, if_range_token = probe_remote_msxml2(download_url, common_headers, tms, pxy)
-
     part_size0 = current_partial_size(temp_path)
+    if probe_mode == "always" or part_size0 > 0:
+        total_size, accept_ranges, if_range_token = probe_remote_msxml2(download_url, common_headers, tms, pxy, throttle)
+    else:
+        total_size, accept_ranges, if_range_token = None, False, None
+
     if total_size is not None and total_size >= 0:
         if part_size0 == total_size:
             os.replace(temp_path, final_path)
@@ -111,23 +131,42 @@ def download_file_safely_msxml2(
         if not accept_ranges:
             part_size0 = 0
 
+    cond_headers = {}
+    if meta_cache is not None and part_size0 == 0:
+        cond_headers = meta_cache.conditional_headers(download_url, final_path)
+
     for attempt in range(1, max_retries + 1):
         part_size = current_partial_size(temp_path)
+        reported = False
+        t0 = monotonic()
         try:
             headers = dict(common_headers)
             if part_size > 0 and accept_ranges:
                 headers["Range"] = f"bytes={part_size}-"
                 if if_range_token:
                     headers["If-Range"] = if_range_token
+            elif part_size == 0 and cond_headers:
+                headers.update(cond_headers)
 
             print(f"{emo.start} [{attempt}/{max_retries} PROXY={pxy or 'NONE'}] GET {download_url} (resume {part_size}, MSXML2)")
 
+            if throttle is not None:
+                throttle.before(download_url)
+                t0 = monotonic()
             http = msxml2_request("GET", download_url, headers, tms, pxy)
             status = int(http.status)
+            if throttle is not None:
+                throttle.after(download_url, status, monotonic() - t0, msxml2_all_headers_dict(http).get("retry-after"))
+                reported = True
+
+            if status == 304 and cond_headers:
+                meta_cache.record_not_modified(download_url, msxml2_all_headers_dict(http))
+                print(f"{emo.ok} 304 未更新 → {final_path}")
+                return file_extension
 
             if status == 416:
                 print(f"{emo.warn} 416 受信 → 再プローブして整合性回復を試行")
-                total_size, accept_ranges, if_range_token = probe_remote_msxml2(download_url, common_headers, tms, pxy)
+                total_size, accept_ranges, if_range_token = probe_remote_msxml2(download_url, common_headers, tms, pxy, throttle)
                 ps = current_partial_size(temp_path)
                 if total_size is not None:
                     if ps == total_size:
@@ -147,16 +186,33 @@ def download_file_safely_msxml2(
             if status < 200 or status >= 300:
                 raise RuntimeError(f"{emo.warn} HTTP {status}")
 
+            # GET の応答ヘッダでサイズ/Range 可否/検証トークンを更新（HEAD 省略時の代わり）
+            resp_headers = msxml2_all_headers_dict(http)
+            g_total, g_ranges, g_token = remote_meta_from_headers(resp_headers, status)
+            if g_total is not None:
+                total_size = g_total
+            accept_ranges = accept_ranges or g_ranges
+            if_range_token = g_token or if_range_token
+
             data = msxml2_read_body_bytes(http)
             mode = "ab" if part_size > 0 and status == 206 else "wb"
             with open(temp_path, mode) as f:
                 f.write(data)
 
+            got = current_partial_size(temp_path)
+            if total_size is not None and got != total_size:
+                raise RuntimeError(f"{emo.warn} サイズ不一致: {got} != {total_size}")
+
             os.replace(temp_path, final_path)
+            if meta_cache is not None:
+                meta_cache.record_download(download_url, resp_headers, final_path,
+                                           hashlib.sha256(data).hexdigest() if mode == "wb" else None)
             print(f"{emo.save} 成功（MSXML2）→ {final_path}")
             return file_extension
 
         except Exception as e:
+            if throttle is not None and not reported:
+                throttle.after(download_url, None, monotonic() - t0)
             print(f"{emo.fail} 失敗 ({attempt}/{max_retries}) MSXML2: {e}")
             if attempt < max_retries:
                 sleep(min(2 * attempt, 10))
@@ -164,6 +220,36 @@ def download_file_safely_msxml2(
 
     raise RuntimeError(f"{emo.fail} ダウンロードに失敗しました。")
 
+def download_file_safely(
+        download_url: str,
+        download_path: str,
+        filename: str,
+        *,
+        backend: str = "msxml2",
+        **kwargs,
+    ) -> str:
+    """
+    backend で転送エンジンを呼び出しごとに選択する。
+      - "msxml2"  : 従来の MSXML2.ServerXMLHTTP（本文を一括で bytes 化）
+      - "requests": iter_content による逐次書き込み（メモリ一定・Linux 可）
+    segments >= 2 を渡すと（backend に関わらず）requests の Range 分割取得を使う。
+    ServerXMLHTTP はスレッド毎に COM 初期化が要るため、分割取得は requests 側だけに実装している。
+    """
+    b = (backend or "").strip().lower()
+    if b not in DOWNLOAD_BACKENDS:
+        raise ValueError(f"backend は {DOWNLOAD_BACKENDS} のいずれかを指定してください: {backend!r}")
+    if int(kwargs.get("segments") or 1) >= 2:
+        kwargs.pop("use_curl_fallback", None)
+        return download_file_segmented_requests(download_url, download_path, filename, **kwargs)
+    kwargs.pop("segments", None)
+    kwargs.pop("min_size", None)
+    if b == "requests":
+        kwargs.pop("use_curl_fallback", None)
+        return download_file_safely_requests(download_url, download_path, filename, **kwargs)
+    if b == "msxml2":
+        return download_file_safely_msxml2(download_url, download_path, filename, **kwargs)
+    raise ValueError(f"backend は {DOWNLOAD_BACKENDS} のいずれかを指定してください: {backend!r}")
+
 # ============== 実行部 ==============
 if __name__ == "__main__":
     download_url = "https://www.3gpp.org/ftp/tsg_ran/WG2_RL2/TSGR2_105bis/Docs/R2-1903010.zip"
@@ -0,0 +1,285 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from emoji.emoscript import emo
+
+import os
+import re
+import threading
+from time import monotonic, sleep
+from urllib.parse import urlparse
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from pure_download.download_util import (
+    current_partial_size,
+    get_landing_and_session,
+    normalize_proxy_for_msxml2,
+    sanitize_filename,
+    to_double_backslash_literal,
+)
+from pure_download.download_stream import (
+    STREAM_CHUNK_BYTES,
+    download_file_safely_requests,
+    probe_remote_requests,
+)
+from pure_download.http_cache import HttpMetaCache, sha256_of_file
+
+# ==================== 調整フラグ ====================
+SEGMENT_COUNT_DEFAULT = 4                   # 同時に張る Range 接続数
+SEGMENT_MIN_BYTES     = 8 * 1024 * 1024     # これ未満のファイルは分割せず単一ストリーム
+SEGMENT_SUFFIX        = ".seg"              # 事前確保した一時ファイル（.part の再開とは別扱い）
+
+class _RangeNotHonoured(Exception):
+    """206 / Content-Range が要求どおりでない → 単一ストリームへ切り替える合図"""
+
+def split_ranges(
+        total_size: int,
+        segments: int,
+    ) -> list[tuple[int, int]]:
+    """[0, total_size) を segments 個の閉区間 (start, end) に分ける。"""
+    n = max(1, min(int(segments), total_size))
+    step = total_size // n
+    ranges = []
+    for i in range(n):
+        start = i * step
+        end = total_size - 1 if i == n - 1 else (start + step - 1)
+        ranges.append((start, end))
+    return ranges
+
+def _fetch_segment(
+        sess: requests.Session,
+        url: str,
+        headers: dict,
+        timeout: tuple[int, int],
+        proxies: Optional[dict],
+        temp_path: str,
+        start: int,
+        end: int,
+        if_range_token: Optional[str],
+        max_retries: int,
+        chunk_size: int,
+        abort: threading.Event,
+        throttle=None,
+    ) -> int:
+    """
+    1 区間を取得して temp_path の該当オフセットへ直接書き込む。
+    途中切断時は書けた位置から区間の残りだけ取り直す。
+    """
+    pos = start
+    for attempt in range(1, max_retries + 1):
+        if abort.is_set():
+            raise RuntimeError("他の区間が失敗したため中断")
+        reported = False
+        t0 = monotonic()
+        try:
+            h = dict(headers)
+            h["Range"] = f"bytes={pos}-{end}"
+            if if_range_token:
+                h["If-Range"] = if_range_token
+            if throttle is not None:
+                throttle.before(url)
+                t0 = monotonic()
+            with sess.get(url, headers=h, timeout=timeout, proxies=proxies,
+                          stream=True, allow_redirects=True) as resp:
+                status = int(resp.status_code)
+                if throttle is not None:
+                    throttle.after(url, status, monotonic() - t0, resp.headers.get("retry-after"))
+                    reported = True
+                if status == 200:
+                    raise _RangeNotHonoured(f"Range 無視（200）: {pos}-{end}")
+                if status in (418, 429):
+                    raise RuntimeError(f"{emo.warn} (temporary block)")
+                if status != 206:
+                    raise RuntimeError(f"{emo.warn} HTTP {status}")
+                m = re.match(r"\s*bytes\s+(\d+)-(\d+)/", resp.headers.get("content-range") or "")
+                if not m or int(m.group(1)) != pos or int(m.group(2)) != end:
+                    raise _RangeNotHonoured(f"Content-Range 不一致: {resp.headers.get('content-range')!r} (要求 {pos}-{end})")
+                with open(temp_path, "r+b") as f:
+                    f.seek(pos)
+                    for chunk in resp.iter_content(chunk_size=chunk_size):
+                        if not chunk:
+                            continue
+                        if pos + len(chunk) > end + 1:
+                            raise _RangeNotHonoured(f"区間超過: {pos + len(chunk)} > {end + 1}")
+                        f.write(chunk)
+                        pos += len(chunk)
+            if pos != end + 1:
+                raise RuntimeError(f"{emo.warn} 区間が途中で終了: {pos} != {end + 1}")
+            return end - start + 1
+        except _RangeNotHonoured:
+            raise
+        except Exception as e:
+            if throttle is not None and not reported:
+                throttle.after(url, None, monotonic() - t0)
+            print(f"{emo.fail} 区間 {start}-{end} 失敗 ({attempt}/{max_retries}): {e}")
+            if attempt < max_retries and not abort.is_set():
+                sleep(min(2 * attempt, 10))
+                continue
+            raise
+    raise RuntimeError(f"{emo.fail} 区間 {start}-{end} の取得に失敗しました。")
+
+def download_file_segmented_requests(
+        download_url: str,
+        download_path: str,
+        filename: str,
+        *,
+        session: Optional[requests.Session] = None,
+        proxy: Optional[str] = None,
+        connect_timeout: int = 10,
+        read_timeout: int = 180,
+        max_retries: int = 10,
+        referer: Optional[str] = None,
+        user_agent: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+        segments: int = SEGMENT_COUNT_DEFAULT,
+        min_size: int = SEGMENT_MIN_BYTES,
+        expected_sha256: Optional[str] = None,
+        chunk_size: int = STREAM_CHUNK_BYTES,
+        meta_cache: Optional[HttpMetaCache] = None,
+        throttle=None,
+        **stream_kwargs,
+    ) -> str:
+    """
+    HEAD で Accept-Ranges: bytes と Content-Length が分かる大きなファイルを
+    segments 本の Range GET で同時取得し、事前確保した一時ファイルへ直接書き込む。
+    - 小さいファイル / Range 非対応 / .part 再開中 / 206 が返らない場合は単一ストリームへフォールバック
+    - 完了後にサイズ、expected_sha256 があればハッシュも照合
+    """
+    if not download_url:
+        raise ValueError("download_url が指定されていません。")
+
+    parsed = urlparse(download_url)
+    pure_filename = os.path.basename(parsed.path) or "download.bin"
+    file_extension = os.path.splitext(pure_filename)[1]
+
+    base = sanitize_filename(os.path.basename(filename))
+    if not base.lower().endswith((file_extension)):
+        base += file_extension
+
+    final_path = os.path.join(download_path, base)
+    os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
+    seg_path = final_path + SEGMENT_SUFFIX
+
+    common_headers = {
+        "User-Agent": user_agent,
+        "Accept": "*/*",
+        "Accept-Language": "en-US,en;q=0.9,ja;q=0.8",
+        "Accept-Encoding": "identity",
+    }
+    if referer:
+        common_headers["Referer"] = referer
+
+    timeout = (connect_timeout, read_timeout)
+    pxy = normalize_proxy_for_msxml2(proxy)
+    proxies = {"http": pxy, "https": pxy} if pxy else None
+
+    stream_kwargs.update(dict(
+        session=session, proxy=proxy, connect_timeout=connect_timeout, read_timeout=read_timeout,
+        max_retries=max_retries, referer=referer, user_agent=user_agent, chunk_size=chunk_size,
+        meta_cache=meta_cache, throttle=throttle,
+    ))
+
+    def _single_stream(reason: str) -> str:
+        print(f"{emo.info} 単一ストリームで取得: {reason}")
+        ext = download_file_safely_requests(download_url, download_path, filename, **stream_kwargs)
+        if expected_sha256 and os.path.isfile(final_path):
+            got = sha256_of_file(final_path)
+            if got.lower() != expected_sha256.lower():
+                # 壊れたファイルとその記録を残すと、次回は 304 で「未更新」のまま使われ続ける
+                try: os.remove(final_path)
+                except Exception: pass
+                if meta_cache is not None:
+                    meta_cache.forget(download_url)
+                raise RuntimeError(f"{emo.warn} sha256 不一致: {got} != {expected_sha256}")
+        return ext
+
+    if int(segments) < 2:
+        return _single_stream("segments < 2")
+    if current_partial_size(final_path + ".part") > 0:
+        return _single_stream(".part の再開を優先")
+    if meta_cache is not None and meta_cache.conditional_headers(download_url, final_path):
+        return _single_stream("既存ファイルの再検証")
+
+    own_session = session is None
+    sess = requests.Session() if own_session else session
+    stream_kwargs["session"] = sess
+
+    try:
+        total_size, accept_ranges, if_range_token = probe_remote_requests(sess, download_url, common_headers, timeout, proxies, throttle)
+        if total_size is None or not accept_ranges:
+            return _single_stream("サイズ不明または Range 非対応")
+        if total_size < int(min_size):
+            return _single_stream(f"{total_size} bytes < {int(min_size)}")
+
+        ranges = split_ranges(total_size, segments)
+        with open(seg_path, "wb") as f:
+            f.truncate(total_size)   # 事前確保（各区間が自分のオフセットへ書く）
+
+        print(f"{emo.start} [PROXY={pxy or 'NONE'}] GET {download_url} ({len(ranges)} segments, {total_size} bytes)")
+        abort = threading.Event()
+        try:
+            with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="seg") as ex:
+                futs = [ex.submit(_fetch_segment, sess, download_url, common_headers, timeout, proxies,
+                                  seg_path, a, b, if_range_token, max_retries, chunk_size, abort, throttle)
+                        for a, b in ranges]
+                errors = []
+                for fu in futs:
+                    try:
+                        fu.result()
+                    except Exception as e:
+                        abort.set()
+                        errors.append(e)
+            if any(isinstance(e, _RangeNotHonoured) for e in errors):
+                raise next(e for e in errors if isinstance(e, _RangeNotHonoured))
+            if errors:
+                raise RuntimeError(f"{emo.fail} 分割ダウンロードに失敗しました: {errors[0]}")
+
+            got = current_partial_size(seg_path)
+            if got != total_size:
+                raise RuntimeError(f"{emo.warn} サイズ不一致: {got} != {total_size}")
+            digest = sha256_of_file(seg_path) if (expected_sha256 or meta_cache is not None) else None
+            if expected_sha256 and digest.lower() != expected_sha256.lower():
+                raise RuntimeError(f"{emo.warn} sha256 不一致: {digest} != {expected_sha256}")
+        except _RangeNotHonoured as e:
+            try: os.remove(seg_path)
+            except Exception: pass
+            return _single_stream(str(e))
+        except Exception:
+            try: os.remove(seg_path)
+            except Exception: pass
+            raise
+
+        os.replace(seg_path, final_path)
+        if meta_cache is not None:
+            # If-Range トークンは ETag（引用符付き）か Last-Modified のどちらか
+            tok = if_range_token or ""
+            hdrs = {"etag": tok} if tok.startswith(("\"", "W/")) else {"last-modified": tok or None}
+            meta_cache.record_download(download_url, hdrs, final_path, digest)
+        print(f"{emo.save} 成功（{len(ranges)} segments）→ {final_path}")
+        return file_extension
+    finally:
+        if own_session:
+            try: sess.close()
+            except Exception: pass
+
+# ============== 実行部 ==============
+if __name__ == "__main__":
+    download_url = "https://mentor.ieee.org/802.11/dcn/25/11-25-1818-00-0PAR-par-review-sc-mtg-agenda-and-comment-slides-2025-november-bangkok.pptx"
+    download_path = to_double_backslash_literal(r'C:\Users\yohei\Downloads')
+
+    LANDING, sess = get_landing_and_session("IEEE")
+
+    try:
+        ext = download_file_segmented_requests(
+            download_url,
+            download_path,
+            "ieee",
+            session=sess,
+            referer=LANDING,
+            segments=4,
+            )
+        print(f"{emo.info} 拡張子: {ext or '(不明)'}")
+    except Exception as e:
+        print(f"{emo.warn} エラー: {e}")
+        raise
@@ -0,0 +1,280 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from emoji.emoscript import emo
+
+import os
+import hashlib
+from time import monotonic, sleep
+from urllib.parse import urlparse
+from typing import Optional
+
+import requests
+
+from pure_download.download_util import (
+    current_partial_size,
+    get_landing_and_session,
+    normalize_proxy_for_msxml2,
+    remote_meta_from_headers,
+    sanitize_filename,
+    to_double_backslash_literal,
+    truncate_file,
+)
+from pure_download.http_cache import HttpMetaCache
+
+# ==================== 調整フラグ ====================
+STREAM_CHUNK_BYTES  = 256 * 1024     # iter_content の 1 回あたりの読み出し量
+STREAM_BUFFER_BYTES = 1024 * 1024    # .part 書き込み側のバッファ（メモリ上限の目安）
+
+# HEAD プローブの方針
+#   "always": 毎回 HEAD → GET（従来どおり）
+#   "resume": .part がある時だけ HEAD。新規取得は GET の応答ヘッダからサイズ/ETag/Range 可否を学習
+PROBE_MODES = ("always", "resume")
+
+def probe_remote_requests(
+        session: requests.Session,
+        url: str,
+        headers: dict,
+        timeout: tuple[int, int],
+        proxies: Optional[dict],
+        throttle=None,
+    ) -> tuple[Optional[int], bool, Optional[str]]:
+    """
+    HEAD でサイズ/Range 可否/検証トークンを調べる。
+    throttle（before(url) / after(url, status, elapsed, retry_after) を持つ物）を渡すと
+    リクエスト前に待機し、結果を報告する（download_doc.adaptive_concurrency 参照）。
+    """
+    t0 = monotonic()
+    try:
+        if throttle is not None:
+            throttle.before(url)
+            t0 = monotonic()
+        r = session.head(url, headers=headers, timeout=timeout, proxies=proxies, allow_redirects=True)
+        if throttle is not None:
+            throttle.after(url, int(r.status_code), monotonic() - t0, r.headers.get("retry-after"))
+        try:
+            if 200 <= r.status_code < 400:
+                return remote_meta_from_headers(r.headers)
+        finally:
+            r.close()
+    except Exception:
+        if throttle is not None:
+            throttle.after(url, None, monotonic() - t0)
+    return None, False, None
+
+def _stream_body_to_file(
+        resp: requests.Response,
+        temp_path: str,
+        mode: str,
+        chunk_size: int,
+        buffer_size: int,
+        hasher=None,
+    ) -> int:
+    written = 0
+    with open(temp_path, mode, buffering=buffer_size) as f:
+        for chunk in resp.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            f.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            written += len(chunk)
+    return written
+
+def download_file_safely_requests(
+        download_url: str,
+        download_path: str,
+        filename: str,
+        *,
+        session: Optional[requests.Session] = None,
+        proxy: Optional[str] = None,
+        connect_timeout: int = 10,
+        read_timeout: int = 180,
+        max_retries: int = 10,
+        referer: Optional[str] = None,
+        user_agent: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+        chunk_size: int = STREAM_CHUNK_BYTES,
+        buffer_size: int = STREAM_BUFFER_BYTES,
+        probe_mode: str = "always",
+        meta_cache: Optional[HttpMetaCache] = None,
+        throttle=None,
+    ) -> str:
+    """
+    requests の iter_content で .part に逐次書き込むストリーミング版。
+    - メモリ使用量はファイルサイズに依存せず chunk_size + buffer_size 程度
+    - Range / If-Range による再開、416 の整合性回復は MSXML2 版と同じ手順
+    - session を渡すと Cookie と keep-alive 接続をそのまま使い回す
+    - probe_mode="resume" なら新規取得時の HEAD を省き、GET 1 往復で済ませる
+    - meta_cache を渡すと既存ファイルに If-None-Match / If-Modified-Since を付け、304 なら転送しない
+    - throttle を渡すと各リクエストの前にホスト毎のレート制御で待ち、応答状況を報告する
+    """
+    if not download_url:
+        raise ValueError("download_url が指定されていません。")
+    if probe_mode not in PROBE_MODES:
+        raise ValueError(f"probe_mode は {PROBE_MODES} のいずれかを指定してください: {probe_mode!r}")
+
+    parsed = urlparse(download_url)
+    pure_filename = os.path.basename(parsed.path) or "download.bin"
+    file_extension = os.path.splitext(pure_filename)[1]
+
+    base = sanitize_filename(os.path.basename(filename))
+
+    if not base.lower().endswith((file_extension)):
+        base += file_extension
+
+    final_path = os.path.join(download_path, base)
+    os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
+    temp_path  = final_path + ".part"
+
+    common_headers = {
+        "User-Agent": user_agent,
+        "Accept": "*/*",
+        "Accept-Language": "en-US,en;q=0.9,ja;q=0.8",
+        "Accept-Encoding": "identity",   # Range のバイト位置を本文と一致させる
+    }
+    if referer:
+        common_headers["Referer"] = referer
+
+    timeout = (connect_timeout, read_timeout)
+    pxy = normalize_proxy_for_msxml2(proxy)
+    proxies = {"http": pxy, "https": pxy} if pxy else None
+
+    own_session = session is None
+    sess = requests.Session() if own_session else session
+
+    try:
+        part_size0 = current_partial_size(temp_path)
+        if probe_mode == "always" or part_size0 > 0:
+            total_size, accept_ranges, if_range_token = probe_remote_requests(sess, download_url, common_headers, timeout, proxies, throttle)
+        else:
+            total_size, accept_ranges, if_range_token = None, False, None
+
+        if total_size is not None and total_size >= 0:
+            if part_size0 == total_size and part_size0 > 0:
+                os.replace(temp_path, final_path)
+                print(f"{emo.ok} 既に全量取得済み → {final_path}")
+                return file_extension
+            elif part_size0 > total_size:
+                print(f"{emo.warn} 部分ファイル超過: {part_size0} > {total_size} → 切り詰め")
+                try:
+                    truncate_file(temp_path, total_size)
+                except Exception as te:
+                    print(f"{emo.warn} 切り詰め失敗: {te} → 全量取り直し")
+                    try: os.remove(temp_path)
+                    except Exception: pass
+
+        # 既存ファイルの再検証（.part 再開中は通常の Range 取得を優先）
+        cond_headers = {}
+        if meta_cache is not None and part_size0 == 0:
+            cond_headers = meta_cache.conditional_headers(download_url, final_path)
+
+        for attempt in range(1, max_retries + 1):
+            part_size = current_partial_size(temp_path)
+            reported = False
+            t0 = monotonic()
+            try:
+                headers = dict(common_headers)
+                if part_size > 0 and accept_ranges:
+                    headers["Range"] = f"bytes={part_size}-"
+                    if if_range_token:
+                        headers["If-Range"] = if_range_token
+                elif part_size == 0 and cond_headers:
+                    headers.update(cond_headers)
+
+                print(f"{emo.start} [{attempt}/{max_retries} PROXY={pxy or 'NONE'}] GET {download_url} (resume {part_size}, stream)")
+
+                if throttle is not None:
+                    throttle.before(download_url)
+                    t0 = monotonic()
+                with sess.get(download_url, headers=headers, timeout=timeout, proxies=proxies,
+                              stream=True, allow_redirects=True) as resp:
+                    status = int(resp.status_code)
+                    if throttle is not None:
+                        throttle.after(download_url, status, monotonic() - t0, resp.headers.get("retry-after"))
+                        reported = True
+
+                    if status == 304 and cond_headers:
+                        meta_cache.record_not_modified(download_url, resp.headers)
+                        print(f"{emo.ok} 304 未更新 → {final_path}")
+                        return file_extension
+
+                    if status == 416:
+                        print(f"{emo.warn} 416 受信 → 再プローブして整合性回復を試行")
+                        total_size, accept_ranges, if_range_token = probe_remote_requests(sess, download_url, common_headers, timeout, proxies, throttle)
+                        ps = current_partial_size(temp_path)
+                        if total_size is not None:
+                            if ps == total_size:
+                                os.replace(temp_path, final_path)
+                                print(f"{emo.ok} 416 だったが既に全量取得済み → {final_path}")
+                                return file_extension
+                            if ps > total_size:
+                                print(f"{emo.warn} 416: 部分ファイル超過 → 切り詰めて再試行")
+                                truncate_file(temp_path, total_size)
+                        raise RuntimeError(f"{emo.warn} Retry after 416")
+
+                    if status in (418, 429):
+                        raise RuntimeError(f"{emo.warn} (temporary block)")
+                    if status < 200 or status >= 300:
+                        raise RuntimeError(f"{emo.warn} HTTP {status}")
+
+                    # GET の応答ヘッダでサイズ/Range 可否/検証トークンを更新（途中切断時の再開に使う）
+                    g_total, g_ranges, g_token = remote_meta_from_headers(resp.headers, status)
+                    if g_total is not None:
+                        total_size = g_total
+                    accept_ranges = accept_ranges or g_ranges
+                    if_range_token = g_token or if_range_token
+
+                    # Range を送ったのに 200 → サーバが全量を返している（If-Range 不一致等）
+                    resumed = (part_size > 0 and "Range" in headers and status == 206)
+                    mode = "ab" if resumed else "wb"
+                    # 先頭から書く時だけ転送しながらハッシュ（再開時は完了後にファイルから計算）
+                    hasher = hashlib.sha256() if (meta_cache is not None and mode == "wb") else None
+                    _stream_body_to_file(resp, temp_path, mode, chunk_size, buffer_size, hasher)
+                    resp_headers = resp.headers
+
+                got = current_partial_size(temp_path)
+                if total_size is not None and got != total_size:
+                    raise RuntimeError(f"{emo.warn} サイズ不一致: {got} != {total_size}")
+
+                os.replace(temp_path, final_path)
+                if meta_cache is not None:
+                    meta_cache.record_download(download_url, resp_headers, final_path,
+                                               hasher.hexdigest() if hasher is not None else None)
+                print(f"{emo.save} 成功（stream）→ {final_path}")
+                return file_extension
+
+            except Exception as e:
+                if throttle is not None and not reported:
+                    throttle.after(download_url, None, monotonic() - t0)
+                print(f"{emo.fail} 失敗 ({attempt}/{max_retries}) stream: {e}")
+                if attempt < max_retries:
+                    sleep(min(2 * attempt, 10))
+                    continue
+    finally:
+        if own_session:
+            try: sess.close()
+            except Exception: pass
+
+    raise RuntimeError(f"{emo.fail} ダウンロードに失敗しました。")
+
+# ============== 実行部 ==============
+if __name__ == "__main__":
+    download_url = "https://www.3gpp.org/ftp/tsg_ran/WG2_RL2/TSGR2_105bis/Docs/R2-1903010.zip"
+    download_path = to_double_backslash_literal(r'C:\Users\yohei\Downloads')
+
+    LANDING, sess = get_landing_and_session("3gpp")
+
+    try:
+        ext = download_file_safely_requests(
+            download_url,
+            download_path,
+            "3gpp",
+            session=sess,
+            referer=LANDING,
+            connect_timeout=10,
+            read_timeout=180,
+            max_retries=5,
+            )
+        print(f"{emo.info} 拡張子: {ext or '(不明)'}")
+    except Exception as e:
+        print(f"{emo.warn} エラー: {e}")
+        raise
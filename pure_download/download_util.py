@@ -1,3 +1,4 @@
+import os
 import re
 import requests
 from typing import Optional
@@ -88,3 +89,40 @@ def is_dir_like(
         path: str,
     ) -> bool:
     return (os.path.isdir(path) or path.endswith(("\\", "/")))
+
+def current_partial_size(
+        path: str,
+    ) -> int:
+    try:
+        return os.path.getsize(path)
+    except Exception:
+        return 0
+
+def truncate_file(
+        path: str,
+        size: int,
+    ) -> None:
+    with open(path, "r+b") as f:
+        f.truncate(size)
+
+def remote_meta_from_headers(
+        hdrs,
+        status: int = 200,
+    ) -> tuple[Optional[int], bool, Optional[str]]:
+    """
+    レスポンスヘッダから (全体サイズ, Accept-Ranges: bytes か, If-Range 用トークン) を得る。
+    206 の場合は Content-Length ではなく Content-Range の "/total" を全体サイズとする。
+    hdrs は小文字キーの dict か、requests の CaseInsensitiveDict を想定。
+    """
+    total_size = None
+    if status == 206:
+        m = re.search(r"/\s*(\d+)\s*$", hdrs.get("content-range") or "")
+        if m:
+            total_size = int(m.group(1))
+    else:
+        cl = (hdrs.get("content-length") or "").strip()
+        if cl.isdigit():
+            total_size = int(cl)
+    accept_ranges = ((hdrs.get("accept-ranges") or "").lower() == "bytes") or status == 206
+    if_range_token = hdrs.get("etag") or hdrs.get("last-modified")
+    return total_size, accept_ranges, if_range_token
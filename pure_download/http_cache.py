@@ -0,0 +1,141 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from emoji.emoscript import emo
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict, Optional
+
+# ==================== 調整フラグ ====================
+HTTP_META_CACHE_NAME = ".http_meta.json"   # ZIP 保存フォルダ直下に置くインデックス名
+HASH_BLOCK_BYTES     = 1024 * 1024         # 既存ファイルを再ハッシュする時の読み出し単位
+
+def sha256_of_file(
+        path: str,
+        block_size: int = HASH_BLOCK_BYTES,
+    ) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(block_size)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+class HttpMetaCache:
+    """
+    URL 毎の HTTP メタデータ（ETag / Last-Modified / サイズ / sha256）を JSON に保持する。
+    - 保存先は ZIP フォルダ直下の .http_meta.json（フォルダごと移動してもそのまま使える）
+    - 複数スレッドから get/put してよい（内部ロック）。save() は一時ファイル→置換で原子的
+    - conditional_headers() で If-None-Match / If-Modified-Since を組み立てる
+    """
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = {str(k): v for k, v in data.items() if isinstance(v, dict)}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"{emo.warn} HTTP メタキャッシュ読込失敗（空で開始）: {self.path}: {e}")
+
+    @classmethod
+    def for_dir(cls, dir_path: str, name: str = HTTP_META_CACHE_NAME) -> "HttpMetaCache":
+        return cls(os.path.join(str(dir_path), name))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            e = self._entries.get(url)
+            return dict(e) if e else None
+
+    def put(self, url: str, **fields) -> None:
+        with self._lock:
+            e = self._entries.setdefault(url, {})
+            e.update({k: v for k, v in fields.items() if v is not None})
+            e["checked_at"] = datetime.now().isoformat(timespec="seconds")
+            self._dirty = True
+
+    def conditional_headers(self, url: str, local_path: str) -> Dict[str, str]:
+        """
+        ローカルファイルがキャッシュ記録と同じサイズで存在する時だけ検証ヘッダを返す。
+        （途中で差し替えられたファイルに 304 を信じない）
+        """
+        e = self.get(url)
+        if not e or not os.path.isfile(local_path):
+            return {}
+        size = e.get("size")
+        if size is not None and os.path.getsize(local_path) != int(size):
+            return {}
+        hdrs: Dict[str, str] = {}
+        if e.get("etag"):
+            hdrs["If-None-Match"] = e["etag"]
+        if e.get("last_modified"):
+            hdrs["If-Modified-Since"] = e["last_modified"]
+        return hdrs
+
+    def record_download(self, url: str, hdrs, local_path: str, sha256: Optional[str] = None) -> None:
+        """200/206 で取得し終えたファイルのメタデータを記録する。"""
+        self.put(
+            url,
+            etag=hdrs.get("etag"),
+            last_modified=hdrs.get("last-modified"),
+            size=os.path.getsize(local_path),
+            sha256=sha256 or sha256_of_file(local_path),
+            status="downloaded",
+        )
+
+    def record_not_modified(self, url: str, hdrs=None) -> None:
+        """304 を受けた時の記録。サーバが新しい ETag を返していれば差し替える。"""
+        hdrs = hdrs or {}
+        self.put(
+            url,
+            etag=hdrs.get("etag"),
+            last_modified=hdrs.get("last-modified"),
+            status="not_modified",
+        )
+
+    def forget(self, url: str) -> None:
+        """記録を消す（検証に失敗したファイルに次回 304 を信じないように）"""
+        with self._lock:
+            if self._entries.pop(url, None) is not None:
+                self._dirty = True
+
+    def last_status(self, url: str) -> Optional[str]:
+        e = self.get(url)
+        return e.get("status") if e else None
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.dumps(self._entries, ensure_ascii=False, indent=1, sort_keys=True)
+            self._dirty = False
+        d = os.path.dirname(self.path) or "."
+        os.makedirs(d, exist_ok=True)
+        tmp = None
+        try:
+            with NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=d, suffix=".tmp") as f:
+                f.write(snapshot)
+                tmp = f.name
+            os.replace(tmp, self.path)
+        except Exception:
+            if tmp and os.path.exists(tmp):
+                try: os.remove(tmp)
+                except Exception: pass
+            with self._lock:
+                self._dirty = True
+            raise
@@ -1,5 +1,6 @@
 import re
 import win32com.client
+from time import monotonic
 from typing import Optional
 from urllib.parse import urlparse, urljoin
 
@@ -200,15 +201,27 @@ def probe_remote_msxml2(
         headers: dict,
         timeouts_ms: tuple[int,int,int,int],
         proxy: Optional[str],
+        throttle=None,
     ) -> None:
+    """
+    throttle（before(url) / after(url, status, elapsed, retry_after)）を渡すと
+    HEAD の前に待機し、結果（418/429 の Retry-After を含む）を報告する
+    """
     total_size = None
     accept_ranges = False
     if_range_token = None
+    t0 = monotonic()
     try:
+        if throttle is not None:
+            throttle.before(url)
+            t0 = monotonic()
         http = msxml2_request("HEAD", url, headers, timeouts_ms, proxy)
         status = int(http.status)
+        hdrs = msxml2_all_headers_dict(http)
+        if throttle is not None:
+            throttle.after(url, status, monotonic() - t0, hdrs.get("retry-after"))
+            throttle = None
         if 200 <= status < 400:
-            hdrs = msxml2_all_headers_dict(http)
             cl = hdrs.get("content-length")
             if cl and cl.isdigit():
                 total_size = int(cl)
@@ -217,5 +230,6 @@ def probe_remote_msxml2(
             last_modified = hdrs.get("last-modified")
             if_range_token = etag or last_modified
     except Exception:
-        pass
+        if throttle is not None:
+            throttle.after(url, None, monotonic() - t0)
     return total_size, accept_ranges, if_range_token
\ No newline at end of file
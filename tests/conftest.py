@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+
+# リポジトリ直下（combine / download_doc / pipeline ...）を import できるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import hashlib
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+class FileServer:
+    """
+    1 ファイルだけ返す http.server（HEAD / Range / If-Range / If-None-Match 対応）。
+    挙動はテスト側で属性を書き換えて変える:
+        body / etag            … 返す内容と ETag
+        ignore_range           … Range を無視して常に 200 全量
+        head_no_length         … 残り回数だけ HEAD で Content-Length を返さない
+        head_etag              … HEAD だけ別の ETag を返す（If-Range 不一致の再現）
+    requests に (method, path, headers) を記録する
+    """
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        self.ignore_range = False
+        self.head_no_length = 0
+        self.head_etag = None
+        self.requests = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def set_body(self, body: bytes) -> None:
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/files/doc.zip"
+
+    def log(self, method: str):
+        with self._lock:
+            return [r for r in self.requests if r[0] == method]
+
+    def _handler(self):
+        srv = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _record(self):
+                with srv._lock:
+                    srv.requests.append((self.command, self.path, {k.lower(): v for k, v in self.headers.items()}))
+
+            def do_HEAD(self):
+                self._record()
+                self.send_response(200)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", srv.head_etag or srv.etag)
+                if srv.head_no_length > 0:
+                    srv.head_no_length -= 1
+                else:
+                    self.send_header("Content-Length", str(len(srv.body)))
+                self.end_headers()
+
+            def do_GET(self):
+                self._record()
+                body, total = srv.body, len(srv.body)
+                if self.headers.get("If-None-Match") == srv.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", srv.etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                rng = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                m = re.match(r"bytes=(\d+)-(\d*)$", rng or "")
+                if m and not srv.ignore_range and (if_range is None or if_range == srv.etag):
+                    start = int(m.group(1))
+                    end = int(m.group(2)) if m.group(2) else total - 1
+                    if start >= total:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{total}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    end = min(end, total - 1)
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+                    part = body[start:end + 1]
+                else:
+                    self.send_response(200)
+                    part = body
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", srv.etag)
+                self.send_header("Content-Length", str(len(part)))
+                self.end_headers()
+                self.wfile.write(part)
+
+        return Handler
+
+    def start(self) -> "FileServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+@pytest.fixture
+def file_server():
+    body = bytes(range(256)) * 4096 + b"tail"   # 1 MiB + 4 bytes
+    srv = FileServer(body).start()
+    try:
+        yield srv
+    finally:
+        srv.stop()
@@ -0,0 +1,40 @@
+from time import monotonic
+
+from download_doc.adaptive_concurrency import (
+    THROUGHPUT_WINDOW_SEC,
+    AdaptiveConcurrency,
+    TokenBucket,
+    )
+
+def test_set_rate_while_paused_does_not_go_negative():
+    b = TokenBucket(8.0)
+    b.pause(0.5)
+    b.set_rate(4.0)
+    assert b.tokens == 0.0
+    t0 = monotonic()
+    b.acquire()
+    waited = monotonic() - t0
+    # 停止明け（0.5s）+ 1 トークン分（0.25s）。停止時間の倍も待たない
+    assert 0.4 <= waited < 0.9
+
+def test_retry_after_pauses_host_for_about_retry_after():
+    ac = AdaptiveConcurrency(max_agents=4, verbose=False)
+    url = "http://example.invalid/a"
+    ac.before(url)
+    ac.after(url, 429, 0.01, "1")
+    t0 = monotonic()
+    ac.before(url)
+    waited = monotonic() - t0
+    assert 0.9 <= waited < 1.6
+    assert ac.snapshot()["throttled"] == 1
+
+def test_increase_ignores_transfers_older_than_window():
+    ac = AdaptiveConcurrency(max_agents=8, initial=4, verbose=False)
+    now = monotonic()
+    with ac._cv:
+        # 窓の外の大きな転送だけが残っている → 直近のスループットは 0 と見なして増加を取り消す
+        ac._transfers.append((now - 2 * THROUGHPUT_WINDOW_SEC, 10**9))
+        ac._tput_at_increase = 1000.0
+        ac._increase()
+        assert not ac._transfers
+    assert ac.limit == 3
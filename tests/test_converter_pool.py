@@ -0,0 +1,92 @@
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+import combine.converter_backends as cb
+import combine.extract_paragraphs as ep
+import combine.office_watchdog as wd
+from combine.converter_backends import (
+    Converter,
+    ConverterUnsupported,
+    FakeConverter,
+    use_backend,
+    )
+
+@pytest.fixture(autouse=True)
+def _fake_env(monkeypatch):
+    # 環境変数は子プロセス（常駐ワーカー）へ引き継がれるので、テスト毎に戻す
+    for k in [cb.ENV_BACKEND, cb.ENV_FAKE_LATENCY, cb.ENV_FAKE_TRANSIENT, cb.ENV_FAKE_HANG, cb.ENV_FAKE_SEED]:
+        monkeypatch.delenv(k, raising=False)
+    monkeypatch.setattr(ep, "kill_office_processes", lambda: None)
+    monkeypatch.setattr(os, "cpu_count", lambda: 3)
+    yield
+    cb._INSTANCES.clear()
+
+def _docs(dir_: Path, names, size: int = 2048):
+    out = []
+    for n in names:
+        p = dir_ / n
+        p.write_bytes(n.encode() + b"x" * size)   # 内容を変える（変換キャッシュに当たらないように）
+        out.append(p)
+    return out
+
+def _pick(n: int, pred, ext: str = ".docx", prefix: str = "d"):
+    """fake の乱数（パスのハッシュ）が pred を満たす文書名を n 件選ぶ"""
+    got, i = [], 0
+    while len(got) < n:
+        name = f"{prefix}{i}{ext}"
+        if pred(name):
+            got.append(name)
+        i += 1
+    return got
+
+def _h2_order(part: Path):
+    return re.findall(r"<h2>([^<]+)</h2>", part.read_text(encoding="utf-8"))
+
+def test_converter_base_is_abstract():
+    with pytest.raises(TypeError):
+        Converter()
+    assert not issubclass(ConverterUnsupported, NotImplementedError)
+
+def test_records_and_parts_keep_input_order(tmp_path):
+    use_backend("fake", latency_sec=0.05)
+    src = tmp_path / "src"
+    src.mkdir()
+    # 大きい順に投入されるが、出力は入力順
+    docs = [d for i, size in enumerate([1, 40, 5, 80, 10, 20]) for d in _docs(src, [f"doc{i}.docx"], size * 1024)]
+    out = ep.convert_office_documents(docs, str(tmp_path / "out"), "all", make_pdf=False, max_agents=3)
+    assert [r["name"] for r in out["records"]] == [d.name for d in docs]
+    assert all(r["status"] == "ok" for r in out["records"])
+    assert [n for p in out["html_parts"] for n in _h2_order(p)] == [d.name for d in docs]
+
+def test_transient_failure_is_retried(tmp_path, capfd):
+    src = tmp_path / "src"
+    src.mkdir()
+    fake = FakeConverter(transient_rate=0.5, seed=7)
+    flaky = lambda n: fake._roll(src / n, "to_html", 0) < 0.5 <= fake._roll(src / n, "to_html", 1)
+    clean = lambda n: fake._roll(src / n, "to_html", 0) >= 0.5
+    docs = _docs(src, _pick(2, flaky, prefix="f") + _pick(2, clean, prefix="c"))
+
+    use_backend("fake", latency_sec=0.0, transient_rate=0.5, seed=7)
+    out = ep.convert_office_documents(docs, str(tmp_path / "out"), "all", make_pdf=False, max_agents=2)
+    assert [r["status"] for r in out["records"]] == ["ok"] * 4
+    assert capfd.readouterr().out.count("reconnect:fake") == 2
+
+def test_hung_document_is_quarantined(tmp_path, monkeypatch):
+    monkeypatch.setattr(wd, "WATCHDOG_BASE_SEC", 1.5)
+    monkeypatch.setattr(wd, "WATCHDOG_SEC_PER_MB", 0)
+    src = tmp_path / "src"
+    src.mkdir()
+    fake = FakeConverter(hang_rate=0.3, seed=3)
+    hangs = lambda n: fake._roll(src / n, "open", -2) < 0.3
+    docs = _docs(src, _pick(2, lambda n: not hangs(n), prefix="ok") + _pick(1, hangs, prefix="hang"))
+
+    use_backend("fake", latency_sec=0.0, hang_rate=0.3, seed=3)
+    out = ep.convert_office_documents(docs, str(tmp_path / "out"), "all", make_pdf=False, max_agents=2)
+    recs = {r["name"]: r for r in out["records"]}
+    assert [recs[d.name]["status"] for d in docs] == ["ok", "ok", "quarantined"]
+    assert recs[docs[2].name]["attempts"] == wd.WATCHDOG_MAX_ATTEMPTS
+    assert [n for p in out["html_parts"] for n in _h2_order(p)] == [d.name for d in docs[:2]]
+    assert (tmp_path / "out" / "all_quarantine.jsonl").exists()
@@ -0,0 +1,69 @@
+import hashlib
+
+import pytest
+
+import pure_download.download_segmented as dseg
+import pure_download.download_stream as ds
+from pure_download.download_segmented import (
+    download_file_segmented_requests,
+    split_ranges,
+    )
+from pure_download.http_cache import (
+    HttpMetaCache,
+    )
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(ds, "sleep", lambda s: None)
+    monkeypatch.setattr(dseg, "sleep", lambda s: None)
+
+def test_split_ranges_covers_file_once():
+    r = split_ranges(10, 3)
+    assert r == [(0, 2), (3, 5), (6, 9)]
+    assert split_ranges(2, 4) == [(0, 0), (1, 1)]
+
+def test_segmented_download(file_server, tmp_path):
+    sha = hashlib.sha256(file_server.body).hexdigest()
+    download_file_segmented_requests(file_server.url, str(tmp_path), "doc", segments=4, min_size=1,
+                                     expected_sha256=sha, max_retries=2)
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+    assert not (tmp_path / "doc.zip.seg").exists()
+    ranges = sorted(h["range"] for _, _, h in file_server.log("GET"))
+    assert len(ranges) == 4
+    assert all(h["if-range"] == file_server.etag for _, _, h in file_server.log("GET"))
+
+def test_small_file_uses_single_stream(file_server, tmp_path):
+    download_file_segmented_requests(file_server.url, str(tmp_path), "doc", segments=4,
+                                     min_size=len(file_server.body) + 1, max_retries=2)
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+    assert [h.get("range") for _, _, h in file_server.log("GET")] == [None]
+
+def test_range_ignored_falls_back_to_single_stream(file_server, tmp_path):
+    file_server.ignore_range = True
+    download_file_segmented_requests(file_server.url, str(tmp_path), "doc", segments=4, min_size=1, max_retries=2)
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+    assert not (tmp_path / "doc.zip.seg").exists()
+
+def test_sha256_mismatch_is_an_error(file_server, tmp_path):
+    with pytest.raises(RuntimeError):
+        download_file_segmented_requests(file_server.url, str(tmp_path), "doc", segments=4, min_size=1,
+                                         expected_sha256="0" * 64, max_retries=1)
+    assert not (tmp_path / "doc.zip").exists()
+    assert not (tmp_path / "doc.zip.seg").exists()
+
+def test_sha256_mismatch_on_single_stream_drops_file_and_cache(file_server, tmp_path):
+    cache = HttpMetaCache.for_dir(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        download_file_segmented_requests(file_server.url, str(tmp_path), "doc", segments=4,
+                                         min_size=len(file_server.body) + 1, expected_sha256="0" * 64,
+                                         meta_cache=cache, max_retries=1)
+    assert not (tmp_path / "doc.zip").exists()
+    assert cache.get(file_server.url) is None
+
+    # 次回は 304 ではなく取り直す
+    sha = hashlib.sha256(file_server.body).hexdigest()
+    download_file_segmented_requests(file_server.url, str(tmp_path), "doc", segments=4,
+                                     min_size=len(file_server.body) + 1, expected_sha256=sha,
+                                     meta_cache=cache, max_retries=1)
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+    assert "if-none-match" not in file_server.log("GET")[-1][2]
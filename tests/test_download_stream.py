@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import pure_download.download_stream as ds
+from pure_download.download_stream import (
+    download_file_safely_requests,
+    )
+from pure_download.http_cache import (
+    HttpMetaCache,
+    )
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    # 再試行の待ち（2s, 4s ...）を飛ばす
+    monkeypatch.setattr(ds, "sleep", lambda s: None)
+
+def _get(srv, tmp_path, **kw):
+    kw.setdefault("max_retries", 3)
+    return download_file_safely_requests(srv.url, str(tmp_path), "doc", **kw)
+
+def test_full_download_without_head_probe(file_server, tmp_path):
+    assert _get(file_server, tmp_path, probe_mode="resume") == ".zip"
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+    assert not (tmp_path / "doc.zip.part").exists()
+    assert file_server.log("HEAD") == []
+    assert "range" not in file_server.log("GET")[0][2]
+
+def test_resume_sends_range_and_if_range(file_server, tmp_path):
+    (tmp_path / "doc.zip.part").write_bytes(file_server.body[:1000])
+    _get(file_server, tmp_path)
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+    h = file_server.log("GET")[0][2]
+    assert h["range"] == "bytes=1000-"
+    assert h["if-range"] == file_server.etag
+
+def test_if_range_mismatch_restarts_from_zero(file_server, tmp_path):
+    # HEAD と GET の間に差し替わった → サーバは 200 全量。.part に追記してはいけない
+    (tmp_path / "doc.zip.part").write_bytes(b"x" * 1000)
+    file_server.head_etag = '"stale"'
+    _get(file_server, tmp_path)
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+
+def test_416_with_complete_part_is_recovered_without_refetch(file_server, tmp_path):
+    (tmp_path / "doc.zip.part").write_bytes(file_server.body)
+    file_server.head_no_length = 1   # 最初の HEAD ではサイズ不明 → Range GET が 416
+    _get(file_server, tmp_path)
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+    assert len(file_server.log("GET")) == 1
+    assert len(file_server.log("HEAD")) == 2
+
+def test_416_with_oversized_part_is_truncated(file_server, tmp_path):
+    (tmp_path / "doc.zip.part").write_bytes(file_server.body + b"junk")
+    file_server.head_no_length = 1
+    _get(file_server, tmp_path)
+    assert (tmp_path / "doc.zip").read_bytes() == file_server.body
+
+def test_304_revalidation_keeps_file(file_server, tmp_path):
+    cache = HttpMetaCache.for_dir(str(tmp_path))
+    _get(file_server, tmp_path, meta_cache=cache, probe_mode="resume")
+    assert cache.last_status(file_server.url) == "downloaded"
+    mtime = os.path.getmtime(tmp_path / "doc.zip")
+
+    _get(file_server, tmp_path, meta_cache=cache, probe_mode="resume")
+    assert file_server.log("GET")[-1][2]["if-none-match"] == file_server.etag
+    assert cache.last_status(file_server.url) == "not_modified"
+    assert os.path.getmtime(tmp_path / "doc.zip") == mtime
+
+def test_changed_remote_is_downloaded_again(file_server, tmp_path):
+    cache = HttpMetaCache.for_dir(str(tmp_path))
+    _get(file_server, tmp_path, meta_cache=cache, probe_mode="resume")
+    file_server.set_body(b"new content")
+    _get(file_server, tmp_path, meta_cache=cache, probe_mode="resume")
+    assert (tmp_path / "doc.zip").read_bytes() == b"new content"
+    assert cache.last_status(file_server.url) == "downloaded"
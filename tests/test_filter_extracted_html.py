@@ -0,0 +1,54 @@
+import codecs
+import os
+
+import pytest
+
+from combine.filter_extracted_html_by_keywords import (
+    _decode_html,
+    filter_extracted_html_by_keywords,
+    )
+
+HEAD = "<!DOCTYPE html><html><meta charset='{cs}'><body>"
+FOOT = "</body></html>"
+
+def _part(name: str, items, cs: str = "UTF-8") -> str:
+    lis = "".join(f"<li>{t}</li>" for t in items)
+    return HEAD.format(cs=cs) + f"<div class='file-block'><h2>{name}</h2><div class='word-block'><ul>{lis}</ul></div></div>" + FOOT
+
+def test_declared_charset_wins_over_utf8():
+    # "ﾃｽ" の cp932 バイト列（c3 bd）は UTF-8 としても読める（"½"）。宣言どおり cp932 で読む
+    data = _part("a.docx", ["ﾃｽﾄ UE"], cs="Shift_JIS").encode("cp932")
+    assert "ﾃｽﾄ UE" in _decode_html(data, "a")
+
+def test_undeclared_cp932_falls_back():
+    data = _part("a.docx", ["基地局 UE"]).encode("cp932")
+    assert "基地局 UE" in _decode_html(data, "a")
+
+def test_bom_and_replacement():
+    assert "UE" in _decode_html(codecs.BOM_UTF8 + _part("a", ["UE"]).encode("utf-8"), "a")
+    assert "�" not in _decode_html(_part("a", ["UE"]).encode("utf-16"), "a")
+    # utf-8 と宣言されているのに cp932 でも読めないバイト → 置換して読む（例外にしない）
+    assert "UE" in _decode_html(_part("a", ["UE"]).encode("utf-8") + b"\x81\xff", "a")
+
+def test_pooled_and_serial_outputs_match(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    parts = [
+        (_part("a.docx", ["UE の動作", "関係ない"]), "utf-8"),
+        (_part("b.pptx", ["HARQ-ACK と 基地局", "harqs"], cs="Shift_JIS"), "cp932"),
+        (_part("c.docx", ["BSR design", "ＵＥ"]), "utf-8-sig"),
+        (_part("a.docx", ["もう一度 UE"]), "utf-8"),   # 同じファイル名が後ろのパートにも続く
+    ]
+    paths = []
+    for i, (text, enc) in enumerate(parts, 1):
+        p = tmp_path / f"x_part{i}.html"
+        p.write_bytes(text.encode(enc))
+        paths.append(p)
+
+    kws = ["UE", "HARQ-ACK", "基地局", "BSR design"]
+    serial = filter_extracted_html_by_keywords(paths, kws, tmp_path / "serial.html", workers=1).read_bytes()
+    pooled = filter_extracted_html_by_keywords(paths, kws, tmp_path / "pooled.html", workers=3).read_bytes()
+    assert pooled == serial
+    out = serial.decode("utf-8")
+    assert "HARQ-ACK と 基地局" in out
+    assert out.index("もう一度 UE") > out.index("UE の動作")
+    assert "UE (3)" in out
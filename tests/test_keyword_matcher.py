@@ -0,0 +1,83 @@
+import pickle
+import random
+import re
+
+import pytest
+
+import combine.keyword_matcher as km
+from combine.keyword_matcher import (
+    KeywordMatcher,
+    nfkc_casefold,
+    )
+
+def _regex_hits(keywords, text, prefix=False):
+    """置き換え前の照合（キーワード毎の正規表現・語境界 [0-9A-Za-z_]）"""
+    tn = nfkc_casefold(text)
+    hit = set()
+    kept = [k for k in keywords if (k or "").strip()]
+    for i, kw in enumerate(kept):
+        kn = nfkc_casefold(kw.strip())
+        tail = "" if prefix else r"(?![0-9A-Za-z_])"
+        if re.search(rf"(?<![0-9A-Za-z_]){re.escape(kn)}{tail}", tn):
+            hit.add(i)
+    return hit
+
+@pytest.fixture(params=["python", "pyahocorasick"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(km, "ahocorasick", None)
+    elif km.ahocorasick is None:
+        pytest.skip("pyahocorasick が無い")
+    return request.param
+
+def _match(keywords, text, prefix=False):
+    m = KeywordMatcher(keywords)
+    return m.match(nfkc_casefold(text), prefix=prefix)
+
+CASES = [
+    (["UE"], "The UE sends", {0}),
+    (["UE"], "UEs and QUEUE", set()),
+    (["UE"], "UE-specific (UE)", {0}),
+    (["UE"], "ＵＥ の動作", {0}),                      # 全角 → NFKC
+    (["harq", "HARQ-ACK"], "HARQ-ACK feedback", {0, 1}),  # 重なり（短い方も語境界を満たす）
+    (["ACK", "HARQ-ACK"], "HARQ-ACK", {0, 1}),
+    (["he", "she", "hers"], "ushers", set()),           # 語の途中の一致は全部捨てる
+    (["he", "she", "hers"], "she hers he", {0, 1, 2}),
+    (["BSR design"], "new BSR  design", set()),         # 空白の数も一致させる
+    (["a_b"], "xa_b a_bc a_b.", {0}),
+    (["基地局"], "無線基地局装置", {0}),                  # 和文は「含まれる」一致
+    (["基地局", "局装置"], "基地局装置", {0, 1}),
+    (["UE", "ue"], "ue", {0, 1}),                       # 同じ正規化結果は両方
+    (["", "  ", "UE"], "UE", {0}),                      # 空キーワードは数えない
+]
+
+@pytest.mark.parametrize("keywords,text,want", CASES)
+def test_matches_like_the_regex_it_replaced(backend, keywords, text, want):
+    assert _match(keywords, text) == want
+    assert _match(keywords, text) == _regex_hits(keywords, text)
+
+def test_prefix_ignores_trailing_boundary(backend):
+    assert _match(["harq"], "HARQs and HARQ-ACK", prefix=True) == {0}
+    assert _match(["harq"], "HARQs", prefix=False) == set()
+    assert _match(["harq"], "xHARQ", prefix=True) == set()
+
+def test_random_texts_agree_with_regex(backend):
+    rnd = random.Random(0)
+    alphabet = "ab_ -基局"
+    for _ in range(300):
+        kws = ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 3))) for _ in range(rnd.randint(1, 4))]
+        text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 20)))
+        for prefix in (False, True):
+            assert _match(kws, text, prefix) == _regex_hits(kws, text, prefix), (kws, text, prefix)
+
+def test_pickle_rebuilds_matcher(backend):
+    m = KeywordMatcher(["UE", "基地局", "HARQ-ACK"])
+    m2 = pickle.loads(pickle.dumps(m))
+    assert m2.keywords == m.keywords
+    text = nfkc_casefold("UE と 基地局, harq-ack")
+    assert m2.match(text) == m.match(text) == {0, 1, 2}
+
+def test_empty_matcher():
+    m = KeywordMatcher(["", None, "  "])
+    assert not m
+    assert m.match("anything") == set()
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+pptx = pytest.importorskip("pptx")
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.util import Inches
+
+import combine.ooxml_ppt as ooxml_ppt
+from combine.ooxml_ppt import (
+    extract_pptx_slide_texts,
+    extract_pptx_slides,
+    )
+
+@pytest.fixture
+def sample_pptx(tmp_path) -> Path:
+    prs = pptx.Presentation()
+    s1 = prs.slides.add_slide(prs.slide_layouts[1])
+    s1.shapes.title.text = "Title A"
+    body = s1.placeholders[1].text_frame
+    body.text = "Body 1"
+    body.add_paragraph().text = "Body 2"
+    tbl = s1.shapes.add_table(1, 2, Inches(1), Inches(5), Inches(4), Inches(1)).table
+    tbl.cell(0, 0).text = "Cell A"
+    tbl.cell(0, 1).text = "Cell B"
+    notes = s1.notes_slide
+    notes.notes_text_frame.text = "note one"
+    for ph in notes.placeholders:
+        if ph.placeholder_format.type == PP_PLACEHOLDER.SLIDE_NUMBER:
+            ph.text_frame.text = "7"   # スライド番号はノート本文ではない
+
+    s2 = prs.slides.add_slide(prs.slide_layouts[5])
+    s2.shapes.title.text = "Title B"
+    s3 = prs.slides.add_slide(prs.slide_layouts[6])   # 白紙（段落なし）
+
+    # 表示順をファイル名順と変える: slide3.xml を先頭へ
+    ids = prs.slides._sldIdLst
+    ids.insert(0, ids[2])
+    path = tmp_path / "sample.pptx"
+    prs.save(str(path))
+    return path
+
+def test_slides_follow_presentation_order(sample_pptx):
+    got = extract_pptx_slide_texts(sample_pptx)
+    assert list(got) == [1, 2, 3]
+    assert got[1] == []
+    assert got[2][:5] == ["Title A", "Body 1", "Body 2", "Cell A", "Cell B"]
+    assert got[3] == ["Title B"]
+
+def test_notes_are_prefixed_and_placeholders_skipped(sample_pptx):
+    got = extract_pptx_slide_texts(sample_pptx)
+    assert got[2][5:] == [ooxml_ppt.NOTES_PREFIX + "note one"]
+    assert not any(p.endswith("7") for p in got[2])
+
+def test_notes_can_be_excluded(sample_pptx, monkeypatch):
+    assert extract_pptx_slide_texts(sample_pptx, include_notes=False)[2] == [
+        "Title A", "Body 1", "Body 2", "Cell A", "Cell B",
+    ]
+    monkeypatch.setattr(ooxml_ppt, "NOTES_PREFIX", "")
+    assert extract_pptx_slide_texts(sample_pptx)[2][-1] == "note one"
+
+def test_slides_entry_shape(sample_pptx):
+    got = extract_pptx_slides(sample_pptx)
+    assert got[3] == {"paras": ["Title B"]}
@@ -0,0 +1,62 @@
+import io
+from pathlib import Path
+
+import pytest
+
+docx = pytest.importorskip("docx")
+
+from combine.ooxml_word import (
+    extract_docx_html_with_images,
+    extract_docx_paragraphs,
+    )
+
+def _png() -> bytes:
+    Image = pytest.importorskip("PIL.Image")
+    b = io.BytesIO()
+    Image.new("RGB", (4, 3), "red").save(b, "PNG")
+    return b.getvalue()
+
+@pytest.fixture
+def sample_docx(tmp_path) -> Path:
+    d = docx.Document()
+    d.add_heading("Intro", level=1)
+    d.add_paragraph("First para")
+    t = d.add_table(rows=1, cols=2)
+    t.cell(0, 0).text = "Cell A"
+    t.cell(0, 1).text = "Cell B"
+    d.add_paragraph("First para")   # 重複
+    p = d.add_paragraph("Line 1")
+    p.add_run().add_break()
+    p.add_run("Line 2")
+    d.add_paragraph("   ")          # 空段落
+    d.sections[0].header.paragraphs[0].text = "Header text"
+    d.sections[0].footer.paragraphs[0].text = "First para"
+    path = tmp_path / "sample.docx"
+    d.save(str(path))
+    return path
+
+def test_paragraphs_in_document_order_then_stories(sample_docx):
+    assert extract_docx_paragraphs(sample_docx) == [
+        "Intro", "First para", "Cell A", "Cell B", "Line 1", "Line 2", "Header text",
+    ]
+
+def test_html_keeps_headings_tables_and_breaks(sample_docx, tmp_path):
+    h = extract_docx_html_with_images(sample_docx, tmp_path / "assets", tmp_path, "sample")
+    assert "<h1>Intro</h1>" in h
+    assert h.index("<p>Cell A</p>") < h.index("<p>Cell B</p>") < h.index("</table>")
+    assert "<p>Line 1<br>Line 2</p>" in h
+    # ヘッダー/フッターは本文の後ろにまとめる（HTML では重複を消さない）
+    assert h.index("</table>") < h.index("word-stories") < h.index("<p>Header text</p>")
+
+def test_inline_image_is_copied_to_assets(tmp_path):
+    img = tmp_path / "pic.png"
+    img.write_bytes(_png())
+    d = docx.Document()
+    d.add_paragraph("before")
+    d.add_picture(str(img))
+    path = tmp_path / "pic.docx"
+    d.save(str(path))
+
+    h = extract_docx_html_with_images(path, tmp_path / "assets", tmp_path, "pic")
+    src = h.split("<img src='", 1)[1].split("'", 1)[0]
+    assert (tmp_path / src).read_bytes() == img.read_bytes()